@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from ..utils.serializacao import schema_campos_opcionais
 
 class ClienteCreate(BaseModel):
     cli_email: EmailStr
@@ -22,4 +23,13 @@ class ClienteResponse(BaseModel):
     cli_criado_em: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Leituras com ?fields=: só o cli_id é garantido
+ClienteCampos = schema_campos_opcionais(ClienteResponse, obrigatorios=("cli_id",))
+
+# Página de clientes (paginação por cursor)
+class ClientePagina(BaseModel):
+    itens: List[ClienteCampos]
+    proximo_cursor: Optional[str] = None
+    total_aproximado: Optional[int] = None
@@ -1,4 +1,7 @@
 from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import date
+from ..models.Veiculos import CategoriaVeiculo
 
 class DashboardStats(BaseModel):
     total_veiculos: int
@@ -7,6 +10,34 @@ class DashboardStats(BaseModel):
     veiculos_locados: int
     total_clientes: int
     locacoes_ativas: int
+    faturamento_mensal: float = 0.0
+    faturamento_total: float = 0.0
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Valor recalculado x valor armazenado de um contador
+class DivergenciaContador(BaseModel):
+    esperado: float
+    atual: Optional[float] = None
+
+class ReconciliacaoResponse(BaseModel):
+    divergencias: Dict[str, DivergenciaContador]
+    corrigido: bool
+
+
+# Ponto da série de faturamento (rollup por período e categoria)
+class PontoSerie(BaseModel):
+    periodo: date
+    categoria: CategoriaVeiculo
+    locacoes: int
+    faturamento: float
+
+    class Config:
+        use_enum_values = True
+
+class SerieFaturamentoResponse(BaseModel):
+    granularidade: str
+    inicio: date
+    fim: date
+    pontos: List[PontoSerie]
@@ -0,0 +1,71 @@
+from pydantic import BaseModel
+from typing import Optional
+
+# Estado atual e contadores acumulados de um pool de conexões
+class EstatisticasPool(BaseModel):
+    tamanho: int
+    em_uso: int
+    ociosas: int
+    overflow_atual: int
+    overflow_maximo: int
+    timeout_segundos: float
+    checkouts: int
+    overflows: int
+    timeouts: int
+    espera_media_ms: float
+    espera_maxima_ms: float
+
+# Fila de admissão das sessões no modo sync (uma vaga por conexão do pool)
+class EstatisticasFilaSessoes(BaseModel):
+    capacidade: int
+    em_uso: int
+    admitidas: int
+    timeouts: int
+    espera_media_ms: float
+    espera_maxima_ms: float
+
+class EstatisticasThreadpool(BaseModel):
+    tamanho: int
+    em_uso: int
+
+class MetricasPoolResponse(BaseModel):
+    modo: str
+    pool_sync: EstatisticasPool
+    pool_async: Optional[EstatisticasPool] = None
+    fila_sessoes: Optional[EstatisticasFilaSessoes] = None
+    threadpool: EstatisticasThreadpool
+
+class EstatisticasCachePrincipais(BaseModel):
+    tamanho: int
+    capacidade: int
+    ttl_segundos: float
+    escutando: bool
+    acertos: int
+    falhas: int
+    invalidacoes: int
+
+class EstatisticasCacheCatalogo(BaseModel):
+    tamanho: int
+    capacidade: int
+    ttl_segundos: float
+    escutando: bool
+    acertos: int
+    falhas: int
+    invalidacoes: int
+
+class EstatisticasPoolSenhas(BaseModel):
+    trabalhadores: int
+    capacidade: int
+    pendentes: int
+    concluidas: int
+    rejeitadas: int
+
+class EstatisticasIdempotencia(BaseModel):
+    tamanho: int
+    capacidade: int
+    ttl_segundos: float
+    em_andamento: int
+    repeticoes: int
+    repeticoes_banco: int
+    esperas: int
+    conflitos: int
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 from ..models.Veiculos import StatusLocacao
+from ..utils.serializacao import schema_campos_opcionais
 
 # Schema para fazer um pedido de reserva
 class ReservaRequest(BaseModel):
@@ -26,8 +28,49 @@ class LocacaoResponse(BaseModel):
         from_attributes = True
         use_enum_values = True
 
+# Leituras com ?fields=: só o res_id é garantido
+LocacaoCampos = schema_campos_opcionais(LocacaoResponse, obrigatorios=("res_id",))
+
 # Schema para mudar o status de uma locação (suficiente para devolução)
 class MudarStatusRequest(BaseModel):
     status: StatusLocacao
     class Config:
         use_enum_values = True
+
+class ModoLote(str, Enum):
+    TUDO_OU_NADA = "tudo_ou_nada"      # um item recusado recusa o lote inteiro
+    MELHOR_ESFORCO = "melhor_esforco"  # reserva o que der e lista as falhas
+
+# Schema para reservar vários veículos de uma vez (clientes corporativos)
+class ReservaLoteRequest(BaseModel):
+    itens: List[ReservaRequest] = Field(..., min_length=1, max_length=50)
+    modo: ModoLote = ModoLote.TUDO_OU_NADA
+
+# Item recusado do lote (indice: posição em itens)
+class FalhaLote(BaseModel):
+    indice: int
+    veiculo_id: str
+    motivo: str
+    detalhe: str
+
+class ReservaLoteResponse(BaseModel):
+    reservas: List[LocacaoResponse]
+    falhas: List[FalhaLote]
+
+# Schema para trocar o status de várias reservas (check-in/check-out em massa)
+class MudarStatusLoteRequest(BaseModel):
+    reserva_ids: List[str] = Field(..., min_length=1, max_length=500)
+    status: StatusLocacao
+    class Config:
+        use_enum_values = True
+
+# Resultado de cada id: a reserva alterada ou o motivo da recusa
+class ResultadoStatusLote(BaseModel):
+    res_id: str
+    alterada: bool
+    motivo: Optional[str] = None
+    detalhe: Optional[str] = None
+    reserva: Optional[LocacaoResponse] = None
+
+class MudarStatusLoteResponse(BaseModel):
+    resultados: List[ResultadoStatusLote]
@@ -1,7 +1,8 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from ..models.Veiculos import CategoriaVeiculo, StatusVeiculo
+from ..utils.serializacao import schema_campos_opcionais
 
 # Schema para criar um veículo
 class VeiculoCreate(BaseModel):
@@ -51,4 +52,26 @@ class VeiculoResponse(BaseModel):
 
     class Config:
         from_attributes = True
-        use_enum_values = True
\ No newline at end of file
+        use_enum_values = True
+
+# Leituras com ?fields=: só o id é garantido
+VeiculoCampos = schema_campos_opcionais(VeiculoResponse, obrigatorios=("id",))
+
+# Página de veículos (paginação por cursor)
+class VeiculoPagina(BaseModel):
+    itens: List[VeiculoCampos]
+    proximo_cursor: Optional[str] = None
+    total_aproximado: Optional[int] = None
+
+# Linha recusada na importação em lote
+class ErroImportacao(BaseModel):
+    linha: int
+    placa: Optional[str] = None
+    motivo: str
+
+class ImportacaoResponse(BaseModel):
+    recebidas: int
+    inseridas: int
+    rejeitadas: int
+    erros: List[ErroImportacao]
+    erros_truncados: bool = False
@@ -1,5 +1,5 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from typing import Optional
@@ -9,42 +9,53 @@ from ..models.Cliente import Cliente as Usuario
 from ..models.Adm import Admin as UsuarioAdmin
 from ..Schemas.Usuario import UsuarioCreate  
 
+from . import contadores_service
+
 # funções de segurança
-from ..utils.security import (
-    criar_hash_senha, 
-    verificar_senha, 
-    criar_access_token
-)
+from ..utils.security import criar_access_token
+# O bcrypt roda no pool dedicado, fora do event loop e do threadpool das rotas
+from ..utils.pool_senhas import pool_senhas
+
+async def _atualizar_hash(db: AsyncSession, usuario, campo: str, novo_hash: Optional[str]):
+    """Regrava o hash quando o custo configurado mudou (login já validado)"""
+    if novo_hash is None:
+        return
+    setattr(usuario, campo, novo_hash)
+    await db.commit()
 
-def autenticar_usuario(db: Session, username: str, senha: str) -> Optional[Usuario]:
+async def autenticar_usuario(db: AsyncSession, username: str, senha: str) -> Optional[Usuario]:
     """Autentica um usuário (Cliente) por email e senha"""
-    usuario = db.query(Usuario).filter(Usuario.cli_email == username).first()
+    usuario = await db.scalar(select(Usuario).where(Usuario.cli_email == username))
     
     if usuario is None:
         return None
     
-    if not verificar_senha(senha, str(usuario.cli_senha_hash)):
+    valida, novo_hash = await pool_senhas.verificar(senha, str(usuario.cli_senha_hash))
+    if not valida:
         return None
-        
+    
+    await _atualizar_hash(db, usuario, "cli_senha_hash", novo_hash)
     return usuario
 
-def autenticar_admin(db: Session, username: str, senha: str) -> Optional[UsuarioAdmin]:
+async def autenticar_admin(db: AsyncSession, username: str, senha: str) -> Optional[UsuarioAdmin]:
     """Autentica um usuário (Admin) por código e senha"""
-    admin = db.query(UsuarioAdmin).filter(UsuarioAdmin.codigo_admin == username).first()
+    admin = await db.scalar(select(UsuarioAdmin).where(UsuarioAdmin.codigo_admin == username))
     
     if admin is None:
         return None
     
-    if not verificar_senha(senha, str(admin.senha_hash)):
+    valida, novo_hash = await pool_senhas.verificar(senha, str(admin.senha_hash))
+    if not valida:
         return None
-        
+    
+    await _atualizar_hash(db, admin, "senha_hash", novo_hash)
     return admin
 
 
-def criar_novo_usuario(db: Session, usuario_data: UsuarioCreate) -> Usuario:
+async def criar_novo_usuario(db: AsyncSession, usuario_data: UsuarioCreate) -> Usuario:
     """Cria um novo usuário (Cliente) no sistema"""
     
-    hashed_senha = criar_hash_senha(usuario_data.senha)
+    hashed_senha = await pool_senhas.criar_hash(usuario_data.senha)
     
     novo_usuario = Usuario(
         cli_email=usuario_data.email.lower(),
@@ -53,11 +64,12 @@ def criar_novo_usuario(db: Session, usuario_data: UsuarioCreate) -> Usuario:
     )
     
     db.add(novo_usuario)
+    await db.run_sync(contadores_service.registrar_cliente_criado)
     try:
-        db.commit()
-        db.refresh(novo_usuario)
+        await db.commit()
+        await db.refresh(novo_usuario)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Um usuário com este e-mail já existe."
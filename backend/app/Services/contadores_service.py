@@ -0,0 +1,208 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..models.Contadores import Contador
+from ..models.Veiculos import Veiculo, StatusVeiculo, StatusLocacao
+from ..models.Cliente import Cliente
+from ..models.Reservar import Reserva
+
+# Chaves dos contadores do dashboard
+VEICULOS_TOTAL = "veiculos_total"
+CLIENTES_ATIVOS = "clientes_ativos"
+LOCACOES_ATIVAS = "locacoes_ativas"
+FATURAMENTO_TOTAL = "faturamento_total"
+PREFIXO_VEICULOS_STATUS = "veiculos_status_"
+PREFIXO_FATURAMENTO_MES = "faturamento_mes_"
+# Versão do catálogo de veículos (ETag das rotas públicas): só cresce, fora da reconciliação
+CATALOGO_VERSAO = "catalogo_versao"
+
+def chave_status_veiculo(status: StatusVeiculo) -> str:
+    return PREFIXO_VEICULOS_STATUS + status.value
+
+def chave_faturamento_mes(momento: datetime) -> str:
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc)
+    return PREFIXO_FATURAMENTO_MES + momento.strftime("%Y-%m")
+
+def _chave_do_dashboard(chave: str) -> bool:
+    return (
+        chave in (VEICULOS_TOTAL, CLIENTES_ATIVOS, LOCACOES_ATIVAS, FATURAMENTO_TOTAL)
+        or chave.startswith(PREFIXO_VEICULOS_STATUS)
+        or chave.startswith(PREFIXO_FATURAMENTO_MES)
+    )
+
+def incrementar(db: Session, deltas: Dict[str, float]):
+    """
+    Soma os deltas nos contadores dentro da transação da sessão, sem commit.
+    Se a transação for desfeita, os contadores voltam junto com os dados.
+    """
+    # Chaves ordenadas: transações concorrentes travam as linhas na mesma ordem
+    agora = datetime.utcnow()
+    linhas = [
+        {"chave": chave, "valor": valor, "atualizado_em": agora}
+        for chave, valor in sorted(deltas.items()) if valor
+    ]
+    if not linhas:
+        return
+    stmt = pg_insert(Contador).values(linhas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Contador.chave],
+        set_={"valor": Contador.valor + stmt.excluded.valor, "atualizado_em": stmt.excluded.atualizado_em},
+    )
+    db.execute(stmt)
+
+def registrar_veiculo_criado(db: Session, status: StatusVeiculo):
+    incrementar(db, {VEICULOS_TOTAL: 1, chave_status_veiculo(status): 1, CATALOGO_VERSAO: 1})
+
+def registrar_veiculo_removido(db: Session, status: StatusVeiculo):
+    incrementar(db, {VEICULOS_TOTAL: -1, chave_status_veiculo(status): -1, CATALOGO_VERSAO: 1})
+
+def deltas_status_veiculo(anterior: StatusVeiculo, novo: StatusVeiculo) -> Dict[str, float]:
+    if anterior == novo:
+        return {}
+    return {chave_status_veiculo(anterior): -1, chave_status_veiculo(novo): 1, CATALOGO_VERSAO: 1}
+
+def registrar_status_veiculo(db: Session, anterior: StatusVeiculo, novo: StatusVeiculo):
+    incrementar(db, deltas_status_veiculo(anterior, novo))
+
+def registrar_alteracao_catalogo(db: Session):
+    """Para alterações de veículo que não mexem nos outros contadores (ex.: edição de dados)"""
+    incrementar(db, {CATALOGO_VERSAO: 1})
+
+def ler_versao_catalogo(db: Session) -> Tuple[int, Optional[datetime]]:
+    """(versão, instante UTC da última alteração) do catálogo; (0, None) se nunca alterado"""
+    linha = db.query(Contador.valor, Contador.atualizado_em).filter(Contador.chave == CATALOGO_VERSAO).first()
+    if linha is None:
+        return 0, None
+    return int(linha.valor), linha.atualizado_em.replace(tzinfo=timezone.utc)
+
+def registrar_cliente_criado(db: Session):
+    incrementar(db, {CLIENTES_ATIVOS: 1})
+
+def somar_deltas(*grupos: Dict[str, float]) -> Dict[str, float]:
+    """Junta deltas de várias alterações para um incrementar() só"""
+    total: Dict[str, float] = {}
+    for deltas in grupos:
+        for chave, valor in deltas.items():
+            total[chave] = total.get(chave, 0) + valor
+    return total
+
+def registrar_transicao_reserva(
+    db: Session,
+    anterior: Optional[StatusLocacao],
+    novo: StatusLocacao,
+    total: Optional[float],
+    data_fim: datetime,
+):
+    """Ajusta locações ativas e faturamento quando uma reserva muda de status"""
+    incrementar(db, deltas_transicao_reserva(anterior, novo, total, data_fim))
+
+def deltas_transicao_reserva(
+    anterior: Optional[StatusLocacao],
+    novo: StatusLocacao,
+    total: Optional[float],
+    data_fim: datetime,
+) -> Dict[str, float]:
+    if anterior == novo:
+        return {}
+    deltas: Dict[str, float] = {}
+    if novo == StatusLocacao.ATIVA:
+        deltas[LOCACOES_ATIVAS] = 1
+    elif anterior == StatusLocacao.ATIVA:
+        deltas[LOCACOES_ATIVAS] = -1
+
+    # O faturamento mensal segue o mês de res_data_fim, como na consulta original
+    sinal = 0
+    if novo == StatusLocacao.FINALIZADA:
+        sinal = 1
+    elif anterior == StatusLocacao.FINALIZADA:
+        sinal = -1
+    if sinal and total:
+        deltas[FATURAMENTO_TOTAL] = sinal * total
+        deltas[chave_faturamento_mes(data_fim)] = sinal * total
+    return deltas
+
+def ler_estatisticas(db: Session) -> Dict[str, float]:
+    """Lê todos os contadores do dashboard em uma consulta pela chave primária"""
+    mes = chave_faturamento_mes(datetime.now(timezone.utc))
+    chaves = [VEICULOS_TOTAL, CLIENTES_ATIVOS, LOCACOES_ATIVAS, FATURAMENTO_TOTAL, mes]
+    chaves += [chave_status_veiculo(s) for s in StatusVeiculo]
+    valores = dict(db.query(Contador.chave, Contador.valor).filter(Contador.chave.in_(chaves)).all())
+
+    return {
+        "total_veiculos": int(valores.get(VEICULOS_TOTAL, 0)),
+        "veiculos_disponiveis": int(valores.get(chave_status_veiculo(StatusVeiculo.DISPONIVEL), 0)),
+        "veiculos_manutencao": int(valores.get(chave_status_veiculo(StatusVeiculo.MANUTENCAO), 0)),
+        "veiculos_locados": int(valores.get(chave_status_veiculo(StatusVeiculo.LOCADO), 0)),
+        "total_clientes": int(valores.get(CLIENTES_ATIVOS, 0)),
+        "locacoes_ativas": int(valores.get(LOCACOES_ATIVAS, 0)),
+        "faturamento_mensal": float(valores.get(mes, 0.0)),
+        "faturamento_total": float(valores.get(FATURAMENTO_TOTAL, 0.0)),
+    }
+
+def calcular_contadores(db: Session) -> Dict[str, float]:
+    """Recalcula do zero, a partir das tabelas, o valor que cada contador deveria ter"""
+    esperados: Dict[str, float] = {chave_status_veiculo(s): 0 for s in StatusVeiculo}
+
+    total_veiculos = 0
+    for status, quantidade in db.query(Veiculo.status, func.count()).group_by(Veiculo.status).all():
+        total_veiculos += quantidade
+        if status is not None:
+            esperados[chave_status_veiculo(status)] = quantidade
+    esperados[VEICULOS_TOTAL] = total_veiculos
+
+    esperados[CLIENTES_ATIVOS] = db.query(Cliente).filter(Cliente.cli_ativo == True).count()
+    esperados[LOCACOES_ATIVAS] = db.query(Reserva).filter(
+        Reserva.res_status == StatusLocacao.ATIVA
+    ).count()
+
+    mes = func.to_char(func.timezone("UTC", Reserva.res_data_fim), "YYYY-MM")
+    faturamento_total = 0.0
+    for mes_ref, soma in db.query(mes, func.sum(Reserva.res_total)).filter(
+        Reserva.res_status == StatusLocacao.FINALIZADA
+    ).group_by(mes).all():
+        faturamento_total += soma or 0.0
+        esperados[PREFIXO_FATURAMENTO_MES + mes_ref] = soma or 0.0
+    esperados[FATURAMENTO_TOTAL] = faturamento_total
+    return esperados
+
+def reconciliar_contadores(db: Session, corrigir: bool = True) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Compara os contadores com um recálculo completo e devolve as divergências.
+    Com `corrigir`, grava os valores recalculados. A tabela fica travada para
+    escrita durante o recálculo, então nenhum incremento concorrente se perde.
+    """
+    db.execute(text("LOCK TABLE contadores IN EXCLUSIVE MODE"))
+    esperados = calcular_contadores(db)
+    atuais = {
+        chave: valor for chave, valor in db.query(Contador.chave, Contador.valor).all()
+        if _chave_do_dashboard(chave)
+    }
+
+    divergencias: Dict[str, Dict[str, Optional[float]]] = {}
+    for chave in sorted(set(esperados) | set(atuais)):
+        esperado = esperados.get(chave, 0.0)
+        atual = atuais.get(chave)
+        if abs(esperado - (atual or 0.0)) > 0.005:
+            divergencias[chave] = {"esperado": esperado, "atual": atual}
+
+    if corrigir and divergencias:
+        agora = datetime.utcnow()
+        stmt = pg_insert(Contador).values([
+            {"chave": chave, "valor": esperados.get(chave, 0.0), "atualizado_em": agora}
+            for chave in divergencias
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Contador.chave],
+            set_={"valor": stmt.excluded.valor, "atualizado_em": stmt.excluded.atualizado_em},
+        )
+        db.execute(stmt)
+    db.commit()
+    return divergencias
+
+def contadores_vazios(db: Session) -> bool:
+    return db.query(Contador.chave).first() is None
@@ -0,0 +1,166 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import exists, func, literal
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.Veiculos import Veiculo, CategoriaVeiculo, StatusLocacao
+from ..models.Reservar import Reserva
+
+# Granularidade do calendário: "dia" ou "hora"
+GRANULARIDADE = os.getenv("CALENDARIO_GRANULARIDADE", "dia")
+# Intervalo da recarga completa a partir do banco (mantém vários workers alinhados)
+RECARGA_SEGUNDOS = int(os.getenv("CALENDARIO_RECARGA_SEGUNDOS", "300"))
+# Até onde (a partir de hoje) o calendário guarda ocupação. Limita o tamanho dos
+# bitsets: com 730 dias, 730 bits por veículo por dia ou 17520 (~2 KB) por hora
+HORIZONTE_DIAS = int(os.getenv("CALENDARIO_HORIZONTE_DIAS", "730"))
+
+STATUS_OCUPANTES = (StatusLocacao.RESERVADA, StatusLocacao.ATIVA)
+
+def _utc(momento: datetime) -> datetime:
+    if momento.tzinfo is None:
+        return momento.replace(tzinfo=timezone.utc)
+    return momento.astimezone(timezone.utc)
+
+class CalendarioFrota:
+    """
+    Calendário de ocupação da frota em memória.
+
+    Cada veículo tem um bitset (int do Python) em que o bit i indica que o slot i
+    (dia ou hora, contado a partir de `base`) está ocupado por uma reserva
+    RESERVADA/ATIVA. Slots anteriores a `base` são descartados, e só os
+    `horizonte` primeiros slots são guardados: reservas além disso são cortadas, e
+    consultas além disso ficam para o banco (livres devolve None). A ocupação é
+    conservadora: um slot tocado por qualquer parte da reserva conta como ocupado.
+    """
+
+    def __init__(self, granularidade: str = GRANULARIDADE, horizonte_dias: int = HORIZONTE_DIAS):
+        self.slot = timedelta(hours=1) if granularidade == "hora" else timedelta(days=1)
+        self.horizonte = timedelta(days=horizonte_dias) // self.slot
+        self.base = self._inicio_do_slot(datetime.now(timezone.utc))
+        self._lock = threading.Lock()
+        self._categorias: Dict[str, CategoriaVeiculo] = {}
+        self._por_categoria: Dict[CategoriaVeiculo, Set[str]] = {c: set() for c in CategoriaVeiculo}
+        # veiculo_id -> res_id -> (slot inicial, slot final), ambos inclusivos
+        self._reservas: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self._bits: Dict[str, int] = {}
+
+    def _inicio_do_slot(self, momento: datetime) -> datetime:
+        momento = _utc(momento)
+        if self.slot == timedelta(hours=1):
+            return momento.replace(minute=0, second=0, microsecond=0)
+        return momento.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _indice(self, momento: datetime) -> int:
+        return (_utc(momento) - self.base) // self.slot
+
+    @staticmethod
+    def _mascara(inicio: int, fim: int) -> int:
+        return ((1 << (fim - inicio + 1)) - 1) << inicio
+
+    def _recalcular(self, veiculo_id: str):
+        bits = 0
+        for inicio, fim in self._reservas.get(veiculo_id, {}).values():
+            bits |= self._mascara(inicio, fim)
+        self._bits[veiculo_id] = bits
+
+    def carregar(self, db: Session):
+        """Reconstrói o calendário inteiro a partir das tabelas veiculos e reservas"""
+        base = self._inicio_do_slot(datetime.now(timezone.utc))
+        veiculos = db.query(Veiculo.id, Veiculo.categoria).all()
+        reservas = db.query(
+            Reserva.res_id, Reserva.res_vei_id, Reserva.res_data_inicio, Reserva.res_data_fim
+        ).filter(
+            Reserva.res_status.in_(STATUS_OCUPANTES),
+            Reserva.res_data_fim >= base,
+        ).all()
+
+        with self._lock:
+            self.base = base
+            self._categorias = {}
+            self._por_categoria = {c: set() for c in CategoriaVeiculo}
+            self._reservas = {}
+            self._bits = {}
+            for veiculo_id, categoria in veiculos:
+                self._categorias[veiculo_id] = categoria
+                self._por_categoria[categoria].add(veiculo_id)
+                self._bits[veiculo_id] = 0
+            for res_id, veiculo_id, inicio, fim in reservas:
+                self._adicionar(veiculo_id, res_id, inicio, fim)
+
+    def _adicionar(self, veiculo_id: str, res_id: str, inicio: datetime, fim: datetime):
+        slot_fim = self._indice(fim)
+        slot_inicio = max(self._indice(inicio), 0)
+        if slot_fim < 0 or slot_inicio >= self.horizonte:
+            return
+        slot_fim = min(slot_fim, self.horizonte - 1)
+        self._reservas.setdefault(veiculo_id, {})[res_id] = (slot_inicio, slot_fim)
+        self._bits[veiculo_id] = self._bits.get(veiculo_id, 0) | self._mascara(slot_inicio, slot_fim)
+
+    def registrar_veiculo(self, veiculo_id: str, categoria: CategoriaVeiculo):
+        with self._lock:
+            anterior = self._categorias.get(veiculo_id)
+            if anterior is not None:
+                self._por_categoria[anterior].discard(veiculo_id)
+            self._categorias[veiculo_id] = categoria
+            self._por_categoria[categoria].add(veiculo_id)
+            self._bits.setdefault(veiculo_id, 0)
+
+    def remover_veiculo(self, veiculo_id: str):
+        with self._lock:
+            categoria = self._categorias.pop(veiculo_id, None)
+            if categoria is not None:
+                self._por_categoria[categoria].discard(veiculo_id)
+            self._reservas.pop(veiculo_id, None)
+            self._bits.pop(veiculo_id, None)
+
+    def registrar_reserva(self, veiculo_id: str, res_id: str, inicio: datetime, fim: datetime):
+        with self._lock:
+            self._adicionar(veiculo_id, res_id, inicio, fim)
+
+    def remover_reserva(self, veiculo_id: str, res_id: str):
+        # Recalcula o veículo: duas reservas podem dividir o mesmo slot
+        with self._lock:
+            if self._reservas.get(veiculo_id, {}).pop(res_id, None) is not None:
+                self._recalcular(veiculo_id)
+
+    def livres(
+        self, inicio: datetime, fim: datetime, categoria: Optional[CategoriaVeiculo] = None
+    ) -> Optional[List[str]]:
+        """
+        Ids dos veículos sem nenhuma reserva ativa no período [inicio, fim], ou
+        None se o período passa do horizonte do calendário
+        """
+        with self._lock:
+            # Os índices dependem de `base`, que a recarga troca: calculados sob o lock
+            slot_fim = self._indice(fim)
+            slot_inicio = max(self._indice(inicio), 0)
+            if slot_fim >= self.horizonte:
+                return None
+            candidatos = self._categorias if categoria is None else self._por_categoria[categoria]
+            if slot_fim < 0:
+                return list(candidatos)
+            mascara = self._mascara(slot_inicio, slot_fim)
+            bits = self._bits
+            return [vid for vid in candidatos if not bits.get(vid, 0) & mascara]
+
+calendario_frota = CalendarioFrota()
+
+def reserva_no_periodo(veiculo_id, inicio: datetime, fim: datetime):
+    """EXISTS de reserva RESERVADA/ATIVA do veículo sobreposta a [inicio, fim], para quando o calendário não cobre o período"""
+    return exists().where(
+        Reserva.res_vei_id == veiculo_id,
+        Reserva.res_status.in_(STATUS_OCUPANTES),
+        Reserva.res_periodo.op("&&")(func.tstzrange(inicio, fim, literal("[]"))),
+    )
+
+def recarregar_calendario():
+    """Recarga completa do calendário usando uma sessão própria"""
+    db = SessionLocal()
+    try:
+        calendario_frota.carregar(db)
+    finally:
+        db.close()
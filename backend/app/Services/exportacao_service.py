@@ -0,0 +1,218 @@
+import csv
+import enum
+import io
+import json
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import Select, select
+from starlette.concurrency import run_in_threadpool
+
+from ..database import engine, async_engine
+from ..models.Cliente import Cliente
+from ..models.Reservar import Reserva
+from ..models.Veiculos import Veiculo, CategoriaVeiculo, StatusLocacao
+
+# Linhas buscadas do cursor no servidor por vez (também é o tamanho de cada bloco enviado)
+LINHAS_POR_BLOCO = int(os.getenv("EXPORTACAO_LINHAS_POR_BLOCO", "1000"))
+# Linhas por row group do Parquet / record batch do Arrow (um bloco do cursor cada)
+LINHAS_POR_GRUPO = int(os.getenv("EXPORTACAO_LINHAS_POR_GRUPO", "65536"))
+# Sobreposição da exportação incremental: maior que a transação mais longa que altera reservas
+JANELA_SEGURANCA = timedelta(seconds=int(os.getenv("EXPORTACAO_JANELA_SEGURANCA_SEGUNDOS", "300")))
+
+COLUNAS = [
+    "res_id", "res_vei_id", "placa", "categoria", "res_cli_id", "cli_email",
+    "res_data_inicio", "res_data_fim", "res_status", "res_total", "data_devolucao",
+    "res_atualizado_em",
+]
+
+def consulta_exportacao(
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    status: Optional[StatusLocacao] = None,
+    atualizado_desde: Optional[datetime] = None,
+) -> Select:
+    """
+    Reservas com placa/categoria do veículo e e-mail do cliente. Sem ORDER BY:
+    o Postgres devolve as linhas conforme lê, sem ordenar a tabela inteira antes.
+    O período filtra pelo início da reserva (inicio <= res_data_inicio < fim);
+    atualizado_desde traz as linhas alteradas a partir do instante dado menos
+    JANELA_SEGURANCA. res_atualizado_em é o now() do início da transação, que
+    pode confirmar depois de a exportação anterior ler instantes maiores: sem a
+    sobreposição essa linha se perderia. Linhas da janela saem de novo; quem
+    consome aplica por res_id.
+    """
+    query = (
+        select(
+            Reserva.res_id, Reserva.res_vei_id, Veiculo.placa, Veiculo.categoria,
+            Reserva.res_cli_id, Cliente.cli_email, Reserva.res_data_inicio,
+            Reserva.res_data_fim, Reserva.res_status, Reserva.res_total, Reserva.data_devolucao,
+            Reserva.res_atualizado_em,
+        )
+        .join(Veiculo, Veiculo.id == Reserva.res_vei_id)
+        .join(Cliente, Cliente.cli_id == Reserva.res_cli_id)
+    )
+    if inicio is not None:
+        query = query.where(Reserva.res_data_inicio >= inicio)
+    if fim is not None:
+        query = query.where(Reserva.res_data_inicio < fim)
+    if status is not None:
+        query = query.where(Reserva.res_status == status)
+    if atualizado_desde is not None:
+        query = query.where(Reserva.res_atualizado_em >= atualizado_desde - JANELA_SEGURANCA)
+    return query
+
+def _valor(valor):
+    if isinstance(valor, enum.Enum):
+        return valor.value
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+def _ndjson(linhas: Sequence, cabecalho: bool) -> str:
+    return "".join(
+        json.dumps(dict(zip(COLUNAS, map(_valor, linha))), ensure_ascii=False) + "\n"
+        for linha in linhas
+    )
+
+def _csv(linhas: Sequence, cabecalho: bool) -> str:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    if cabecalho:
+        escritor.writerow(COLUNAS)
+    escritor.writerows([_valor(v) if v is not None else "" for v in linha] for linha in linhas)
+    return buffer.getvalue()
+
+_FORMATADORES = {"ndjson": _ndjson, "csv": _csv}
+
+async def _blocos(query: Select, tamanho: int = LINHAS_POR_BLOCO) -> AsyncIterator[List]:
+    """
+    Lê o resultado por um cursor no servidor, `tamanho` linhas por vez. Usa uma
+    conexão própria, e não a sessão da requisição: a resposta continua sendo
+    enviada depois que a rota retorna. A rota fecha a sessão dela antes e mantém
+    a vaga de get_async_db até o fim do corpo, então a exportação ocupa uma única
+    conexão e entra na mesma admissão que as demais requisições.
+    """
+    query = query.execution_options(yield_per=tamanho)
+    if async_engine is not None:
+        async with async_engine.connect() as conn:
+            resultado = await conn.stream(query)
+            async for bloco in resultado.partitions():
+                yield bloco
+        return
+
+    conn = await run_in_threadpool(engine.connect)
+    try:
+        resultado = await run_in_threadpool(conn.execute, query)
+        while True:
+            bloco = await run_in_threadpool(resultado.fetchmany, tamanho)
+            if not bloco:
+                break
+            yield bloco
+    finally:
+        await run_in_threadpool(conn.close)
+
+async def _texto(query: Select, formato: str) -> AsyncIterator[bytes]:
+    formatar = _FORMATADORES[formato]
+    if formato == "csv":
+        yield formatar([], True).encode()
+    async for bloco in _blocos(query):
+        yield formatar(bloco, False).encode()
+
+def _pyarrow():
+    """pyarrow só é importado quando um formato colunar é pedido"""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Exportação em Parquet/Arrow requer o pacote pyarrow")
+    return pyarrow
+
+def _esquema(pa):
+    texto = pa.string()
+    instante = pa.timestamp("us", tz="UTC")
+    # Enums como dicionário fixo (todos os valores, na ordem do enum): o mesmo em
+    # todos os blocos, então o Arrow IPC não precisa reenviar dicionários
+    dicionario = pa.dictionary(pa.int8(), texto)
+    return pa.schema([
+        ("res_id", texto), ("res_vei_id", texto), ("placa", texto), ("categoria", dicionario),
+        ("res_cli_id", texto), ("cli_email", texto), ("res_data_inicio", instante),
+        ("res_data_fim", instante), ("res_status", dicionario), ("res_total", pa.float64()),
+        ("data_devolucao", instante), ("res_atualizado_em", instante),
+    ])
+
+# Coluna -> posição de cada membro do enum no dicionário
+_POSICOES_ENUMS: Dict[str, Dict[enum.Enum, int]] = {
+    coluna: {membro: i for i, membro in enumerate(tipo)}
+    for coluna, tipo in (("categoria", CategoriaVeiculo), ("res_status", StatusLocacao))
+}
+
+def _lote_arrow(pa, esquema, linhas: Sequence):
+    colunas = list(zip(*linhas))
+    arrays = []
+    for indice, campo in enumerate(esquema):
+        posicoes = _POSICOES_ENUMS.get(campo.name)
+        if posicoes is not None:
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array([posicoes.get(v) for v in colunas[indice]], type=pa.int8()),
+                pa.array([membro.value for membro in posicoes], type=pa.string()),
+            ))
+        else:
+            arrays.append(pa.array(colunas[indice], type=campo.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=esquema)
+
+class _SaidaColunar(io.RawIOBase):
+    """Destino do writer do pyarrow que acumula os bytes até serem enviados"""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+async def _colunar(pa, query: Select, formato: str) -> AsyncIterator[bytes]:
+    esquema = _esquema(pa)
+    saida = _SaidaColunar()
+    destino = pa.PythonFile(saida, mode="w")
+    if formato == "parquet":
+        escritor = pa.parquet.ParquetWriter(destino, esquema, compression="zstd")
+    else:
+        escritor = pa.ipc.new_stream(destino, esquema)
+    try:
+        async for bloco in _blocos(query, LINHAS_POR_GRUPO):
+            # Cada bloco do cursor vira um row group (Parquet) ou um record batch (Arrow)
+            escritor.write_batch(_lote_arrow(pa, esquema, bloco))
+            dados = saida.drenar()
+            if dados:
+                yield dados
+    finally:
+        escritor.close()
+    yield saida.drenar()
+
+def exportar_reservas(query: Select, formato: str) -> AsyncIterator[bytes]:
+    """
+    Gera o arquivo em blocos à medida que as linhas chegam do banco: a memória
+    fica limitada a um bloco, qualquer que seja o total exportado. Em CSV o
+    cabeçalho sai antes da primeira busca; em Parquet cada row group é enviado
+    assim que é escrito, e o rodapé (metadados) vai no fim.
+    """
+    if formato in ("parquet", "arrow"):
+        return _colunar(_pyarrow(), query, formato)
+    return _texto(query, formato)
@@ -0,0 +1,155 @@
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, cast, delete, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..models.FaturamentoDiario import FaturamentoDiario
+from ..models.Veiculos import Veiculo, CategoriaVeiculo, StatusLocacao
+from ..models.Reservar import Reserva
+
+class Granularidade(str, Enum):
+    DIA = "dia"
+    SEMANA = "semana"
+    MES = "mes"
+
+# Unidade correspondente do date_trunc do Postgres
+_UNIDADE_DATE_TRUNC = {
+    Granularidade.DIA: "day",
+    Granularidade.SEMANA: "week",
+    Granularidade.MES: "month",
+}
+
+def dia_de(momento: datetime) -> date:
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc)
+    return momento.date()
+
+def registrar_transicao(
+    db: Session,
+    anterior: Optional[StatusLocacao],
+    novo: StatusLocacao,
+    total: Optional[float],
+    data_fim: datetime,
+    categoria: CategoriaVeiculo,
+):
+    """Atualiza o rollup do dia quando uma locação entra ou sai de FINALIZADA (sem commit)"""
+    registrar_transicoes(db, [(anterior, novo, total, data_fim, categoria)])
+
+def registrar_transicoes(
+    db: Session,
+    transicoes: Iterable[Tuple[Optional[StatusLocacao], StatusLocacao, Optional[float], datetime, CategoriaVeiculo]],
+):
+    """
+    Como registrar_transicao, para várias locações (anterior, novo, total,
+    data_fim, categoria): soma por dia/categoria e grava em um upsert só
+    """
+    somas: Dict[Tuple[date, CategoriaVeiculo], List[float]] = {}
+    for anterior, novo, total, data_fim, categoria in transicoes:
+        if anterior == novo:
+            continue
+        if novo == StatusLocacao.FINALIZADA:
+            sinal = 1
+        elif anterior == StatusLocacao.FINALIZADA:
+            sinal = -1
+        else:
+            continue
+        soma = somas.setdefault((dia_de(data_fim), categoria), [0, 0.0])
+        soma[0] += sinal
+        soma[1] += sinal * (total or 0.0)
+    if not somas:
+        return
+
+    agora = datetime.utcnow()
+    # Ordenado: transações concorrentes travam as linhas na mesma ordem
+    stmt = pg_insert(FaturamentoDiario).values([
+        {"dia": dia, "categoria": categoria, "locacoes": locacoes, "faturamento": faturamento, "atualizado_em": agora}
+        for (dia, categoria), (locacoes, faturamento) in sorted(somas.items(), key=lambda item: (item[0][0], item[0][1].value))
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FaturamentoDiario.dia, FaturamentoDiario.categoria],
+        set_={
+            "locacoes": FaturamentoDiario.locacoes + stmt.excluded.locacoes,
+            "faturamento": FaturamentoDiario.faturamento + stmt.excluded.faturamento,
+            "atualizado_em": stmt.excluded.atualizado_em,
+        },
+    )
+    db.execute(stmt)
+
+def backfill(db: Session, inicio: Optional[date] = None, fim: Optional[date] = None) -> int:
+    """
+    Recalcula o rollup a partir das reservas FINALIZADA no intervalo de dias
+    (inclusivo; sem limites = tudo). Substitui as linhas do intervalo e faz commit.
+    """
+    dia = cast(func.timezone("UTC", Reserva.res_data_fim), Date)
+
+    # Trava o rollup para que incrementos concorrentes esperem a recarga terminar
+    db.execute(text("LOCK TABLE faturamento_diario IN EXCLUSIVE MODE"))
+
+    remover = delete(FaturamentoDiario)
+    origem = (
+        select(
+            dia.label("dia"),
+            Veiculo.categoria,
+            func.count().label("locacoes"),
+            func.coalesce(func.sum(Reserva.res_total), 0.0).label("faturamento"),
+            func.now().label("atualizado_em"),
+        )
+        .join(Veiculo, Veiculo.id == Reserva.res_vei_id)
+        .where(Reserva.res_status == StatusLocacao.FINALIZADA)
+        .group_by(dia, Veiculo.categoria)
+    )
+    if inicio is not None:
+        remover = remover.where(FaturamentoDiario.dia >= inicio)
+        origem = origem.where(dia >= inicio)
+    if fim is not None:
+        remover = remover.where(FaturamentoDiario.dia <= fim)
+        origem = origem.where(dia <= fim)
+
+    db.execute(remover)
+    resultado = db.execute(
+        pg_insert(FaturamentoDiario).from_select(
+            ["dia", "categoria", "locacoes", "faturamento", "atualizado_em"], origem
+        )
+    )
+    db.commit()
+    return resultado.rowcount
+
+def serie(
+    db: Session,
+    inicio: date,
+    fim: date,
+    granularidade: Granularidade,
+    categoria: Optional[CategoriaVeiculo] = None,
+) -> List[dict]:
+    """Série de faturamento lida apenas do rollup, agrupada por período e categoria"""
+    # A unidade vem de um dicionário fixo, então pode ir literal no SQL
+    unidade = _UNIDADE_DATE_TRUNC[granularidade]
+    periodo = cast(
+        func.date_trunc(literal_column(f"'{unidade}'"), FaturamentoDiario.dia), Date
+    ).label("periodo")
+    query = (
+        select(
+            periodo,
+            FaturamentoDiario.categoria,
+            func.sum(FaturamentoDiario.locacoes).label("locacoes"),
+            func.sum(FaturamentoDiario.faturamento).label("faturamento"),
+        )
+        .where(FaturamentoDiario.dia >= inicio, FaturamentoDiario.dia <= fim)
+        .group_by(periodo, FaturamentoDiario.categoria)
+        .order_by(periodo, FaturamentoDiario.categoria)
+    )
+    if categoria is not None:
+        query = query.where(FaturamentoDiario.categoria == categoria)
+
+    return [
+        {
+            "periodo": linha.periodo,
+            "categoria": linha.categoria,
+            "locacoes": int(linha.locacoes),
+            "faturamento": float(linha.faturamento),
+        }
+        for linha in db.execute(query)
+    ]
@@ -0,0 +1,305 @@
+import codecs
+import csv
+import json
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from ..models.Veiculos import Veiculo, CategoriaVeiculo, StatusVeiculo
+from ..Schemas.Veiculos import VeiculoCreate
+from ..utils.cache_catalogo import alteracao_de, registrar_alteracoes_catalogo
+from . import contadores_service
+from .disponibilidade_service import calendario_frota
+
+# Linhas por INSERT/commit (12 colunas por linha: bem abaixo do limite de parâmetros)
+TAMANHO_LOTE = min(int(os.getenv("IMPORTACAO_TAMANHO_LOTE", "500")), 2000)
+# Máximo de erros devolvidos no relatório (os demais só entram na contagem)
+MAXIMO_ERROS = int(os.getenv("IMPORTACAO_MAXIMO_ERROS", "1000"))
+# Uma linha (ou registro CSV de várias linhas) maior que isso é rejeitada em vez de crescer o buffer sem limite
+TAMANHO_MAXIMO_LINHA = 64 * 1024
+
+async def _linhas(corpo: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """
+    Quebra o corpo em linhas à medida que chega, sem juntar o arquivo inteiro.
+    Uma linha maior que TAMANHO_MAXIMO_LINHA é descartada até a próxima quebra
+    e sai como None, para virar um erro no relatório sem interromper a importação.
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    resto = ""
+    descartando = False
+    async for bloco in corpo:
+        *completas, resto = (resto + decodificador.decode(bloco)).split("\n")
+        for linha in completas:
+            if descartando or len(linha) > TAMANHO_MAXIMO_LINHA:
+                descartando = False
+                yield None
+            else:
+                yield linha.rstrip("\r")
+        if len(resto) > TAMANHO_MAXIMO_LINHA:
+            descartando = True
+        if descartando:
+            resto = ""
+    resto += decodificador.decode(b"", final=True)
+    if descartando or len(resto) > TAMANHO_MAXIMO_LINHA:
+        yield None
+    elif resto:
+        yield resto.rstrip("\r")
+
+LINHA_GRANDE = "Linha excede o tamanho máximo de 64 KB"
+REGISTRO_GRANDE = "Registro excede o tamanho máximo de 64 KB"
+
+async def _registros_csv(corpo: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    (número da linha onde começa, texto, erro) de cada registro CSV. Um campo
+    entre aspas pode conter quebras de linha: as linhas são juntadas até as
+    aspas fecharem. Como aspas dentro do campo vêm dobradas, a paridade da
+    contagem diz se o registro ainda está aberto. Um registro maior que
+    TAMANHO_MAXIMO_LINHA sai só com o erro: as linhas dele continuam sendo lidas,
+    sem guardar, até as aspas fecharem.
+    """
+    partes: List[str] = []
+    tamanho = 0
+    aberto = descartado = em_registro = False
+    inicio = numero = 0
+    async for linha in _linhas(corpo):
+        numero += 1
+        if not em_registro:
+            inicio, em_registro = numero, True
+        if linha is None:
+            # Sem a linha não dá para saber se as aspas fecham nela: o registro termina aqui
+            yield inicio, None, LINHA_GRANDE
+            partes, tamanho, aberto, descartado, em_registro = [], 0, False, False, False
+            continue
+        aberto ^= linha.count('"') % 2 == 1
+        if not descartado:
+            tamanho += len(linha) + (1 if partes else 0)
+            partes.append(linha)
+            if tamanho > TAMANHO_MAXIMO_LINHA:
+                descartado, partes = True, []
+        if aberto:
+            continue
+        if descartado:
+            yield inicio, None, REGISTRO_GRANDE
+        else:
+            yield inicio, "\n".join(partes), None
+        partes, tamanho, descartado, em_registro = [], 0, False, False
+    if em_registro:
+        yield inicio, None, REGISTRO_GRANDE if descartado else "Aspas não fechadas até o fim do arquivo"
+
+async def _registros(
+    corpo: AsyncIterator[bytes], formato: str
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """(número da linha, registro, erro de leitura). CSV com cabeçalho; NDJSON: um objeto por linha."""
+    if formato == "csv":
+        cabecalho = None
+        async for numero, texto, falha in _registros_csv(corpo):
+            if falha is not None:
+                yield numero, None, falha
+                continue
+            if not texto.strip():
+                continue
+            campos = next(csv.reader([texto]))
+            if cabecalho is None:
+                cabecalho = [campo.strip() for campo in campos]
+                continue
+            if len(campos) != len(cabecalho):
+                yield numero, None, "Quantidade de colunas diferente do cabeçalho"
+                continue
+            yield numero, {k: (v if v != "" else None) for k, v in zip(cabecalho, campos)}, None
+        return
+
+    numero = 0
+    async for linha in _linhas(corpo):
+        numero += 1
+        if linha is None:
+            yield numero, None, LINHA_GRANDE
+            continue
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            yield numero, None, "JSON inválido"
+            continue
+        if not isinstance(registro, dict):
+            yield numero, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield numero, registro, None
+
+# Limites das colunas String(n): checados antes para um valor longo não derrubar o lote
+_TAMANHOS_COLUNAS = {
+    coluna.name: coluna.type.length
+    for coluna in Veiculo.__table__.columns
+    if isinstance(coluna.type, String) and coluna.type.length
+}
+
+def _excede_tamanho(dados: Dict[str, Any]) -> Optional[str]:
+    for campo, limite in _TAMANHOS_COLUNAS.items():
+        valor = dados.get(campo)
+        if isinstance(valor, str) and len(valor) > limite:
+            return f"{campo}: máximo de {limite} caracteres"
+    return None
+
+def _mensagem_validacao(erro: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in erro.errors()
+    )
+
+def gravar_lote(db: Session, veiculos: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Insere os veículos em um único INSERT multi-linha com ON CONFLICT (placa)
+    DO NOTHING e atualiza os contadores (sem commit). Devolve (id, placa,
+    categoria, status) das linhas inseridas; placas ausentes já existiam.
+    """
+    if not veiculos:
+        return []
+    agora = datetime.utcnow()
+    linhas = [
+        {
+            **dados,
+            "id": str(uuid.uuid4()),
+            "categoria": CategoriaVeiculo(dados["categoria"]),
+            "status": StatusVeiculo(dados.get("status") or StatusVeiculo.DISPONIVEL),
+            "quilometragem": 0.0,
+            "ativo": True,
+            "criado_em": agora,
+            "atualizado_em": agora,
+        }
+        for dados in veiculos
+    ]
+    stmt = (
+        pg_insert(Veiculo)
+        .values(linhas)
+        .on_conflict_do_nothing(index_elements=[Veiculo.placa])
+        .returning(Veiculo.id, Veiculo.placa, Veiculo.categoria, Veiculo.status)
+    )
+    inseridos = db.execute(stmt).all()
+
+    por_status = Counter(linha.status for linha in inseridos)
+    deltas = {
+        contadores_service.VEICULOS_TOTAL: len(inseridos),
+        contadores_service.CATALOGO_VERSAO: 1 if inseridos else 0,
+    }
+    for status, quantidade in por_status.items():
+        deltas[contadores_service.chave_status_veiculo(status)] = quantidade
+    contadores_service.incrementar(db, deltas)
+    # INSERT em lote não passa pelos eventos do ORM: avisa o cache do catálogo
+    registrar_alteracoes_catalogo(db, [
+        alteracao_de(linha.id, [linha.categoria], [linha.status]) for linha in inseridos
+    ])
+    return inseridos
+
+class RelatorioImportacao:
+    def __init__(self):
+        self.recebidas = 0
+        self.inseridas = 0
+        self.rejeitadas = 0
+        self.erros: List[Dict[str, Any]] = []
+
+    def rejeitar(self, linha: int, motivo: str, placa: Optional[str] = None):
+        self.rejeitadas += 1
+        if len(self.erros) < MAXIMO_ERROS:
+            self.erros.append({"linha": linha, "placa": placa, "motivo": motivo})
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "recebidas": self.recebidas,
+            "inseridas": self.inseridas,
+            "rejeitadas": self.rejeitadas,
+            "erros": sorted(self.erros, key=lambda e: e["linha"]),
+            "erros_truncados": self.rejeitadas > len(self.erros),
+        }
+
+def _mensagem_banco(erro: DBAPIError) -> str:
+    """Primeira linha da mensagem do driver, sem o nome da classe que o asyncpg prefixa"""
+    texto = str(erro.orig).strip()
+    mensagem = texto.splitlines()[0] if texto else type(erro.orig).__name__
+    if mensagem.startswith("<class "):
+        mensagem = mensagem.split(">: ", 1)[-1]
+    return f"Recusado pelo banco: {mensagem}"
+
+async def _gravar(db, veiculos: List[Dict[str, Any]]) -> List[Any]:
+    inseridos = await db.run_sync(gravar_lote, veiculos)
+    await db.commit()
+    return inseridos
+
+async def _descarregar(db, lote: List[Tuple[int, Dict[str, Any]]], relatorio: RelatorioImportacao):
+    recusadas = set()
+    try:
+        inseridos = await _gravar(db, [dados for _, dados in lote])
+    except DBAPIError as e:
+        await db.rollback()
+        if e.connection_invalidated:
+            raise
+        # Um valor que passa no schema mas o banco recusa (ex.: ano fora do int4)
+        # derruba o lote inteiro: regrava linha a linha para achar as culpadas
+        inseridos = []
+        for numero, dados in lote:
+            try:
+                inseridos += await _gravar(db, [dados])
+            except DBAPIError as e_linha:
+                await db.rollback()
+                if e_linha.connection_invalidated:
+                    raise
+                relatorio.rejeitar(numero, _mensagem_banco(e_linha), dados["placa"])
+                recusadas.add(numero)
+
+    for linha in inseridos:
+        calendario_frota.registrar_veiculo(linha.id, linha.categoria)
+    relatorio.inseridas += len(inseridos)
+    placas_inseridas = {linha.placa for linha in inseridos}
+    for numero, dados in lote:
+        if numero not in recusadas and dados["placa"] not in placas_inseridas:
+            relatorio.rejeitar(numero, "Placa já cadastrada", dados["placa"])
+
+async def importar_veiculos(db, corpo: AsyncIterator[bytes], formato: str) -> Dict[str, Any]:
+    """
+    Importa veículos de um corpo CSV ou NDJSON lido em streaming. Valida cada
+    linha com VeiculoCreate e grava em lotes de TAMANHO_LOTE, um commit por lote:
+    lotes já gravados permanecem mesmo se o envio for interrompido depois.
+    """
+    relatorio = RelatorioImportacao()
+    # Só as placas (não as linhas) ficam em memória, para achar repetidas no arquivo
+    placas_vistas: Dict[str, int] = {}
+    lote: List[Tuple[int, Dict[str, Any]]] = []
+
+    async for numero, registro, falha in _registros(corpo, formato):
+        relatorio.recebidas += 1
+        if falha is not None:
+            relatorio.rejeitar(numero, falha)
+            continue
+        try:
+            veiculo = VeiculoCreate.model_validate(registro)
+        except ValidationError as e:
+            placa = registro.get("placa")
+            relatorio.rejeitar(numero, _mensagem_validacao(e), str(placa) if placa is not None else None)
+            continue
+
+        dados = veiculo.model_dump()
+        excedido = _excede_tamanho(dados)
+        if excedido is not None:
+            relatorio.rejeitar(numero, excedido, veiculo.placa)
+            continue
+
+        primeira = placas_vistas.get(veiculo.placa)
+        if primeira is not None:
+            relatorio.rejeitar(numero, f"Placa repetida no arquivo (linha {primeira})", veiculo.placa)
+            continue
+        placas_vistas[veiculo.placa] = numero
+
+        lote.append((numero, dados))
+        if len(lote) >= TAMANHO_LOTE:
+            await _descarregar(db, lote, relatorio)
+            lote = []
+
+    if lote:
+        await _descarregar(db, lote, relatorio)
+    return relatorio.resumo()
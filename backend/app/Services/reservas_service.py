@@ -0,0 +1,528 @@
+import asyncio
+import enum
+import os
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Boolean, Connection, Integer, String, column, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from ..models.Reservar import Reserva
+from ..models.Veiculos import Veiculo, StatusVeiculo, StatusLocacao
+from ..utils.cache_catalogo import (
+    CANAL, MAXIMO_ALTERACOES_NOTIFICADAS, alteracao_de, anotar_alteracoes_catalogo, registrar_alteracoes_catalogo,
+)
+from . import contadores_service, faturamento_service
+
+# SQLSTATE do Postgres para violação de constraint de exclusão
+EXCLUSION_VIOLATION = "23P01"
+# Erros que passam ao tentar de novo: veículo travado por outra reserva (NOWAIT),
+# falha de serialização (banco com default_transaction_isolation serializable) e deadlock
+ERROS_TRANSITORIOS = {"55P03", "40001", "40P01"}
+
+# Tentativas quando o veículo está travado; esgotadas, a rota responde 409
+TENTATIVAS = int(os.getenv("RESERVA_TENTATIVAS", "4"))
+# Espera antes da 2ª tentativa (dobra a cada nova), com jitter de ±50%
+ESPERA_BASE_SEGUNDOS = float(os.getenv("RESERVA_ESPERA_BASE_MS", "5")) / 1000
+
+COLUNAS_RESERVA = [
+    "res_id", "res_vei_id", "res_cli_id", "res_data_inicio", "res_data_fim", "res_status", "res_total",
+]
+
+class MotivoRecusa(str, enum.Enum):
+    NAO_ENCONTRADO = "nao_encontrado"
+    INDISPONIVEL = "indisponivel"
+    CONFLITO = "conflito"
+    # Veículo travado por outra reserva em andamento (transitório)
+    OCUPADO = "ocupado"
+    # Só na reserva em lote
+    PERIODO_INVALIDO = "periodo_invalido"
+    REPETIDO = "repetido"
+    # Só na troca de status em lote
+    TRANSICAO_INVALIDA = "transicao_invalida"
+
+class ResultadoReserva(NamedTuple):
+    """A reserva criada (colunas de LocacaoResponse) ou o motivo da recusa"""
+    reserva: Optional[Dict[str, Any]]
+    motivo: Optional[MotivoRecusa] = None
+
+class ItemLote(NamedTuple):
+    veiculo_id: str
+    inicio: datetime
+    fim: datetime
+    dias: int
+
+class ResultadoLote(NamedTuple):
+    """
+    Um ResultadoReserva por item, na ordem do pedido, ou o motivo da recusa do
+    lote inteiro (ex.: OCUPADO). No modo tudo ou nada recusado, os itens sem
+    problema voltam sem reserva e sem motivo.
+    """
+    itens: List[ResultadoReserva]
+    motivo: Optional[MotivoRecusa] = None
+
+class ResultadoTransicao(NamedTuple):
+    """A reserva já com o novo status (colunas de LocacaoResponse) ou o motivo da recusa"""
+    res_id: str
+    reserva: Optional[Dict[str, Any]]
+    motivo: Optional[MotivoRecusa] = None
+
+# Troca de status (check-in/check-out, por reserva ou em lote): de onde cada status pode vir
+TRANSICOES_PERMITIDAS = {
+    StatusLocacao.ATIVA: (StatusLocacao.RESERVADA,),
+    StatusLocacao.FINALIZADA: (StatusLocacao.ATIVA,),
+    StatusLocacao.CANCELADA: (StatusLocacao.RESERVADA,),
+}
+# Status do veículo depois da troca, como em PATCH /api/reservas/{id}/status
+STATUS_VEICULO_APOS = {
+    StatusLocacao.ATIVA: StatusVeiculo.LOCADO,
+    StatusLocacao.FINALIZADA: StatusVeiculo.DISPONIVEL,
+    StatusLocacao.CANCELADA: StatusVeiculo.DISPONIVEL,
+}
+
+# Checagem e gravação da reserva em uma instrução (CTEs que modificam dados):
+# - veiculo: trava a linha do veículo sem esperar (NOWAIT). Numa rajada sobre o
+#   mesmo veículo, quem chega com a linha travada falha na hora (55P03) em vez de
+#   ficar parado no lock segurando uma conexão do pool, e tenta de novo depois;
+# - conflito: há reserva RESERVADA/ATIVA do veículo com período sobreposto?
+#   (o mesmo critério da constraint ex_reservas_veiculo_periodo);
+# - nova: só produz linha se o veículo está DISPONIVEL e não há conflito; o
+#   total vem da diária lida na própria instrução;
+# - locado, incremento, notificacao: marcam o veículo como LOCADO, ajustam os
+#   contadores do dashboard e avisam os caches do catálogo (mesmo payload de
+#   registrar_alteracoes_catalogo), cada um só se `nova` inseriu. A CTE de SELECT
+#   só roda se for referenciada, daí a contagem no SELECT final.
+# Devolve uma linha com o status/categoria do veículo, o conflito e as colunas da
+# reserva (nulas se recusada), ou nenhuma linha se o veículo não existe.
+# Em SQL textual, e não montada com o Core, porque o SQLAlchemy 2.0.23 não põe em
+# cache a compilação de VALUES/ON CONFLICT: seriam ~8 ms de compilação por reserva.
+_STATUS_LOCACAO = Reserva.res_status.type.name
+_STATUS_VEICULO = Veiculo.status.type.name
+INSTRUCAO_RESERVA = text(f"""
+WITH veiculo AS (
+    SELECT id, status, categoria, valor_diaria
+    FROM veiculos
+    WHERE id = CAST(:veiculo_id AS varchar)
+    FOR UPDATE NOWAIT
+),
+conflito AS (
+    SELECT EXISTS (
+        SELECT 1 FROM reservas
+        WHERE res_vei_id = CAST(:veiculo_id AS varchar)
+          AND res_status IN ('RESERVADA', 'ATIVA')
+          AND res_periodo && tstzrange(CAST(:inicio AS timestamptz), CAST(:fim AS timestamptz), '[]')
+    ) AS existe
+),
+nova AS (
+    INSERT INTO reservas (res_id, res_vei_id, res_cli_id, res_data_inicio, res_data_fim, res_status, res_total)
+    SELECT CAST(:res_id AS varchar), veiculo.id, CAST(:cliente_id AS varchar),
+           CAST(:inicio AS timestamptz), CAST(:fim AS timestamptz),
+           CAST('RESERVADA' AS {_STATUS_LOCACAO}), veiculo.valor_diaria * CAST(:dias AS integer)
+    FROM veiculo, conflito
+    WHERE veiculo.status = 'DISPONIVEL' AND NOT conflito.existe
+    RETURNING res_id, res_vei_id, res_cli_id, res_data_inicio, res_data_fim, res_status, res_total
+),
+locado AS (
+    UPDATE veiculos
+    SET status = CAST('LOCADO' AS {_STATUS_VEICULO}), atualizado_em = CAST(:agora AS timestamp)
+    FROM nova
+    WHERE veiculos.id = nova.res_vei_id
+),
+incremento AS (
+    INSERT INTO contadores (chave, valor, atualizado_em)
+    SELECT deltas.chave, deltas.valor, CAST(:agora AS timestamp)
+    FROM nova, unnest(CAST(:chaves AS varchar[]), CAST(:deltas AS float8[])) AS deltas (chave, valor)
+    ON CONFLICT (chave) DO UPDATE
+    SET valor = contadores.valor + excluded.valor, atualizado_em = excluded.atualizado_em
+),
+notificacao AS (
+    SELECT pg_notify(CAST(:canal AS text), CAST(json_build_array(json_build_array(
+        veiculo.id, json_build_array(veiculo.categoria), json_build_array('DISPONIVEL', 'LOCADO')
+    )) AS text))
+    FROM nova, veiculo
+)
+SELECT veiculo.status AS veiculo_status, veiculo.categoria, conflito.existe AS conflito,
+       (SELECT count(*) FROM notificacao) AS notificacoes,
+       nova.res_id, nova.res_vei_id, nova.res_cli_id, nova.res_data_inicio, nova.res_data_fim,
+       nova.res_status, nova.res_total
+FROM veiculo CROSS JOIN conflito LEFT JOIN nova ON true
+""").columns(
+    column("veiculo_status", Veiculo.status.type),
+    column("categoria", Veiculo.categoria.type),
+    column("conflito", Boolean),
+    column("notificacoes", Integer),
+    *(column(nome, Reserva.__table__.c[nome].type) for nome in COLUNAS_RESERVA),
+)
+
+# A mesma reserva para vários veículos, em conjunto. Os itens chegam em arrays
+# (unnest), com o índice no pedido:
+# - veiculo: trava de uma vez, em ordem de id e sem esperar, os veículos pedidos;
+# - avaliado: o motivo da recusa de cada item (nulo se pode reservar), com a
+#   mesma regra de INSTRUCAO_RESERVA; um veículo que aparece de novo no lote é
+#   recusado como repetido;
+# - nova: um INSERT de várias linhas com os itens aceitos; com :tudo_ou_nada,
+#   nenhum se algum item foi recusado (aqui ou antes, :recusado);
+# - locado, incremento, notificacao: um UPDATE para todos os veículos, os
+#   contadores multiplicados pelo número de reservas e um NOTIFY só (acima de
+#   :maximo_notificado veículos, "*", que limpa o cache inteiro).
+# Devolve uma linha por item, com o motivo ou as colunas da reserva.
+INSTRUCAO_RESERVA_LOTE = text(f"""
+WITH pedido AS (
+    SELECT p.*, row_number() OVER (PARTITION BY p.veiculo_id ORDER BY p.indice) AS ordem
+    FROM unnest(
+        CAST(:indices AS integer[]), CAST(:veiculo_ids AS varchar[]), CAST(:inicios AS timestamptz[]),
+        CAST(:fins AS timestamptz[]), CAST(:dias AS integer[]), CAST(:res_ids AS varchar[])
+    ) AS p (indice, veiculo_id, inicio, fim, dias, res_id)
+),
+veiculo AS (
+    SELECT id, status, categoria, valor_diaria
+    FROM veiculos
+    WHERE id = ANY(CAST(:veiculo_ids AS varchar[]))
+    ORDER BY id
+    FOR UPDATE NOWAIT
+),
+avaliado AS (
+    SELECT pedido.*, veiculo.categoria, veiculo.valor_diaria,
+           CASE
+               WHEN veiculo.id IS NULL THEN 'nao_encontrado'
+               WHEN pedido.ordem > 1 THEN 'repetido'
+               WHEN veiculo.status <> 'DISPONIVEL' THEN 'indisponivel'
+               WHEN EXISTS (
+                   SELECT 1 FROM reservas
+                   WHERE res_vei_id = pedido.veiculo_id
+                     AND res_status IN ('RESERVADA', 'ATIVA')
+                     AND res_periodo && tstzrange(pedido.inicio, pedido.fim, '[]')
+               ) THEN 'conflito'
+           END AS motivo
+    FROM pedido LEFT JOIN veiculo ON veiculo.id = pedido.veiculo_id
+),
+nova AS (
+    INSERT INTO reservas (res_id, res_vei_id, res_cli_id, res_data_inicio, res_data_fim, res_status, res_total)
+    SELECT res_id, veiculo_id, CAST(:cliente_id AS varchar), inicio, fim,
+           CAST('RESERVADA' AS {_STATUS_LOCACAO}), valor_diaria * dias
+    FROM avaliado
+    WHERE motivo IS NULL
+      AND NOT (CAST(:tudo_ou_nada AS boolean) AND (
+          CAST(:recusado AS boolean) OR EXISTS (SELECT 1 FROM avaliado WHERE motivo IS NOT NULL)
+      ))
+    RETURNING res_id, res_vei_id, res_cli_id, res_data_inicio, res_data_fim, res_status, res_total
+),
+locado AS (
+    UPDATE veiculos
+    SET status = CAST('LOCADO' AS {_STATUS_VEICULO}), atualizado_em = CAST(:agora AS timestamp)
+    FROM nova
+    WHERE veiculos.id = nova.res_vei_id
+),
+total AS (
+    SELECT count(*) AS reservas FROM nova
+),
+incremento AS (
+    INSERT INTO contadores (chave, valor, atualizado_em)
+    SELECT deltas.chave, deltas.valor * total.reservas, CAST(:agora AS timestamp)
+    FROM total, unnest(CAST(:chaves AS varchar[]), CAST(:deltas AS float8[])) AS deltas (chave, valor)
+    WHERE total.reservas > 0
+    ON CONFLICT (chave) DO UPDATE
+    SET valor = contadores.valor + excluded.valor, atualizado_em = excluded.atualizado_em
+),
+notificacao AS (
+    SELECT pg_notify(CAST(:canal AS text), CASE
+        WHEN count(*) > CAST(:maximo_notificado AS integer) THEN '*'
+        ELSE CAST(json_agg(json_build_array(
+            avaliado.veiculo_id, json_build_array(avaliado.categoria), json_build_array('DISPONIVEL', 'LOCADO')
+        )) AS text)
+    END)
+    FROM nova JOIN avaliado ON avaliado.res_id = nova.res_id
+    HAVING count(*) > 0
+)
+SELECT avaliado.indice, avaliado.categoria, avaliado.motivo,
+       (SELECT count(*) FROM notificacao) AS notificacoes,
+       nova.res_id, nova.res_vei_id, nova.res_cli_id, nova.res_data_inicio, nova.res_data_fim,
+       nova.res_status, nova.res_total
+FROM avaliado LEFT JOIN nova ON nova.res_id = avaliado.res_id
+ORDER BY avaliado.indice
+""").columns(
+    column("indice", Integer),
+    column("categoria", Veiculo.categoria.type),
+    column("motivo", String),
+    column("notificacoes", Integer),
+    *(column(nome, Reserva.__table__.c[nome].type) for nome in COLUNAS_RESERVA),
+)
+
+# Troca de status de várias reservas, na transação da sessão:
+# - atual: trava as reservas pedidas (em ordem de id) e guarda o status de antes;
+# - alterada: um UPDATE para todas cuja transição está em :origens (com
+#   data_devolucao em :devolucao, se dada);
+# - veiculo_antes/veiculo_novo: trava os veículos das reservas alteradas e, com
+#   :status_veiculo, os atualiza em um UPDATE, guardando status e categoria de antes.
+# Devolve uma linha por id pedido, na ordem: status de antes (nulo se a reserva
+# não existe), as colunas da reserva se alterada e os dados de antes do veículo.
+INSTRUCAO_STATUS_LOTE = text(f"""
+WITH atual AS (
+    SELECT res_id, res_status AS anterior
+    FROM reservas
+    WHERE res_id = ANY(CAST(:ids AS varchar[]))
+    ORDER BY res_id
+    FOR UPDATE
+),
+alterada AS (
+    UPDATE reservas
+    SET res_status = CAST(:novo AS {_STATUS_LOCACAO}),
+        data_devolucao = COALESCE(CAST(:devolucao AS timestamptz), reservas.data_devolucao),
+        res_atualizado_em = now()
+    FROM atual
+    WHERE reservas.res_id = atual.res_id
+      AND atual.anterior = ANY(CAST(:origens AS {_STATUS_LOCACAO}[]))
+    RETURNING reservas.res_id, reservas.res_vei_id, reservas.res_cli_id, reservas.res_data_inicio,
+              reservas.res_data_fim, reservas.res_status, reservas.res_total
+),
+veiculo_antes AS (
+    SELECT id, status, categoria
+    FROM veiculos
+    WHERE id IN (SELECT res_vei_id FROM alterada)
+    ORDER BY id
+    FOR UPDATE
+),
+veiculo_novo AS (
+    UPDATE veiculos
+    SET status = CAST(:status_veiculo AS {_STATUS_VEICULO}), atualizado_em = CAST(:agora AS timestamp)
+    FROM veiculo_antes
+    WHERE veiculos.id = veiculo_antes.id
+      AND veiculo_antes.status <> CAST(:status_veiculo AS {_STATUS_VEICULO})
+    RETURNING veiculos.id
+)
+SELECT pedido.res_id AS pedido_id, atual.anterior,
+       veiculo_antes.status AS veiculo_status, veiculo_antes.categoria,
+       (SELECT count(*) FROM veiculo_novo) AS veiculos_alterados,
+       alterada.res_id, alterada.res_vei_id, alterada.res_cli_id, alterada.res_data_inicio,
+       alterada.res_data_fim, alterada.res_status, alterada.res_total
+FROM unnest(CAST(:ids AS varchar[])) WITH ORDINALITY AS pedido (res_id, ordem)
+LEFT JOIN atual ON atual.res_id = pedido.res_id
+LEFT JOIN alterada ON alterada.res_id = pedido.res_id
+LEFT JOIN veiculo_antes ON veiculo_antes.id = alterada.res_vei_id
+ORDER BY pedido.ordem
+""").columns(
+    column("pedido_id", String),
+    column("anterior", Reserva.res_status.type),
+    column("veiculo_status", Veiculo.status.type),
+    column("categoria", Veiculo.categoria.type),
+    column("veiculos_alterados", Integer),
+    *(column(nome, Reserva.__table__.c[nome].type) for nome in COLUNAS_RESERVA),
+)
+
+# Chaves ordenadas, como em contadores_service.incrementar
+_DELTAS_RESERVA = sorted(
+    contadores_service.deltas_status_veiculo(StatusVeiculo.DISPONIVEL, StatusVeiculo.LOCADO).items()
+)
+
+def _parametros_comuns() -> Dict[str, Any]:
+    return {
+        "agora": datetime.utcnow(),
+        "chaves": [chave for chave, _ in _DELTAS_RESERVA],
+        "deltas": [float(delta) for _, delta in _DELTAS_RESERVA],
+        "canal": CANAL,
+    }
+
+def parametros_reserva(
+    cliente_id: str, veiculo_id: str, inicio: datetime, fim: datetime, dias: int
+) -> Dict[str, Any]:
+    return {
+        "res_id": str(uuid.uuid4()),
+        "cliente_id": cliente_id,
+        "veiculo_id": veiculo_id,
+        "inicio": inicio,
+        "fim": fim,
+        "dias": dias,
+        **_parametros_comuns(),
+    }
+
+@contextmanager
+def _autocommit(conexao: Connection):
+    """
+    Autocommit direto na conexão do driver, como o pre-ping do SQLAlchemy faz: a
+    opção isolation_level="AUTOCOMMIT" custaria, no psycopg2, um SET
+    default_transaction_isolation ao trocar e outro ao devolver a conexão ao pool.
+    O commit antes fecha a transação que um listener de "connect" (SET search_path,
+    statement_timeout...) deixa aberta numa conexão nova, e que impediria a troca;
+    sem transação aberta, o driver nem vai ao banco.
+    """
+    driver = conexao.connection.dbapi_connection
+    driver.commit()
+    driver.autocommit = True
+    try:
+        yield
+    finally:
+        if not conexao.invalidated:
+            driver.autocommit = False
+
+def _executar(db: Session, instrucao, parametros: Dict[str, Any]) -> Tuple[list, Optional[MotivoRecusa]]:
+    """
+    Roda a instrução em autocommit (é atômica por si só), sem BEGIN/COMMIT.
+    Devolve as linhas ou, se o banco recusou a instrução inteira, o motivo.
+    """
+    if db.in_transaction():
+        # A sessão já consultou algo (ex.: autenticação sem cache): encerra essa transação
+        db.commit()
+    conexao = db.connection()
+    try:
+        with _autocommit(conexao):
+            return conexao.execute(instrucao, parametros).all(), None
+    except DBAPIError as e:
+        db.rollback()
+        codigo = getattr(e.orig, "pgcode", None)
+        if codigo == EXCLUSION_VIOLATION:
+            return [], MotivoRecusa.CONFLITO
+        if codigo in ERROS_TRANSITORIOS:
+            return [], MotivoRecusa.OCUPADO
+        raise
+
+def reservar(db: Session, cliente_id: str, veiculo_id: str, inicio: datetime, fim: datetime, dias: int) -> ResultadoReserva:
+    """
+    Cria a reserva com uma ida ao banco: a instrução roda em autocommit, sem
+    BEGIN/COMMIT e sem o SELECT do refresh. A constraint de exclusão continua
+    valendo como última barreira.
+    """
+    linhas, motivo = _executar(db, INSTRUCAO_RESERVA, parametros_reserva(cliente_id, veiculo_id, inicio, fim, dias))
+    if motivo is not None:
+        return ResultadoReserva(None, motivo)
+
+    linha = linhas[0] if linhas else None
+    if linha is None:
+        resultado = ResultadoReserva(None, MotivoRecusa.NAO_ENCONTRADO)
+    elif linha.res_id is not None:
+        anotar_alteracoes_catalogo(db, [alteracao_de(
+            linha.res_vei_id, [linha.categoria], [StatusVeiculo.DISPONIVEL, StatusVeiculo.LOCADO]
+        )])
+        resultado = ResultadoReserva({nome: getattr(linha, nome) for nome in COLUNAS_RESERVA})
+    elif linha.veiculo_status != StatusVeiculo.DISPONIVEL:
+        resultado = ResultadoReserva(None, MotivoRecusa.INDISPONIVEL)
+    else:
+        resultado = ResultadoReserva(None, MotivoRecusa.CONFLITO)
+    # Fecha a transação da sessão (em autocommit não vai ao banco) e invalida o cache local
+    db.commit()
+    return resultado
+
+def reservar_lote(db: Session, cliente_id: str, itens: List[ItemLote], tudo_ou_nada: bool) -> ResultadoLote:
+    """
+    Reserva vários veículos com uma instrução (INSTRUCAO_RESERVA_LOTE). Itens
+    com período inválido nem vão ao banco; no modo tudo ou nada, os demais
+    ainda são avaliados, para a resposta listar todas as falhas, mas nada é
+    gravado.
+    """
+    resultados = [
+        ResultadoReserva(None, MotivoRecusa.PERIODO_INVALIDO if item.dias <= 0 else None) for item in itens
+    ]
+    validos = [i for i, item in enumerate(itens) if item.dias > 0]
+    if not validos:
+        return ResultadoLote(resultados)
+
+    linhas, motivo = _executar(db, INSTRUCAO_RESERVA_LOTE, {
+        "cliente_id": cliente_id,
+        "tudo_ou_nada": tudo_ou_nada,
+        "recusado": len(validos) < len(itens),
+        "maximo_notificado": MAXIMO_ALTERACOES_NOTIFICADAS,
+        "indices": validos,
+        "veiculo_ids": [itens[i].veiculo_id for i in validos],
+        "inicios": [itens[i].inicio for i in validos],
+        "fins": [itens[i].fim for i in validos],
+        "dias": [itens[i].dias for i in validos],
+        "res_ids": [str(uuid.uuid4()) for _ in validos],
+        **_parametros_comuns(),
+    })
+    if motivo is not None:
+        return ResultadoLote([], motivo)
+
+    alteracoes = []
+    for linha in linhas:
+        if linha.res_id is not None:
+            alteracoes.append(alteracao_de(
+                linha.res_vei_id, [linha.categoria], [StatusVeiculo.DISPONIVEL, StatusVeiculo.LOCADO]
+            ))
+            resultados[linha.indice] = ResultadoReserva({nome: getattr(linha, nome) for nome in COLUNAS_RESERVA})
+        elif linha.motivo is not None:
+            resultados[linha.indice] = ResultadoReserva(None, MotivoRecusa(linha.motivo))
+    if alteracoes:
+        anotar_alteracoes_catalogo(db, alteracoes if len(alteracoes) <= MAXIMO_ALTERACOES_NOTIFICADAS else None)
+    db.commit()
+    return ResultadoLote(resultados)
+
+def alterar_status_lote(db: Session, reserva_ids: List[str], novo: StatusLocacao) -> List[ResultadoTransicao]:
+    """
+    Troca o status de várias reservas (e dos seus veículos) em uma transação:
+    a instrução INSTRUCAO_STATUS_LOTE valida as transições e faz os dois
+    UPDATEs; contadores, rollup de faturamento e catálogo recebem as
+    alterações somadas, uma escrita cada. Ids repetidos contam uma vez.
+    """
+    ids = list(dict.fromkeys(reserva_ids))
+    status_veiculo = STATUS_VEICULO_APOS.get(novo)
+    agora = datetime.utcnow()
+    linhas = db.execute(INSTRUCAO_STATUS_LOTE, {
+        "ids": ids,
+        "novo": novo.value,
+        "origens": [status.value for status in TRANSICOES_PERMITIDAS.get(novo, ())],
+        "devolucao": agora.replace(tzinfo=timezone.utc) if novo == StatusLocacao.FINALIZADA else None,
+        "status_veiculo": status_veiculo.value if status_veiculo is not None else None,
+        "agora": agora,
+    }).all()
+
+    resultados, deltas, transicoes, veiculos = [], [], [], {}
+    for linha in linhas:
+        if linha.anterior is None:
+            resultados.append(ResultadoTransicao(linha.pedido_id, None, MotivoRecusa.NAO_ENCONTRADO))
+            continue
+        if linha.res_id is None:
+            resultados.append(ResultadoTransicao(linha.pedido_id, None, MotivoRecusa.TRANSICAO_INVALIDA))
+            continue
+        resultados.append(ResultadoTransicao(linha.res_id, {nome: getattr(linha, nome) for nome in COLUNAS_RESERVA}))
+        deltas.append(contadores_service.deltas_transicao_reserva(
+            linha.anterior, novo, linha.res_total, linha.res_data_fim
+        ))
+        transicoes.append((linha.anterior, novo, linha.res_total, linha.res_data_fim, linha.categoria))
+        if status_veiculo is not None and linha.veiculo_status != status_veiculo:
+            veiculos[linha.res_vei_id] = (linha.veiculo_status, linha.categoria)
+
+    for veiculo_status, _ in veiculos.values():
+        deltas.append(contadores_service.deltas_status_veiculo(veiculo_status, status_veiculo))
+    contadores_service.incrementar(db, contadores_service.somar_deltas(*deltas))
+    faturamento_service.registrar_transicoes(db, transicoes)
+    registrar_alteracoes_catalogo(db, [
+        alteracao_de(veiculo_id, [categoria], [veiculo_status, status_veiculo])
+        for veiculo_id, (veiculo_status, categoria) in veiculos.items()
+    ])
+    db.commit()
+    return resultados
+
+async def _com_retentativas(db, funcao, *args):
+    """
+    Roda funcao (reservar ou reservar_lote) até TENTATIVAS vezes enquanto o
+    resultado for OCUPADO. A outra reserva termina em uma ida ao banco, então
+    esperas curtas bastam; o jitter evita que os perdedores voltem todos
+    juntos. Entre as tentativas a sessão não segura conexão (a função encerra
+    a transação).
+    """
+    for tentativa in range(TENTATIVAS):
+        if tentativa:
+            espera = ESPERA_BASE_SEGUNDOS * 2 ** (tentativa - 1)
+            await asyncio.sleep(espera * random.uniform(0.5, 1.5))
+        resultado = await db.run_sync(funcao, *args)
+        if resultado.motivo != MotivoRecusa.OCUPADO:
+            break
+    return resultado
+
+async def reservar_com_retentativas(
+    db, cliente_id: str, veiculo_id: str, inicio: datetime, fim: datetime, dias: int
+) -> ResultadoReserva:
+    """
+    reservar() tentando de novo enquanto o veículo estiver travado por outra
+    reserva. Normalmente a segunda tentativa já o encontra LOCADO e a recusa é
+    definitiva.
+    """
+    return await _com_retentativas(db, reservar, cliente_id, veiculo_id, inicio, fim, dias)
+
+async def reservar_lote_com_retentativas(
+    db, cliente_id: str, itens: List[ItemLote], tudo_ou_nada: bool
+) -> ResultadoLote:
+    return await _com_retentativas(db, reservar_lote, cliente_id, itens, tudo_ou_nada)
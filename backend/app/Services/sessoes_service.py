@@ -0,0 +1,109 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.Adm import Admin
+from ..models.Cliente import Cliente
+from ..models.SessaoRefresh import SessaoRefresh
+from ..utils.security import REFRESH_TOKEN_EXPIRE_DAYS
+
+# Dono das sessões de cada tipo: coluna do sujeito e coluna de conta ativa
+_DONOS = {
+    "cliente": (Cliente.cli_email, Cliente.cli_ativo),
+    "admin": (Admin.codigo_admin, Admin.ativo),
+}
+
+def _hash_token(token: str) -> str:
+    # O token já é aleatório (256 bits): SHA-256 basta, sem custo de bcrypt
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def emitir_refresh(
+    db: AsyncSession, tipo: str, sujeito: str, familia: Optional[str] = None, expira_em: Optional[datetime] = None
+) -> str:
+    """
+    Cria um refresh token na sessão (sem commit) e devolve o valor em claro.
+    Uma família nova vale REFRESH_TOKEN_EXPIRE_DAYS; as renovações recebem o
+    expira_em da família, que nunca é estendido.
+    """
+    token = secrets.token_urlsafe(32)
+    agora = datetime.utcnow()
+    db.add(SessaoRefresh(
+        id=str(uuid.uuid4()),
+        token_hash=_hash_token(token),
+        familia=familia or str(uuid.uuid4()),
+        tipo=tipo,
+        sujeito=sujeito,
+        criado_em=agora,
+        expira_em=expira_em or agora + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+async def _dono_ativo(db: AsyncSession, tipo: str, sujeito: str) -> bool:
+    coluna_sujeito, coluna_ativo = _DONOS[tipo]
+    linha = (await db.execute(select(coluna_ativo).where(coluna_sujeito == sujeito))).first()
+    # Linhas antigas sem o campo preenchido contam como ativas (o padrão é True)
+    return linha is not None and linha[0] is not False
+
+async def _revogar_familia(db: AsyncSession, familia: str):
+    await db.execute(
+        update(SessaoRefresh)
+        .where(SessaoRefresh.familia == familia, SessaoRefresh.revogado_em.is_(None))
+        .values(revogado_em=datetime.utcnow())
+    )
+
+async def rotacionar(db: AsyncSession, tipo: str, token: str) -> Optional[Tuple[str, str]]:
+    """
+    Troca um refresh token válido por um novo da mesma família e faz commit.
+    Devolve (sujeito, novo token) ou None se o token não vale. Um token que já
+    foi trocado antes indica vazamento, e uma conta removida ou desativada não
+    renova mais: nos dois casos a família inteira é revogada.
+    """
+    sessao = await db.scalar(
+        select(SessaoRefresh)
+        .where(SessaoRefresh.token_hash == _hash_token(token))
+        .with_for_update()
+    )
+    if sessao is None or sessao.tipo != tipo:
+        return None
+
+    agora = datetime.utcnow()
+    if sessao.revogado_em is not None:
+        if sessao.substituido_por is not None:
+            await _revogar_familia(db, sessao.familia)
+            await db.commit()
+        return None
+    if sessao.expira_em <= agora:
+        return None
+    if not await _dono_ativo(db, tipo, sessao.sujeito):
+        await _revogar_familia(db, sessao.familia)
+        await db.commit()
+        return None
+
+    novo_token = emitir_refresh(db, tipo, sessao.sujeito, sessao.familia, sessao.expira_em)
+    sessao.revogado_em = agora
+    sessao.substituido_por = _hash_token(novo_token)
+    await db.commit()
+    return sessao.sujeito, novo_token
+
+async def revogar(db: AsyncSession, tipo: str, token: str) -> bool:
+    """Logout: revoga a família do token (todas as renovações daquele login)"""
+    sessao = await db.scalar(
+        select(SessaoRefresh).where(SessaoRefresh.token_hash == _hash_token(token))
+    )
+    if sessao is None or sessao.tipo != tipo:
+        return False
+    await _revogar_familia(db, sessao.familia)
+    await db.commit()
+    return True
+
+def remover_expiradas(db: Session) -> int:
+    """Apaga sessões vencidas (usado pelo script de limpeza) e faz commit"""
+    resultado = db.execute(delete(SessaoRefresh).where(SessaoRefresh.expira_em < datetime.utcnow()))
+    db.commit()
+    return resultado.rowcount
@@ -1,15 +1,67 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker, Session
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 import os
+import time
+
+from app.utils.metricas_pool import MedidorPool, QueuePoolMedido, AsyncAdaptedQueuePoolMedido
 
 SQLALCHEMY_DATABASE_URL = os.environ["DATABASE_URL"]
 
+# Caminho de banco das rotas: "sync" (psycopg2 no threadpool) ou "async" (asyncpg no event loop)
+DB_MODO = os.getenv("DB_MODO", "sync").lower()
+
+def _env_bool(nome: str, padrao: str) -> bool:
+    return os.getenv(nome, padrao).lower() in ("1", "true", "sim", "yes")
+
+# Pool de conexões (por processo: com N workers do uvicorn o banco vê N pools)
+POOL_TAMANHO = int(os.getenv("DB_POOL_TAMANHO", "5"))
+POOL_OVERFLOW = int(os.getenv("DB_POOL_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECICLAR = int(os.getenv("DB_POOL_RECICLAR", "1800"))
+# Pre-ping: um SELECT 1 (uma ida e volta a mais) em cada checkout, antes de qualquer
+# instrução. Desligado por padrão: a reserva em uma ida só (e as esperas medidas em
+# /api/metricas/pool) contam sem ele; conexões velhas já são trocadas pelo POOL_RECICLAR.
+# Ligue se o banco ou a rede derrubam conexões ociosas antes disso.
+POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", "false")
+SESSOES_MAXIMAS = POOL_TAMANHO + POOL_OVERFLOW
+# Threads do threadpool do FastAPI; no modo sync cada sessão ocupa no máximo uma
+THREADPOOL_TAMANHO = int(os.getenv("THREADPOOL_TAMANHO", str(SESSOES_MAXIMAS)))
+
+_CONFIG_POOL = dict(
+    pool_size=POOL_TAMANHO,
+    max_overflow=POOL_OVERFLOW,
+    pool_timeout=POOL_TIMEOUT,
+    pool_recycle=POOL_RECICLAR,
+    pool_pre_ping=POOL_PRE_PING,
+)
+
 # CORRETO para PostgreSQL - sem connect_args
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=QueuePoolMedido, **_CONFIG_POOL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def url_assincrona(url: str) -> str:
+    """Troca o driver da URL do Postgres pelo asyncpg"""
+    esquema, resto = url.split("://", 1)
+    return f"postgresql+asyncpg://{resto}" if esquema.startswith("postgres") else url
+
+# Engine assíncrona só existe no modo async; scripts e tarefas de fundo usam a síncrona
+async_engine = (
+    create_async_engine(
+        url_assincrona(SQLALCHEMY_DATABASE_URL), poolclass=AsyncAdaptedQueuePoolMedido, **_CONFIG_POOL
+    )
+    if DB_MODO == "async" else None
+)
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine is not None else None
+)
+
 #função para criar tabela
 def criar_tabelas():
     Base.metadata.create_all(bind=engine)
@@ -19,4 +71,90 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+class SessaoThreadpool:
+    """
+    Expõe a mesma interface (awaitable) do AsyncSession sobre um Session síncrono.
+    Cada operação de banco roda no threadpool, como acontecia com as rotas `def`.
+    Usada pelas rotas quando DB_MODO=sync.
+    """
+
+    def __init__(self, sessao: Session):
+        self.sync_session = sessao
+
+    def add(self, instancia):
+        self.sync_session.add(instancia)
+
+    def add_all(self, instancias):
+        self.sync_session.add_all(instancias)
+
+    def expunge(self, instancia):
+        self.sync_session.expunge(instancia)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def delete(self, instancia):
+        await run_in_threadpool(self.sync_session.delete, instancia)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instancia, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.refresh, instancia, *args, **kwargs)
+
+    async def run_sync(self, funcao, *args, **kwargs):
+        return await run_in_threadpool(funcao, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+# No modo sync a sessão segura a conexão entre um salto e outro no threadpool.
+# Sem limite, as threads podiam ficar todas presas esperando conexões seguradas
+# por sessões que, por sua vez, esperavam uma thread livre. As sessões entram
+# por esta fila, do tamanho do pool, antes de pegar uma conexão.
+_vagas_sessoes = asyncio.Semaphore(SESSOES_MAXIMAS)
+medidor_fila_sessoes = MedidorPool()
+
+def vagas_sessoes_em_uso() -> int:
+    return SESSOES_MAXIMAS - _vagas_sessoes._value
+
+async def get_async_db():
+    """Sessão das rotas `async def`: AsyncSession no modo async, SessaoThreadpool no sync"""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    inicio = time.perf_counter()
+    try:
+        await asyncio.wait_for(_vagas_sessoes.acquire(), POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        medidor_fila_sessoes.registrar(time.perf_counter() - inicio, timeout=True)
+        raise HTTPException(status_code=503, detail="Banco de dados sobrecarregado, tente novamente")
+    medidor_fila_sessoes.registrar(time.perf_counter() - inicio)
+
+    db = SessaoThreadpool(SessionLocal(expire_on_commit=False))
+    try:
+        yield db
+    finally:
+        try:
+            await db.close()
+        finally:
+            _vagas_sessoes.release()
@@ -1,15 +1,25 @@
+import asyncio
+from anyio import to_thread
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles 
 from starlette.responses import FileResponse 
 from pathlib import Path
 
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal, THREADPOOL_TAMANHO
 
 # routers 
-from app.routers import autenticacao, veiculos as veiculos , Dashboard as dashboard
+from app.routers import autenticacao, veiculos as veiculos , dashboard as dashboard
 from app.routers import Cliente as router_cliente
 from app.routers import Reservar as router_reservar
+from app.routers import metricas as router_metricas
+from app.Services.disponibilidade_service import recarregar_calendario, RECARGA_SEGUNDOS
+from app.Services import contadores_service
+from app.utils.cache_catalogo import cache_catalogo, canal_catalogo, CANAL as CANAL_CATALOGO
+from app.utils.cache_principais import cache_principais, canal_principais, CANAL as CANAL_PRINCIPAIS
+from app.utils.escuta_invalidacoes import EscutaInvalidacoes
+from app.utils.idempotencia import MiddlewareIdempotencia
 
 # Criar tabelas
 try:
@@ -24,6 +34,63 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.on_event("startup")
+async def ajustar_threadpool():
+    # Mantém o threadpool das rotas/run_in_threadpool alinhado ao pool de conexões
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_TAMANHO
+
+async def _recarga_periodica_calendario():
+    while True:
+        await asyncio.sleep(RECARGA_SEGUNDOS)
+        try:
+            await run_in_threadpool(recarregar_calendario)
+        except Exception as e:
+            print(f" Erro ao recarregar calendário de disponibilidade: {e}")
+
+@app.on_event("startup")
+async def iniciar_calendario_disponibilidade():
+    try:
+        await run_in_threadpool(recarregar_calendario)
+        print(" Calendário de disponibilidade carregado.")
+    except Exception as e:
+        print(f" Erro ao carregar calendário de disponibilidade: {e}")
+    asyncio.create_task(_recarga_periodica_calendario())
+
+def _inicializar_contadores():
+    db = SessionLocal()
+    try:
+        if contadores_service.contadores_vazios(db):
+            contadores_service.reconciliar_contadores(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def iniciar_contadores_dashboard():
+    # Primeira subida com dados já existentes: preenche os contadores
+    try:
+        await run_in_threadpool(_inicializar_contadores)
+    except Exception as e:
+        print(f" Erro ao inicializar contadores do dashboard: {e}")
+
+# Uma conexão só, em LISTEN nos canais dos caches ligados (capacidade 0 desliga)
+canais_invalidacao = {}
+if cache_catalogo.capacidade > 0:
+    canais_invalidacao[CANAL_CATALOGO] = canal_catalogo
+if cache_principais.capacidade > 0:
+    canais_invalidacao[CANAL_PRINCIPAIS] = canal_principais
+escuta_invalidacoes = EscutaInvalidacoes(engine, canais_invalidacao)
+
+@app.on_event("startup")
+async def iniciar_escuta_invalidacoes():
+    # Invalidações dos caches em memória vindas dos outros workers (LISTEN/NOTIFY)
+    escuta_invalidacoes.iniciar()
+
+@app.on_event("shutdown")
+async def parar_escuta_invalidacoes():
+    escuta_invalidacoes.parar()
+
+# Antes do CORS: as respostas repetidas também recebem os cabeçalhos de CORS
+app.add_middleware(MiddlewareIdempotencia)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -41,6 +108,7 @@ app.include_router(veiculos.router, prefix="/api/veiculos", tags=["Veículos"])
 app.include_router(router_cliente.router, prefix="/api/clientes", tags=["Clientes (Admin)"])
 app.include_router(router_reservar.router, prefix="/api/reservas", tags=["Reservas/Locações"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard (Admin)"])
+app.include_router(router_metricas.router, prefix="/api/metricas", tags=["Métricas (Admin)"])
 
 @app.get("/", include_in_schema=False)
 async def root():
@@ -0,0 +1,30 @@
+from sqlalchemy import LargeBinary, SmallInteger, DateTime, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import List, Optional
+
+from app.database import Base
+
+class ChaveIdempotencia(Base):
+    """
+    Resposta de uma requisição com Idempotency-Key, vista por todos os workers.
+    A linha é criada (INSERT ... ON CONFLICT) por quem executa a primeira
+    requisição da chave: status NULL enquanto ela roda, com expira_em como
+    prazo para terminar; vencido o prazo (worker que caiu), a chave pode ser
+    reivindicada de novo. Com a resposta gravada, expira_em passa a ser o fim do TTL.
+    """
+    __tablename__ = "chaves_idempotencia"
+
+    # Hashes de 16 bytes, como no cache em memória (app/utils/idempotencia.py)
+    chave: Mapped[bytes] = mapped_column(LargeBinary(16), primary_key=True)
+    impressao: Mapped[bytes] = mapped_column(LargeBinary(16), nullable=False)
+    status: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)
+    # Cabeçalhos ASGI como pares [nome, valor] em latin-1
+    cabecalhos: Mapped[Optional[List[List[str]]]] = mapped_column(JSONB, nullable=True)
+    corpo: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    criado_em: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    expira_em: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ChaveIdempotencia(chave={self.chave.hex()}, status={self.status})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Boolean, DateTime
+from sqlalchemy import String, Boolean, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 import uuid
@@ -26,5 +26,10 @@ class Cliente(Base):
     # Relacionamento com reservas
     reservas: Mapped[list["Reserva"]] = relationship("Reserva", back_populates="cliente")
     
+    # Índice para paginação por cursor dos clientes ativos
+    __table_args__ = (
+        Index("ix_clientes_ativo_id", "cli_ativo", "cli_id"),
+    )
+    
     def __repr__(self):
         return f"<Cliente(cli_id={self.cli_id}, cli_email={self.cli_email})>"
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import String, Float, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.database import Base
+
+class Contador(Base):
+    """Agregados mantidos incrementalmente (dashboard). Uma linha por chave."""
+    __tablename__ = "contadores"
+    
+    chave: Mapped[str] = mapped_column(String(50), primary_key=True)
+    valor: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    atualizado_em: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    
+    def __repr__(self):
+        return f"<Contador(chave={self.chave}, valor={self.valor})>"
@@ -0,0 +1,21 @@
+from sqlalchemy import Date, Float, Integer, Enum, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import date, datetime
+
+from app.database import Base
+from .Veiculos import CategoriaVeiculo
+
+class FaturamentoDiario(Base):
+    """Rollup de locações finalizadas por dia (de res_data_fim) e categoria do veículo"""
+    __tablename__ = "faturamento_diario"
+    
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    categoria: Mapped[CategoriaVeiculo] = mapped_column(Enum(CategoriaVeiculo), primary_key=True)
+    locacoes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    faturamento: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    atualizado_em: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    
+    def __repr__(self):
+        return f"<FaturamentoDiario(dia={self.dia}, categoria={self.categoria}, faturamento={self.faturamento})>"
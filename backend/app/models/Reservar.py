@@ -1,5 +1,6 @@
 from sqlalchemy import (
-    String, DateTime, Float, func, Integer, Enum, ForeignKey)
+    String, DateTime, Float, func, Integer, Enum, ForeignKey, Computed, DDL, event, text)
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, TSTZRANGE
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 import uuid
@@ -35,16 +36,48 @@ class Reserva(Base):
         DateTime(timezone=True), nullable=False
     )
     
+    # Período como intervalo (limites inclusivos, igual à checagem antiga com <= e >=).
+    # Coluna gerada pelo banco: nunca é escrita pela aplicação.
+    res_periodo = mapped_column(
+        TSTZRANGE,
+        Computed("tstzrange(res_data_inicio, res_data_fim, '[]')", persisted=True),
+    )
+    
     res_status: Mapped[StatusLocacao] = mapped_column(
         Enum(StatusLocacao), default=StatusLocacao.RESERVADA
     )
     res_total: Mapped[float | None] = mapped_column(Float, nullable=True)
 
     data_devolucao: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Última alteração da linha: base da exportação incremental
+    res_atualizado_em: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), index=True
+    )
     
     # Relacionamentos (usando string literals para evitar circular imports)
     veiculo: Mapped["Veiculo"] = relationship("Veiculo", back_populates="reservas")
     cliente: Mapped["Cliente"] = relationship("Cliente", back_populates="reservas")
     
+    # Constraints
+    __table_args__ = (
+        # Impede no próprio banco duas reservas ativas do mesmo veículo com períodos
+        # sobrepostos. O índice GiST também atende a busca de conflitos por intervalo.
+        ExcludeConstraint(
+            ("res_vei_id", "="),
+            ("res_periodo", "&&"),
+            name="ex_reservas_veiculo_periodo",
+            using="gist",
+            where=text("res_status IN ('RESERVADA', 'ATIVA')"),
+        ),
+    )
+    
     def __repr__(self):
-        return f"<Reserva(res_id={self.res_id}, res_status={self.res_status})>"
\ No newline at end of file
+        return f"<Reserva(res_id={self.res_id}, res_status={self.res_status})>"
+
+# A igualdade em res_vei_id (varchar) dentro de um índice GiST exige a extensão btree_gist
+event.listen(
+    Reserva.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
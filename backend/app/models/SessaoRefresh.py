@@ -0,0 +1,36 @@
+from sqlalchemy import String, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+import uuid
+
+from app.database import Base
+
+class SessaoRefresh(Base):
+    """
+    Refresh token emitido no login. Só o SHA-256 do token é guardado.
+    Cada uso gera um token novo na mesma família e marca o anterior como
+    substituído; reutilizar um token já substituído revoga a família inteira.
+    O expira_em é o da família: fixado no login e copiado a cada renovação,
+    então uma família em uso também expira.
+    """
+    __tablename__ = "sessoes_refresh"
+    
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    familia: Mapped[str] = mapped_column(String, nullable=False)
+    # "cliente" ou "admin"; sujeito é o mesmo "sub" do access token
+    tipo: Mapped[str] = mapped_column(String(10), nullable=False)
+    sujeito: Mapped[str] = mapped_column(String, nullable=False)
+    criado_em: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    expira_em: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    revogado_em: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    substituido_por: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_sessoes_refresh_familia", "familia"),
+        Index("ix_sessoes_refresh_expira_em", "expira_em"),
+    )
+    
+    def __repr__(self):
+        return f"<SessaoRefresh(id={self.id}, tipo={self.tipo}, sujeito={self.sujeito})>"
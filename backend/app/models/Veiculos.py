@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import String, Float, Boolean, Enum, Text
+from sqlalchemy import String, Float, Boolean, Enum, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import TYPE_CHECKING
 from datetime import datetime
@@ -64,5 +64,11 @@ class Veiculo(Base):
         "Reserva", back_populates="veiculo"
     )
     
+    # Índices para paginação por cursor (filtro seguido da chave de ordenação)
+    __table_args__ = (
+        Index("ix_veiculos_categoria_id", "categoria", "id"),
+        Index("ix_veiculos_status_id", "status", "id"),
+    )
+    
     def __repr__(self):
         return f"<Veiculo(id={self.id}, modelo={self.modelo}, placa={self.placa})>"
\ No newline at end of file
@@ -1,65 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Tuple
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models.Cliente import Cliente 
 from ..models.Adm import Admin 
-from ..Schemas.Cliente import ClienteCreate, ClienteResponse 
+from ..Schemas.Cliente import ClienteCreate, ClienteResponse, ClienteCampos, ClientePagina 
 from ..utils.dependencies import get_current_admin_user 
+from ..Services import contadores_service
+from ..utils.paginacao import paginar, cache_totais, LIMITE_PADRAO, LIMITE_MAXIMO
+from ..utils.serializacao import colunas_do_schema, como_dicts, resposta_json, parametro_campos
 
 router = APIRouter()
 
+# As leituras trazem só as colunas de ClienteResponse (nunca cli_senha_hash) pedidas
+# em ?fields=; cli_id sempre vem
+campos_cliente = parametro_campos(ClienteResponse, obrigatorios=("cli_id",))
+
 # Esta rota é para o ADMIN 
 @router.post("/", 
     response_model=ClienteResponse,
     summary="Criar cliente (Admin)",
     description="Cria um novo cliente no sistema. Requer autenticação como administrador."
 )
-def criar_cliente(
+async def criar_cliente(
     cliente: ClienteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: Admin = Depends(get_current_admin_user) 
 ):
-    db_cliente = db.query(Cliente).filter(Cliente.cli_cpf == cliente.cli_cpf).first()
+    db_cliente = await db.scalar(select(Cliente).where(Cliente.cli_cpf == cliente.cli_cpf))
     if db_cliente:
         raise HTTPException(status_code=400, detail="CPF já cadastrado")
 
-    db_cliente_email = db.query(Cliente).filter(Cliente.cli_email == cliente.cli_email).first()
+    db_cliente_email = await db.scalar(select(Cliente).where(Cliente.cli_email == cliente.cli_email))
     if db_cliente_email:
         raise HTTPException(status_code=400, detail="Email já cadastrado")
 
     # O Schema 'ClienteCreate' já tem os campos corretos
     novo_cliente = Cliente(**cliente.dict())
     db.add(novo_cliente)
-    db.commit()
-    db.refresh(novo_cliente)
+    await db.run_sync(contadores_service.registrar_cliente_criado)
+    await db.commit()
+    await db.refresh(novo_cliente)
 
     return novo_cliente
 
 @router.get("/", 
-    response_model=List[ClienteResponse],
+    response_model=ClientePagina,
     summary="Listar clientes (Admin)",
-    description="Retorna lista de todos os clientes ativos no sistema."
+    description="Retorna os clientes ativos no sistema, paginados por cursor."
 )
-def listar_clientes(
-    db: Session = Depends(get_db),
+async def listar_clientes(
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    incluir_total: bool = False,
+    campos: Tuple[str, ...] = Depends(campos_cliente),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: Admin = Depends(get_current_admin_user) 
 ):
-    return db.query(Cliente).filter(Cliente.cli_ativo == True).all()
+    query = select(*colunas_do_schema(Cliente, ClienteResponse, campos)).where(Cliente.cli_ativo == True)
+    clientes, proximo_cursor = await paginar(db, query, Cliente.cli_id, cursor, limite, colunas=True)
+    
+    total = None
+    if incluir_total:
+        async def contar():
+            return await db.scalar(select(func.count()).select_from(query.subquery()))
+        total = await cache_totais.obter(("clientes",), contar)
+    
+    return resposta_json({
+        "itens": como_dicts(clientes), "proximo_cursor": proximo_cursor, "total_aproximado": total,
+    })
 
 @router.get("/{cliente_id}", 
-    response_model=ClienteResponse,
+    response_model=ClienteCampos,
     summary="Obter cliente (Admin)",
     description="Retorna os dados de um cliente específico pelo ID."
 )
-def obter_cliente(
+async def obter_cliente(
     cliente_id: str,
-    db: Session = Depends(get_db),
+    campos: Tuple[str, ...] = Depends(campos_cliente),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: Admin = Depends(get_current_admin_user) 
 ):
-    cliente = db.query(Cliente).filter(Cliente.cli_id == cliente_id).first()
+    query = select(*colunas_do_schema(Cliente, ClienteResponse, campos)).where(Cliente.cli_id == cliente_id)
+    cliente = (await db.execute(query)).first()
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
-    return cliente
+    return resposta_json(cliente._asdict())
 
@@ -1,105 +1,251 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
 from datetime import datetime
+from enum import Enum
 
-from app.database import get_db  
+from app.database import get_async_db  
 from app.models.Veiculos import Veiculo, StatusLocacao, StatusVeiculo  
 from app.models.Cliente import Cliente  
 from app.models.Reservar import Reserva  
 from app.models.Adm import Admin  
-from app.Schemas.Reservar import LocacaoResponse, ReservaRequest, MudarStatusRequest 
+from app.Schemas.Reservar import (
+    LocacaoResponse, LocacaoCampos, ReservaRequest, MudarStatusRequest, ModoLote, ReservaLoteRequest, ReservaLoteResponse,
+    MudarStatusLoteRequest, MudarStatusLoteResponse,
+)
 from app.utils.dependencies import get_current_cliente_user, get_current_admin_user  
+from app.Services.disponibilidade_service import calendario_frota
+from app.utils.serializacao import colunas_do_schema, como_dicts, resposta_json, parametro_campos
+from app.Services import contadores_service, faturamento_service, exportacao_service, reservas_service
 
 router = APIRouter()
 
+# Recusas de reservas_service.reservar -> resposta HTTP
+_RECUSAS = {
+    reservas_service.MotivoRecusa.NAO_ENCONTRADO: (404, "Veículo não encontrado"),
+    reservas_service.MotivoRecusa.INDISPONIVEL: (400, "Veículo não disponível para reserva"),
+    reservas_service.MotivoRecusa.CONFLITO: (400, "Veículo já reservado neste período"),
+    reservas_service.MotivoRecusa.OCUPADO: (409, "Veículo sendo reservado por outro cliente, tente novamente"),
+    reservas_service.MotivoRecusa.PERIODO_INVALIDO: (400, "Período de locação inválido"),
+    reservas_service.MotivoRecusa.REPETIDO: (400, "Veículo repetido no lote"),
+}
+
+# Recusas da troca de status (por id, no lote)
+_RECUSAS_TRANSICAO = {
+    reservas_service.MotivoRecusa.NAO_ENCONTRADO: "Reserva/Locação não encontrada",
+    reservas_service.MotivoRecusa.TRANSICAO_INVALIDA: "Transição de status não permitida",
+}
+
+def _recusar(motivo: reservas_service.MotivoRecusa):
+    status_code, detalhe = _RECUSAS[motivo]
+    cabecalhos = {"Retry-After": "1"} if status_code == 409 else None
+    raise HTTPException(status_code=status_code, detail=detalhe, headers=cabecalhos)
+
+# minhas-reservas lê só as colunas de LocacaoResponse pedidas em ?fields=, sem objetos do ORM
+campos_locacao = parametro_campos(LocacaoResponse, obrigatorios=("res_id",))
+
+class FormatoExportacao(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+_TIPOS_EXPORTACAO = {
+    FormatoExportacao.CSV: "text/csv",
+    FormatoExportacao.NDJSON: "application/x-ndjson",
+    FormatoExportacao.PARQUET: "application/vnd.apache.parquet",
+    FormatoExportacao.ARROW: "application/vnd.apache.arrow.stream",
+}
+
 @router.post("/", 
     response_model=LocacaoResponse,
     summary="Reservar veículo (Cliente)",
-    description="Realiza a reserva de um veículo para o cliente autenticado."
+    description="Realiza a reserva de um veículo para o cliente autenticado. Com o cabeçalho "
+                "`Idempotency-Key`, repetições do mesmo pedido recebem a resposta da primeira."
 )
-def reservar_veiculo(
+async def reservar_veiculo(
     reserva: ReservaRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Cliente = Depends(get_current_cliente_user)
 ):
-    veiculo = db.query(Veiculo).filter(Veiculo.id == reserva.veiculo_id).first()
-    if not veiculo:
-        raise HTTPException(status_code=404, detail="Veículo não encontrado")
-    
-    if veiculo.status != StatusVeiculo.DISPONIVEL:
-        raise HTTPException(status_code=400, detail="Veículo não disponível para reserva")
-    
-    locacoes_conflitantes = db.query(Reserva).filter(
-        Reserva.res_vei_id == reserva.veiculo_id,
-        Reserva.res_status.in_([StatusLocacao.RESERVADA, StatusLocacao.ATIVA]),
-        Reserva.res_data_inicio <= reserva.data_fim,
-        Reserva.res_data_fim >= reserva.data_inicio
-    ).first()
-    
-    if locacoes_conflitantes:
-        raise HTTPException(status_code=400, detail="Veículo já reservado neste período")
-    
     dias_locacao = (reserva.data_fim - reserva.data_inicio).days
     if dias_locacao <= 0:
         raise HTTPException(status_code=400, detail="Período de locação inválido")
     
-    valor_total = dias_locacao * veiculo.valor_diaria 
+    # Checagem e gravação em uma instrução só (ver reservas_service.INSTRUCAO_RESERVA)
+    resultado = await reservas_service.reservar_com_retentativas(
+        db, current_user.cli_id, reserva.veiculo_id, reserva.data_inicio, reserva.data_fim, dias_locacao
+    )
+    if resultado.motivo is not None:
+        _recusar(resultado.motivo)
     
-    nova_reserva = Reserva(
-        res_cli_id=current_user.cli_id,
-        res_vei_id=reserva.veiculo_id,
-        res_data_inicio=reserva.data_inicio,
-        res_data_fim=reserva.data_fim,
-        res_total=valor_total,
-        res_status=StatusLocacao.RESERVADA
+    nova_reserva = resultado.reserva
+    calendario_frota.registrar_reserva(
+        nova_reserva["res_vei_id"], nova_reserva["res_id"],
+        nova_reserva["res_data_inicio"], nova_reserva["res_data_fim"]
     )
     
-    veiculo.status = StatusVeiculo.LOCADO
+    return resposta_json(nova_reserva)
+
+@router.post("/lote",
+    response_model=ReservaLoteResponse,
+    summary="Reservar vários veículos (Cliente)",
+    description="Reserva até 50 veículos de uma vez, com uma instrução no banco. No modo `tudo_ou_nada` "
+                "(padrão), um item recusado recusa o lote inteiro (400, com as falhas no detail); no "
+                "modo `melhor_esforco`, reserva os itens possíveis e lista os recusados em `falhas`. Aceita "
+                "`Idempotency-Key`, como POST /api/reservas/."
+)
+async def reservar_lote(
+    lote: ReservaLoteRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Cliente = Depends(get_current_cliente_user)
+):
+    itens = [
+        reservas_service.ItemLote(item.veiculo_id, item.data_inicio, item.data_fim, (item.data_fim - item.data_inicio).days)
+        for item in lote.itens
+    ]
+    resultado = await reservas_service.reservar_lote_com_retentativas(
+        db, current_user.cli_id, itens, lote.modo == ModoLote.TUDO_OU_NADA
+    )
+    if resultado.motivo is not None:
+        _recusar(resultado.motivo)
     
-    db.add(nova_reserva)
-    db.commit()
-    db.refresh(nova_reserva)
+    reservas, falhas = [], []
+    for indice, (item, item_resultado) in enumerate(zip(lote.itens, resultado.itens)):
+        if item_resultado.reserva is not None:
+            reservas.append(item_resultado.reserva)
+        elif item_resultado.motivo is not None:
+            falhas.append({
+                "indice": indice, "veiculo_id": item.veiculo_id,
+                "motivo": item_resultado.motivo.value, "detalhe": _RECUSAS[item_resultado.motivo][1],
+            })
+    if falhas and lote.modo == ModoLote.TUDO_OU_NADA:
+        raise HTTPException(status_code=400, detail={
+            "mensagem": "Nenhuma reserva feita: há itens recusados no lote", "falhas": falhas,
+        })
     
-    return nova_reserva
+    for nova_reserva in reservas:
+        calendario_frota.registrar_reserva(
+            nova_reserva["res_vei_id"], nova_reserva["res_id"],
+            nova_reserva["res_data_inicio"], nova_reserva["res_data_fim"]
+        )
+    return resposta_json({"reservas": reservas, "falhas": falhas})
 
 @router.get("/minhas-reservas", 
-    response_model=List[LocacaoResponse],
+    response_model=List[LocacaoCampos],
     summary="Minhas reservas (Cliente)",
     description="Retorna as reservas do cliente autenticado."
 )
-def minhas_locacoes(
-    db: Session = Depends(get_db),
+async def minhas_locacoes(
+    campos: Tuple[str, ...] = Depends(campos_locacao),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Cliente = Depends(get_current_cliente_user)
 ):
-    reservas = (
-        db.query(Reserva)
-        .filter(Reserva.res_cli_id == current_user.cli_id)
+    reservas = await db.execute(
+        select(*colunas_do_schema(Reserva, LocacaoResponse, campos))
+        .where(Reserva.res_cli_id == current_user.cli_id)
         .order_by(Reserva.res_data_inicio.desc())
-        .all()
     )
-    return reservas
+    return resposta_json(como_dicts(reservas.all()))
+
+@router.get("/export",
+    summary="Exportar reservas (Admin)",
+    description="Envia todas as reservas (com placa, categoria e e-mail do cliente) em streaming, "
+                "em NDJSON, CSV, Parquet ou Arrow IPC (stream). `inicio`/`fim` filtram pela data de "
+                "início da reserva; `atualizado_desde` traz as reservas alteradas a partir do "
+                "instante dado (use o maior res_atualizado_em da exportação anterior), com uma "
+                "sobreposição de EXPORTACAO_JANELA_SEGURANCA_SEGUNDOS (300 s por padrão) para não "
+                "perder alterações de transações que confirmaram depois: linhas já exportadas podem "
+                "se repetir e devem ser aplicadas por res_id."
+)
+async def exportar_reservas(
+    formato: FormatoExportacao = FormatoExportacao.NDJSON,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    status: Optional[StatusLocacao] = None,
+    atualizado_desde: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: Admin = Depends(get_current_admin_user)
+):
+    if inicio is not None and fim is not None and fim <= inicio:
+        raise HTTPException(status_code=400, detail="Período de exportação inválido")
+    
+    # A sessão da autenticação não serve ao streaming: devolve a conexão dela ao pool
+    # antes de o corpo começar. A vaga de admissão (modo sync) continua com a requisição,
+    # pois o FastAPI só encerra as dependências com yield depois de enviar o corpo, e
+    # passa a cobrir a conexão própria da exportação.
+    await db.close()
+    query = exportacao_service.consulta_exportacao(inicio, fim, status, atualizado_desde)
+    return StreamingResponse(
+        exportacao_service.exportar_reservas(query, formato.value),
+        media_type=_TIPOS_EXPORTACAO[formato],
+        headers={"Content-Disposition": f'attachment; filename="reservas.{formato.value}"'},
+    )
+
+@router.patch("/status",
+    response_model=MudarStatusLoteResponse,
+    summary="Alterar status de várias reservas (Admin)",
+    description="Check-in (ATIVA), devolução (FINALIZADA) ou cancelamento (CANCELADA) de até 500 reservas "
+                "em uma transação. Só valem RESERVADA → ATIVA, ATIVA → FINALIZADA e RESERVADA → CANCELADA; "
+                "os ids recusados voltam com o motivo, sem impedir os demais."
+)
+async def alterar_status_lote(
+    pedido: MudarStatusLoteRequest,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: Admin = Depends(get_current_admin_user)
+):
+    novo_status = StatusLocacao(pedido.status)
+    resultados = await db.run_sync(reservas_service.alterar_status_lote, pedido.reserva_ids, novo_status)
+    
+    resposta = []
+    for resultado in resultados:
+        reserva = resultado.reserva
+        if reserva is None:
+            resposta.append({
+                "res_id": resultado.res_id, "alterada": False,
+                "motivo": resultado.motivo.value, "detalhe": _RECUSAS_TRANSICAO[resultado.motivo],
+            })
+            continue
+        if novo_status in (StatusLocacao.RESERVADA, StatusLocacao.ATIVA):
+            calendario_frota.registrar_reserva(
+                reserva["res_vei_id"], reserva["res_id"], reserva["res_data_inicio"], reserva["res_data_fim"]
+            )
+        else:
+            calendario_frota.remover_reserva(reserva["res_vei_id"], reserva["res_id"])
+        resposta.append({"res_id": resultado.res_id, "alterada": True, "reserva": reserva})
+    return resposta_json({"resultados": resposta})
 
 @router.patch("/{reserva_id}/status",
     response_model=LocacaoResponse,
     summary="Alterar status da reserva/locação (Admin)",
-    description="Altera o status de uma reserva (check-in, devolução/check-out, cancelar)."
+    description="Altera o status de uma reserva (check-in, devolução/check-out, cancelar). Só valem "
+                "RESERVADA → ATIVA, ATIVA → FINALIZADA e RESERVADA → CANCELADA."
 )
-def alterar_status_locacao(
+async def alterar_status_locacao(
     reserva_id: str,
     status_request: MudarStatusRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user: Admin = Depends(get_current_admin_user)
 ):
-    reserva = db.query(Reserva).filter(Reserva.res_id == reserva_id).first()
+    reserva = await db.get(Reserva, reserva_id)
     if not reserva:
         raise HTTPException(status_code=404, detail="Reserva/Locação não encontrada")
     
-    veiculo = db.query(Veiculo).filter(Veiculo.id == reserva.res_vei_id).first()
+    veiculo = await db.get(Veiculo, reserva.res_vei_id)
     if not veiculo:
         raise HTTPException(status_code=404, detail="Veículo associado não encontrado")
     
-    novo_status = status_request.status
+    # MudarStatusRequest usa use_enum_values: o status chega como string
+    novo_status = StatusLocacao(status_request.status)
+    status_anterior = reserva.res_status
+    if status_anterior not in reservas_service.TRANSICOES_PERMITIDAS.get(novo_status, ()):
+        raise HTTPException(
+            status_code=400, detail=_RECUSAS_TRANSICAO[reservas_service.MotivoRecusa.TRANSICAO_INVALIDA]
+        )
+    status_veiculo_anterior = veiculo.status
     reserva.res_status = novo_status
     
     if novo_status == StatusLocacao.ATIVA:
@@ -109,7 +255,30 @@ def alterar_status_locacao(
         if novo_status == StatusLocacao.FINALIZADA:
             reserva.data_devolucao = datetime.utcnow()
 
-    db.commit()
-    db.refresh(reserva)
+    await db.run_sync(
+        contadores_service.registrar_transicao_reserva,
+        status_anterior, novo_status, reserva.res_total, reserva.res_data_fim
+    )
+    await db.run_sync(contadores_service.registrar_status_veiculo, status_veiculo_anterior, veiculo.status)
+    await db.run_sync(
+        faturamento_service.registrar_transicao,
+        status_anterior, novo_status, reserva.res_total, reserva.res_data_fim, veiculo.categoria
+    )
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        # Última barreira: a constraint de exclusão recusou o período (ex.: corrida com outra reserva)
+        await db.rollback()
+        if getattr(e.orig, "pgcode", None) == reservas_service.EXCLUSION_VIOLATION:
+            _recusar(reservas_service.MotivoRecusa.CONFLITO)
+        raise
+    await db.refresh(reserva)
+    
+    if reserva.res_status in (StatusLocacao.RESERVADA, StatusLocacao.ATIVA):
+        calendario_frota.registrar_reserva(
+            reserva.res_vei_id, reserva.res_id, reserva.res_data_inicio, reserva.res_data_fim
+        )
+    else:
+        calendario_frota.remover_reserva(reserva.res_vei_id, reserva.res_id)
     
     return reserva
\ No newline at end of file
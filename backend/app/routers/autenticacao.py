@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel  
 
-from ..database import get_db
-from ..Services import auth_service 
+from ..database import get_async_db
+from ..Services import auth_service, sessoes_service
 from ..Schemas.Usuario import UsuarioCreate, UsuarioResponse 
-from ..Schemas.Token import Token 
-from ..utils.security import criar_access_token, criar_hash_senha
+from ..Schemas.Token import Token, RefreshRequest
+from ..utils.security import criar_access_token
+from ..utils.pool_senhas import pool_senhas
 from app.Schemas.Admin import AdminCreate, AdminResponse  
 from app.models.Adm import Admin  
 
@@ -18,6 +20,25 @@ class ClienteLoginRequest(BaseModel):
     email: str
     senha: str
 
+async def _emitir_tokens(db: AsyncSession, tipo: str, sujeito: str) -> dict:
+    """Access token (JWT curto) + refresh token de uma nova família de sessão"""
+    refresh_token = sessoes_service.emitir_refresh(db, tipo, sujeito)
+    await db.commit()
+    access_token = criar_access_token(data={"sub": sujeito, "role": tipo})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+async def _renovar_tokens(db: AsyncSession, tipo: str, refresh_token: str) -> dict:
+    renovado = await sessoes_service.rotacionar(db, tipo, refresh_token)
+    if renovado is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    sujeito, novo_refresh = renovado
+    access_token = criar_access_token(data={"sub": sujeito, "role": tipo})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": novo_refresh}
+
 cliente_auth_router = APIRouter(
     prefix="/auth/cliente",
     tags=["Autenticação de Cliente"]
@@ -26,25 +47,27 @@ cliente_auth_router = APIRouter(
 @cliente_auth_router.post("/registrar", 
     response_model=UsuarioResponse, 
     status_code=status.HTTP_201_CREATED,
-    summary="Registrar novo cliente (Cliente se registra)"
+    summary="Registrar novo cliente (Cliente se registra)",
+    description="Cria uma conta de cliente. Com o cabeçalho `Idempotency-Key`, repetições do mesmo "
+                "cadastro recebem a resposta da primeira."
 )
-def registrar_cliente(
+async def registrar_cliente(
     usuario: UsuarioCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cria uma nova conta de usuário como cliente."""
-    return auth_service.criar_novo_usuario(db, usuario)
+    return await auth_service.criar_novo_usuario(db, usuario)
 
 @cliente_auth_router.post("/login", 
     response_model=Token,
     summary="Login de cliente (Cliente loga)"
 )
-def login_cliente(
+async def login_cliente(
     login_data: ClienteLoginRequest, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Autentica cliente (email) e retorna token JWT."""
-    usuario = auth_service.autenticar_usuario(
+    usuario = await auth_service.autenticar_usuario(
         db, login_data.email, login_data.senha  
     )
     
@@ -55,11 +78,30 @@ def login_cliente(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = criar_access_token(
-        data={"sub": usuario.cli_email, "role": "cliente"}
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await _emitir_tokens(db, "cliente", usuario.cli_email)
+
+@cliente_auth_router.post("/refresh", 
+    response_model=Token,
+    summary="Renovar token de cliente",
+    description="Troca o refresh token por um novo access token e um novo refresh token, sem senha. "
+                "A sessão expira REFRESH_TOKEN_EXPIRE_DAYS dias após o login, mesmo com renovações."
+)
+async def refresh_cliente(
+    dados: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await _renovar_tokens(db, "cliente", dados.refresh_token)
+
+@cliente_auth_router.post("/logout", 
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Encerrar sessão de cliente",
+    description="Revoga o refresh token e todas as renovações dele."
+)
+async def logout_cliente(
+    dados: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    await sessoes_service.revogar(db, "cliente", dados.refresh_token)
 
 # Rota de Autenticação de Admin 
 admin_auth_router = APIRouter(
@@ -73,19 +115,19 @@ admin_auth_router = APIRouter(
     summary="Registrar novo administrador",
     description="Cria uma nova conta de administrador (apenas para desenvolvimento)"
 )
-def registrar_admin(
+async def registrar_admin(
     admin: AdminCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
    
-    admin_existente = db.query(Admin).filter(Admin.codigo_admin == admin.codigo_admin).first()
+    admin_existente = await db.scalar(select(Admin).where(Admin.codigo_admin == admin.codigo_admin))
     if admin_existente:
         raise HTTPException(
             status_code=400,
             detail="Código de administrador já existe"
         )
     
-    senha_hash = criar_hash_senha(admin.senha)
+    senha_hash = await pool_senhas.criar_hash(admin.senha)
     
     novo_admin = Admin(
         codigo_admin=admin.codigo_admin,
@@ -95,8 +137,8 @@ def registrar_admin(
     )
     
     db.add(novo_admin)
-    db.commit()
-    db.refresh(novo_admin)
+    await db.commit()
+    await db.refresh(novo_admin)
     
     return novo_admin
 
@@ -104,12 +146,12 @@ def registrar_admin(
     response_model=Token,
     summary="Login de administrador (Admin loga)"
 )
-def login_admin(
+async def login_admin(
     login_data: AdminLoginRequest, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Autentica administrador (código_admin) e retorna token JWT."""
-    admin = auth_service.autenticar_admin(
+    admin = await auth_service.autenticar_admin(
         db, login_data.codigo_admin, login_data.senha  
     )
     
@@ -120,8 +162,27 @@ def login_admin(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = criar_access_token(
-        data={"sub": admin.codigo_admin, "role": "admin"}
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return await _emitir_tokens(db, "admin", admin.codigo_admin)
+
+@admin_auth_router.post("/refresh", 
+    response_model=Token,
+    summary="Renovar token de administrador",
+    description="Troca o refresh token por um novo access token e um novo refresh token, sem senha. "
+                "A sessão expira REFRESH_TOKEN_EXPIRE_DAYS dias após o login, mesmo com renovações."
+)
+async def refresh_admin(
+    dados: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await _renovar_tokens(db, "admin", dados.refresh_token)
+
+@admin_auth_router.post("/logout", 
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Encerrar sessão de administrador",
+    description="Revoga o refresh token e todas as renovações dele."
+)
+async def logout_admin(
+    dados: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    await sessoes_service.revogar(db, "admin", dados.refresh_token)
@@ -1,72 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date, datetime, timedelta
 
-from app.database import get_db  
-from app.models.Veiculos import Veiculo, StatusVeiculo, StatusLocacao             
-from app.models.Cliente import Cliente              
-from app.models.Reservar import Reserva
+from app.database import get_async_db  
 from app.models.Adm import Admin  
-from app.Schemas.Dashboard import DashboardStats  
+from app.models.Veiculos import CategoriaVeiculo
+from app.Schemas.Dashboard import DashboardStats, ReconciliacaoResponse, SerieFaturamentoResponse  
+from app.Services import contadores_service, faturamento_service
+from app.Services.faturamento_service import Granularidade
 from app.utils.dependencies import get_current_admin_user 
 
-router = APIRouter(
-    prefix="/dashboard",
-    tags=["Dashboard"]
-)
+router = APIRouter()
 
 @router.get("/stats", 
     response_model=DashboardStats,
     summary="Estatísticas do Dashboard (Admin)",
     description="Retorna as estatísticas do sistema. Requer Admin."
 )
-def obter_estatisticas(
-    db: Session = Depends(get_db),
+async def obter_estatisticas(
+    db: AsyncSession = Depends(get_async_db),
     admin_user: Admin = Depends(get_current_admin_user) 
 ):
     try:
-        # Estatísticas de Veículos (nomes de coluna corretos)
-        total_veiculos = db.query(Veiculo).count()
-        veiculos_disponiveis = db.query(Veiculo).filter(
-            Veiculo.status == StatusVeiculo.DISPONIVEL
-        ).count()
-        veiculos_manutencao = db.query(Veiculo).filter(
-            Veiculo.status == StatusVeiculo.MANUTENCAO
-        ).count()
-        veiculos_locados = db.query(Veiculo).filter(
-            Veiculo.status == StatusVeiculo.LOCADO
-        ).count()
-        
-        # Clientes
-        total_clientes = db.query(Cliente).filter(Cliente.cli_ativo == True).count()
-
-        # "Usuários ativos" (Locações ativas)
-        locacoes_ativas = db.query(Reserva).filter(
-            Reserva.res_status == StatusLocacao.ATIVA
-        ).count()
-        
-        # Faturamento
-        inicio_mes = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        faturamento_mensal = db.query(func.sum(Reserva.res_total)).filter(
-            Reserva.res_status == StatusLocacao.FINALIZADA,
-            Reserva.res_data_fim >= inicio_mes 
-        ).scalar() or 0.0
-        
-        faturamento_total = db.query(func.sum(Reserva.res_total)).filter(
-            Reserva.res_status == StatusLocacao.FINALIZADA
-        ).scalar() or 0.0
-        
-        return DashboardStats(
-            total_veiculos=total_veiculos,
-            veiculos_disponiveis=veiculos_disponiveis,
-            veiculos_manutencao=veiculos_manutencao,
-            veiculos_locados=veiculos_locados,
-            total_clientes=total_clientes,
-            locacoes_ativas=locacoes_ativas,
-            faturamento_mensal=float(faturamento_mensal),  
-            faturamento_total=float(faturamento_total)     
-        )
+        # Contadores mantidos a cada escrita: uma leitura pela chave primária
+        return DashboardStats(**await db.run_sync(contadores_service.ler_estatisticas))
         
     except Exception as e:
         # Logar o erro real no seu console
@@ -74,4 +32,42 @@ def obter_estatisticas(
         raise HTTPException(
             status_code=500, 
             detail="Erro ao obter estatísticas do dashboard."
-        )
\ No newline at end of file
+        )
+
+@router.post("/reconciliar", 
+    response_model=ReconciliacaoResponse,
+    summary="Reconciliar contadores do Dashboard (Admin)",
+    description="Recalcula os contadores a partir das tabelas e informa (e corrige) divergências."
+)
+async def reconciliar_contadores(
+    corrigir: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: Admin = Depends(get_current_admin_user) 
+):
+    divergencias = await db.run_sync(contadores_service.reconciliar_contadores, corrigir=corrigir)
+    return ReconciliacaoResponse(divergencias=divergencias, corrigido=corrigir and bool(divergencias))
+
+
+@router.get("/series", 
+    response_model=SerieFaturamentoResponse,
+    summary="Série de faturamento (Admin)",
+    description="Faturamento e locações finalizadas por dia, semana ou mês e por categoria. "
+                "Lê apenas o rollup diário. Padrão: últimos 365 dias."
+)
+async def obter_serie_faturamento(
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    granularidade: Granularidade = Granularidade.DIA,
+    categoria: Optional[CategoriaVeiculo] = None,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: Admin = Depends(get_current_admin_user) 
+):
+    fim = fim or datetime.utcnow().date()
+    inicio = inicio or fim - timedelta(days=365)
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="Período inválido")
+    
+    pontos = await db.run_sync(faturamento_service.serie, inicio, fim, granularidade, categoria)
+    return SerieFaturamentoResponse(
+        granularidade=granularidade.value, inicio=inicio, fim=fim, pontos=pontos
+    )
@@ -0,0 +1,91 @@
+from anyio import to_thread
+from fastapi import APIRouter, Depends
+
+from app.database import (
+    engine, async_engine, DB_MODO, SESSOES_MAXIMAS, medidor_fila_sessoes, vagas_sessoes_em_uso
+)
+from app.models.Adm import Admin
+from app.Schemas.Metricas import (
+    MetricasPoolResponse, EstatisticasCachePrincipais, EstatisticasPoolSenhas, EstatisticasCacheCatalogo,
+    EstatisticasIdempotencia,
+)
+from app.utils.cache_principais import cache_principais
+from app.utils.cache_catalogo import cache_catalogo
+from app.utils.pool_senhas import pool_senhas
+from app.utils.idempotencia import repositorio_idempotencia
+from app.utils.dependencies import get_current_admin_user
+
+router = APIRouter()
+
+@router.get("/pool",
+    response_model=MetricasPoolResponse,
+    summary="Métricas do pool de conexões (Admin)",
+    description="Conexões em uso, overflow, timeouts e tempo de espera por conexão desde a subida "
+                "do processo, além da fila de sessões (modo sync) e da ocupação do threadpool. Valores por worker."
+)
+async def obter_metricas_pool(
+    admin_user: Admin = Depends(get_current_admin_user)
+):
+    limitador = to_thread.current_default_thread_limiter()
+    fila = None
+    if async_engine is None:
+        resumo = medidor_fila_sessoes.resumo()
+        fila = {
+            "capacidade": SESSOES_MAXIMAS,
+            "em_uso": vagas_sessoes_em_uso(),
+            "admitidas": resumo["checkouts"],
+            "timeouts": resumo["timeouts"],
+            "espera_media_ms": resumo["espera_media_ms"],
+            "espera_maxima_ms": resumo["espera_maxima_ms"],
+        }
+    return MetricasPoolResponse(
+        modo=DB_MODO,
+        pool_sync=engine.pool.estado(),
+        pool_async=async_engine.pool.estado() if async_engine is not None else None,
+        fila_sessoes=fila,
+        threadpool={"tamanho": int(limitador.total_tokens), "em_uso": limitador.borrowed_tokens},
+    )
+
+@router.get("/autenticacao",
+    response_model=EstatisticasCachePrincipais,
+    summary="Métricas do cache de autenticação (Admin)",
+    description="Acertos, falhas e invalidações do cache de usuários autenticados (pelo sub do token) deste worker."
+)
+async def obter_metricas_autenticacao(
+    admin_user: Admin = Depends(get_current_admin_user)
+):
+    return EstatisticasCachePrincipais(**cache_principais.resumo())
+
+@router.get("/senhas",
+    response_model=EstatisticasPoolSenhas,
+    summary="Métricas do pool de hash de senhas (Admin)",
+    description="Ocupação do executor de bcrypt e quantos pedidos foram recusados com 503."
+)
+async def obter_metricas_senhas(
+    admin_user: Admin = Depends(get_current_admin_user)
+):
+    return EstatisticasPoolSenhas(**pool_senhas.resumo())
+
+@router.get("/catalogo",
+    response_model=EstatisticasCacheCatalogo,
+    summary="Métricas do cache do catálogo (Admin)",
+    description="Acertos, falhas e invalidações do cache de respostas de veículos deste worker, "
+                "e se a escuta de invalidações (LISTEN) está conectada."
+)
+async def obter_metricas_catalogo(
+    admin_user: Admin = Depends(get_current_admin_user)
+):
+    return EstatisticasCacheCatalogo(**cache_catalogo.resumo())
+
+@router.get("/idempotencia",
+    response_model=EstatisticasIdempotencia,
+    summary="Métricas das chaves de idempotência (Admin)",
+    description="Respostas no cache em memória, requisições em andamento, repetições atendidas sem executar "
+                "a rota (repeticoes_banco: as que vieram da tabela chaves_idempotencia, gravadas por outro "
+                "worker ou já fora do cache), repetições que esperaram a primeira e chaves reaproveitadas "
+                "com outro corpo, neste worker."
+)
+async def obter_metricas_idempotencia(
+    admin_user: Admin = Depends(get_current_admin_user)
+):
+    return EstatisticasIdempotencia(**repositorio_idempotencia.resumo())
@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db  
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from datetime import datetime
+from app.database import get_async_db  
 from app.models.Veiculos import Veiculo, StatusVeiculo, CategoriaVeiculo  
 from app.models.Adm import Admin 
 
-from app.Schemas.Veiculos import VeiculoCreate, VeiculoResponse  
+from app.Schemas.Veiculos import VeiculoCreate, VeiculoResponse, VeiculoCampos, VeiculoPagina, ImportacaoResponse  
 from app.utils.dependencies import get_current_admin_user  
+from app.Services.disponibilidade_service import calendario_frota, reserva_no_periodo
+from app.Services import contadores_service, importacao_service
+from app.utils.paginacao import paginar, cache_totais, LIMITE_PADRAO, LIMITE_MAXIMO
+from app.utils.cache_http import etag_fraca, cabecalhos_validacao, nao_modificado, resposta_304
+from app.utils.cache_catalogo import cache_catalogo
+from app.utils.serializacao import colunas_do_schema, como_dicts, json_bytes, resposta_json, parametro_campos
 from enum import Enum
+import zlib
 
 router = APIRouter()
 
@@ -22,67 +31,216 @@ class StatusFilter(str, Enum):
     LOCADO = "LOCADO"
     MANUTENCAO = "MANUTENCAO"
 
+class FormatoImportacao(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+# Leitura sem ORM das rotas públicas: só as colunas de VeiculoResponse pedidas em
+# ?fields= (todas por padrão). O id sempre vem: é a chave do cursor
+campos_veiculo = parametro_campos(VeiculoResponse, obrigatorios=("id",))
+TODOS_CAMPOS_VEICULO = tuple(VeiculoResponse.model_fields)
+
+def _variante(campos: Tuple[str, ...]) -> Optional[str]:
+    """Sufixo do ETag para respostas com só parte dos campos"""
+    if campos == TODOS_CAMPOS_VEICULO:
+        return None
+    return f"{zlib.crc32(','.join(campos).encode()):08x}"
+
+async def _versao_catalogo(db) -> Tuple[int, Optional[datetime]]:
+    """
+    Versão do catálogo para ETag/Last-Modified (uma leitura pela chave em
+    contadores). É lida antes dos veículos, então os dados enviados nunca são
+    mais antigos que o ETag.
+    """
+    return await db.run_sync(contadores_service.ler_versao_catalogo)
+
+def _resposta_condicional(
+    request: Request, versao: int, modificado_em: Optional[datetime], corpo: Optional[bytes] = None,
+    variante: Optional[str] = None
+) -> Optional[Response]:
+    """304 se o cliente já tem esta versão; senão o JSON pronto (None se ainda não há corpo)"""
+    cabecalhos = cabecalhos_validacao(etag_fraca(versao, variante), modificado_em)
+    if nao_modificado(request, cabecalhos["ETag"], modificado_em):
+        return resposta_304(cabecalhos)
+    if corpo is None:
+        return None
+    return Response(content=corpo, media_type="application/json", headers=cabecalhos)
+
 @router.post("/", response_model=VeiculoResponse, summary="Adicionar novo veículo (Admin)")
-def criar_veiculo(
+async def criar_veiculo(
     veiculo: VeiculoCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     usuario_admin: Admin = Depends(get_current_admin_user) # Protegido
 ):
     # Nomes de coluna corretos (sem prefixo)
-    db_veiculo = db.query(Veiculo).filter(Veiculo.placa == veiculo.placa).first()
+    db_veiculo = await db.scalar(select(Veiculo).where(Veiculo.placa == veiculo.placa))
     if db_veiculo:
         raise HTTPException(status_code=400, detail="Placa já cadastrada")
     
     novo_veiculo = Veiculo(**veiculo.dict())
     db.add(novo_veiculo)
-    db.commit()
-    db.refresh(novo_veiculo)
+    await db.run_sync(
+        contadores_service.registrar_veiculo_criado, novo_veiculo.status or StatusVeiculo.DISPONIVEL
+    )
+    await db.commit()
+    await db.refresh(novo_veiculo)
+    calendario_frota.registrar_veiculo(novo_veiculo.id, novo_veiculo.categoria)
     
     return novo_veiculo
 
-@router.get("/", response_model=List[VeiculoResponse], summary="Listar veículos (Público/Cliente)")
-def listar_veiculos(
+@router.post("/importar", 
+    response_model=ImportacaoResponse,
+    summary="Importar veículos em lote (Admin)",
+    description="Recebe o corpo em streaming, em CSV (com cabeçalho, um veículo por registro; campos entre aspas podem "
+                "ter quebras de linha) ou NDJSON, "
+                "com os campos de VeiculoCreate. Grava em lotes e devolve os erros por linha; "
+                "se o banco recusa um lote, as linhas dele são regravadas uma a uma e só as recusadas entram nos erros. "
+                "Sem `formato`, usa o Content-Type (text/csv ou NDJSON)."
+)
+async def importar_veiculos(
+    request: Request,
+    formato: Optional[FormatoImportacao] = None,
+    db: AsyncSession = Depends(get_async_db),
+    usuario_admin: Admin = Depends(get_current_admin_user)
+):
+    if formato is None:
+        tipo = request.headers.get("content-type", "")
+        formato = FormatoImportacao.CSV if "csv" in tipo else FormatoImportacao.NDJSON
+    return await importacao_service.importar_veiculos(db, request.stream(), formato.value)
+
+@router.get("/", response_model=VeiculoPagina, summary="Listar veículos (Público/Cliente)")
+async def listar_veiculos(
+    request: Request,
     categoria: Optional[CategoriaFilter] = None,
     status: Optional[StatusFilter] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    incluir_total: bool = False,
+    campos: Tuple[str, ...] = Depends(campos_veiculo),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # Com incluir_total a resposta depende do total aproximado (outro cache): não guarda
+    chave = ("lista", categoria, status, cursor, limite, campos)
+    variante = _variante(campos)
+    if not incluir_total:
+        entrada = cache_catalogo.obter(chave)
+        if entrada is not None:
+            return _resposta_condicional(request, entrada.versao, entrada.modificado_em, entrada.corpo, variante)
+    
+    geracao = cache_catalogo.geracao
+    versao, modificado_em = await _versao_catalogo(db)
+    nao_modificada = _resposta_condicional(request, versao, modificado_em, variante=variante)
+    if nao_modificada is not None:
+        return nao_modificada
+    
     try:
-        query = db.query(Veiculo)
+        query = select(*colunas_do_schema(Veiculo, VeiculoResponse, campos))
         
         if categoria is not None:
             categoria_enum = CategoriaVeiculo(categoria.value)
-            query = query.filter(Veiculo.categoria == categoria_enum)
+            query = query.where(Veiculo.categoria == categoria_enum)
         
         if status is not None:
             status_enum = StatusVeiculo(status.value)
-            query = query.filter(Veiculo.status == status_enum)
+            query = query.where(Veiculo.status == status_enum)
+        
+        # Ordenado pelo id (PK); os índices (categoria, id) e (status, id) atendem os filtros
+        veiculos, proximo_cursor = await paginar(db, query, Veiculo.id, cursor, limite, colunas=True)
+        
+        total = None
+        if incluir_total:
+            async def contar():
+                return await db.scalar(select(func.count()).select_from(query.subquery()))
+            total = await cache_totais.obter(("veiculos", categoria, status), contar)
         
-        veiculos = query.all()
-        return veiculos
+        # Mesmo JSON que VeiculoPagina geraria (restrito aos campos pedidos), direto das linhas
+        corpo = json_bytes({
+            "itens": como_dicts(veiculos), "proximo_cursor": proximo_cursor, "total_aproximado": total,
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
+    
+    if not incluir_total:
+        cache_catalogo.guardar(
+            chave, geracao, versao, modificado_em, corpo,
+            categoria=categoria.value if categoria else None, status=status.value if status else None,
+        )
+    return _resposta_condicional(request, versao, modificado_em, corpo, variante)
+
+@router.get("/disponiveis", response_model=List[VeiculoCampos], summary="Veículos livres no período (Público/Cliente)")
+async def listar_veiculos_disponiveis(
+    inicio: datetime,
+    fim: datetime,
+    categoria: Optional[CategoriaFilter] = None,
+    campos: Tuple[str, ...] = Depends(campos_veiculo),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="Período inválido")
+    
+    # A checagem de período é feita em memória; o banco só entrega as linhas
+    categoria_enum = CategoriaVeiculo(categoria.value) if categoria is not None else None
+    livres = calendario_frota.livres(inicio, fim, categoria_enum)
+    consulta = select(*colunas_do_schema(Veiculo, VeiculoResponse, campos)).where(
+        Veiculo.status == StatusVeiculo.DISPONIVEL
+    )
+    if livres is None:
+        # Período além do horizonte do calendário: a checagem vai para o banco
+        consulta = consulta.where(~reserva_no_periodo(Veiculo.id, inicio, fim))
+        if categoria_enum is not None:
+            consulta = consulta.where(Veiculo.categoria == categoria_enum)
+    elif not livres:
+        return []
+    else:
+        consulta = consulta.where(Veiculo.id.in_(livres))
+    
+    resultado = await db.execute(consulta)
+    return resposta_json(como_dicts(resultado.all()))
 
-@router.get("/{veiculo_id}", response_model=VeiculoResponse, summary="Obter um veículo (Público/Cliente)")
-def obter_veiculo(veiculo_id: str, db: Session = Depends(get_db)):
-    veiculo = db.query(Veiculo).filter(Veiculo.id == veiculo_id).first()
+@router.get("/{veiculo_id}", response_model=VeiculoCampos, summary="Obter um veículo (Público/Cliente)")
+async def obter_veiculo(
+    veiculo_id: str,
+    request: Request,
+    campos: Tuple[str, ...] = Depends(campos_veiculo),
+    db: AsyncSession = Depends(get_async_db)
+):
+    chave = ("veiculo", veiculo_id, campos)
+    variante = _variante(campos)
+    entrada = cache_catalogo.obter(chave)
+    if entrada is not None:
+        return _resposta_condicional(request, entrada.versao, entrada.modificado_em, entrada.corpo, variante)
+    
+    geracao = cache_catalogo.geracao
+    versao, modificado_em = await _versao_catalogo(db)
+    nao_modificada = _resposta_condicional(request, versao, modificado_em, variante=variante)
+    if nao_modificada is not None:
+        return nao_modificada
+    
+    query = select(*colunas_do_schema(Veiculo, VeiculoResponse, campos)).where(Veiculo.id == veiculo_id)
+    veiculo = (await db.execute(query)).first()
     if not veiculo:
         raise HTTPException(status_code=404, detail="Veículo não encontrado")
-    return veiculo
+    
+    corpo = json_bytes(veiculo._asdict())
+    cache_catalogo.guardar(chave, geracao, versao, modificado_em, corpo)
+    return _resposta_condicional(request, versao, modificado_em, corpo, variante)
 
 @router.put("/{veiculo_id}", response_model=VeiculoResponse, summary="Atualizar veículo (Admin)")
-def atualizar_veiculo(
+async def atualizar_veiculo(
     veiculo_id: str, 
     veiculo: VeiculoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     usuario_admin: Admin = Depends(get_current_admin_user)
 ):
-    db_veiculo = db.query(Veiculo).filter(Veiculo.id == veiculo_id).first()
+    db_veiculo = await db.get(Veiculo, veiculo_id)
     if not db_veiculo:
         raise HTTPException(status_code=404, detail="Veículo não encontrado")
     
     if veiculo.placa != db_veiculo.placa:
-        placa_existente = db.query(Veiculo).filter(Veiculo.placa == veiculo.placa).first()
+        placa_existente = await db.scalar(select(Veiculo).where(Veiculo.placa == veiculo.placa))
         if placa_existente:
             raise HTTPException(status_code=400, detail="Placa já cadastrada")
     
@@ -90,40 +248,45 @@ def atualizar_veiculo(
     for key, value in veiculo.dict(exclude_unset=True).items():
         setattr(db_veiculo, key, value)
     
-    db.commit()
-    db.refresh(db_veiculo)
+    await db.run_sync(contadores_service.registrar_alteracao_catalogo)
+    await db.commit()
+    await db.refresh(db_veiculo)
+    calendario_frota.registrar_veiculo(db_veiculo.id, db_veiculo.categoria)
     
     return db_veiculo
 
 @router.patch("/{veiculo_id}/status", response_model=VeiculoResponse, summary="Alterar status do veículo (Admin)")
-def alterar_status_veiculo(
+async def alterar_status_veiculo(
     veiculo_id: str,
     status: StatusFilter,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     usuario_admin: Admin = Depends(get_current_admin_user)
 ):
-    db_veiculo = db.query(Veiculo).filter(Veiculo.id == veiculo_id).first()
+    db_veiculo = await db.get(Veiculo, veiculo_id)
     if not db_veiculo:
         raise HTTPException(status_code=404, detail="Veículo não encontrado")
     
     status_enum = StatusVeiculo(status.value)
+    await db.run_sync(contadores_service.registrar_status_veiculo, db_veiculo.status, status_enum)
     db_veiculo.status = status_enum
-    db.commit()
-    db.refresh(db_veiculo)
+    await db.commit()
+    await db.refresh(db_veiculo)
     
     return db_veiculo
 
 @router.delete("/{veiculo_id}", summary="Deletar veículo (Admin)")
-def deletar_veiculo(
+async def deletar_veiculo(
     veiculo_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     usuario_admin: Admin = Depends(get_current_admin_user)
 ):
-    veiculo = db.query(Veiculo).filter(Veiculo.id == veiculo_id).first()
+    veiculo = await db.get(Veiculo, veiculo_id)
     if not veiculo:
         raise HTTPException(status_code=404, detail="Veículo não encontrado")
     
-    db.delete(veiculo)
-    db.commit()
+    await db.delete(veiculo)
+    await db.run_sync(contadores_service.registrar_veiculo_removido, veiculo.status)
+    await db.commit()
+    calendario_frota.remover_veiculo(veiculo_id)
     
     return {"message": "Veículo deletado com sucesso"}
\ No newline at end of file
@@ -0,0 +1,226 @@
+import enum
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from ..models.Veiculos import Veiculo
+from .escuta_invalidacoes import Canal
+
+# Validade máxima de uma entrada: rede de segurança caso alguma notificação se perca
+TTL_SEGUNDOS = float(os.getenv("CACHE_CATALOGO_TTL_SEGUNDOS", "30"))
+# Quantidade máxima de respostas em cache por processo (0 desliga o cache)
+CAPACIDADE = int(os.getenv("CACHE_CATALOGO_CAPACIDADE", "2000"))
+# Canal do LISTEN/NOTIFY que leva as invalidações a todos os workers
+CANAL = "catalogo_veiculos"
+# Acima disso a notificação vira "*" (limpa tudo): o payload do NOTIFY tem limite de 8000 bytes
+MAXIMO_ALTERACOES_NOTIFICADAS = 50
+
+class Alteracao(NamedTuple):
+    """Veículo alterado e as categorias/status que ele tinha antes e depois"""
+    id: str
+    categorias: FrozenSet[str]
+    status: FrozenSet[str]
+
+class Entrada(NamedTuple):
+    expira_em: float
+    versao: int
+    modificado_em: Optional[datetime]
+    corpo: bytes
+    # Só nas listagens: filtros da página
+    categoria: Optional[str] = None
+    status: Optional[str] = None
+
+class CacheCatalogo:
+    """
+    Cache LRU com TTL das respostas públicas do catálogo, já serializadas em JSON:
+    ("veiculo", id, campos) e ("lista", categoria, status, cursor, limite, campos).
+
+    A alteração de um veículo remove a entrada dele e as páginas de listagem cujo
+    filtro aceita a categoria/status de antes ou de depois: mudar um SUV para
+    MANUTENCAO não derruba as listagens de ECONOMICO nem as de LOCADO. (Não dá
+    para restringir pela faixa de ids da página: a ordem é a da collation do
+    banco, não a do Python.) As alterações feitas pelo ORM (ou registradas
+    com registrar_alteracoes_catalogo) invalidam o cache local no commit e são
+    enviadas por NOTIFY aos demais workers. Sem a escuta ativa, o cache não é usado.
+    """
+
+    def __init__(self, capacidade: int = CAPACIDADE, ttl_segundos: float = TTL_SEGUNDOS):
+        self.capacidade = capacidade
+        self.ttl = ttl_segundos
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[Tuple, Entrada]" = OrderedDict()
+        # Muda a cada invalidação: uma resposta montada antes dela não entra no cache
+        self.geracao = 0
+        self.escutando = False
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.escutando and self.capacidade > 0
+
+    def obter(self, chave: Tuple) -> Optional[Entrada]:
+        if not self.ativo:
+            return None
+        agora = time.time()
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is None or entrada.expira_em <= agora:
+                if entrada is not None:
+                    del self._itens[chave]
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def guardar(self, chave: Tuple, geracao: int, versao: int, modificado_em: Optional[datetime],
+                corpo: bytes, categoria: Optional[str] = None, status: Optional[str] = None):
+        if not self.ativo:
+            return
+        entrada = Entrada(time.time() + self.ttl, versao, modificado_em, corpo, categoria, status)
+        with self._lock:
+            if geracao != self.geracao:
+                return
+            self._itens[chave] = entrada
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, alteracoes: Iterable[Alteracao]):
+        with self._lock:
+            self.geracao += 1
+            for alteracao in alteracoes:
+                for chave in [c for c, e in self._itens.items() if _afeta(c, e, alteracao)]:
+                    del self._itens[chave]
+                    self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self.geracao += 1
+            self.invalidacoes += len(self._itens)
+            self._itens.clear()
+
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tamanho": len(self._itens),
+                "capacidade": self.capacidade,
+                "ttl_segundos": self.ttl,
+                "escutando": self.escutando,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "invalidacoes": self.invalidacoes,
+            }
+
+def _afeta(chave: Tuple, entrada: Entrada, alteracao: Alteracao) -> bool:
+    if chave[0] == "veiculo":
+        return chave[1] == alteracao.id
+    return (
+        (entrada.categoria is None or entrada.categoria in alteracao.categorias)
+        and (entrada.status is None or entrada.status in alteracao.status)
+    )
+
+cache_catalogo = CacheCatalogo()
+
+def _valor(valor) -> Optional[str]:
+    return valor.value if isinstance(valor, enum.Enum) else valor
+
+def alteracao_de(veiculo_id: str, categorias: Iterable, status: Iterable) -> Alteracao:
+    return Alteracao(
+        veiculo_id,
+        frozenset(_valor(c) for c in categorias if c is not None),
+        frozenset(_valor(s) for s in status if s is not None),
+    )
+
+# Invalidação: junta as alterações da transação e invalida só depois do commit,
+# como no cache de principais. O NOTIFY sai na mesma transação e o Postgres só o
+# entrega aos outros workers se ela for confirmada.
+_CHAVE_ALTERACOES = "catalogo_alterado"
+
+def anotar_alteracoes_catalogo(session: Session, alteracoes: Optional[List[Alteracao]]):
+    """Só a invalidação local, no commit da sessão (o NOTIFY já saiu por outra instrução)"""
+    pendentes = session.info.get(_CHAVE_ALTERACOES, [])
+    if alteracoes is None or pendentes is None:
+        session.info[_CHAVE_ALTERACOES] = None
+    else:
+        session.info[_CHAVE_ALTERACOES] = pendentes + list(alteracoes)
+
+def registrar_alteracoes_catalogo(session: Session, alteracoes: Optional[List[Alteracao]]):
+    """Para escritas que não passam pelo ORM (INSERT/UPDATE em lote). None: o catálogo todo."""
+    if alteracoes is not None and not alteracoes:
+        return
+    anotar_alteracoes_catalogo(session, alteracoes)
+    # pg_notify só existe no Postgres (o after_flush vale para toda Session, inclusive
+    # de scripts em outro banco): fora dele fica só a invalidação local
+    if session.get_bind().dialect.name != "postgresql":
+        return
+
+    if alteracoes is None or len(alteracoes) > MAXIMO_ALTERACOES_NOTIFICADAS:
+        payload = "*"
+    else:
+        payload = json.dumps(
+            [[a.id, sorted(a.categorias), sorted(a.status)] for a in alteracoes], separators=(",", ":")
+        )
+    session.connection().execute(select(func.pg_notify(CANAL, payload)))
+
+def _decodificar(payload: str) -> Optional[List[Alteracao]]:
+    if payload == "*":
+        return None
+    try:
+        return [alteracao_de(i, c, s) for i, c, s in json.loads(payload)]
+    except (ValueError, TypeError):
+        return None
+
+def _aplicar(alteracoes: Optional[List[Alteracao]]):
+    if alteracoes is None:
+        cache_catalogo.limpar()
+    else:
+        cache_catalogo.invalidar(alteracoes)
+
+@event.listens_for(Session, "after_flush")
+def _coletar_veiculos_alterados(session, flush_context):
+    alteracoes = []
+    for veiculo in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(veiculo, Veiculo):
+            continue
+        if veiculo in session.dirty and not session.is_modified(veiculo):
+            continue
+        estado = inspect(veiculo)
+        anteriores_categoria = estado.attrs.categoria.history.deleted or ()
+        anteriores_status = estado.attrs.status.history.deleted or ()
+        alteracoes.append(alteracao_de(
+            veiculo.id,
+            [veiculo.categoria, *anteriores_categoria],
+            [veiculo.status, *anteriores_status],
+        ))
+    if alteracoes:
+        registrar_alteracoes_catalogo(session, alteracoes)
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_catalogo(session):
+    if _CHAVE_ALTERACOES in session.info:
+        _aplicar(session.info.pop(_CHAVE_ALTERACOES))
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_catalogo(session, previous_transaction):
+    session.info.pop(_CHAVE_ALTERACOES, None)
+
+def _escuta_conectada():
+    cache_catalogo.limpar()
+    cache_catalogo.escutando = True
+
+def _escuta_caiu():
+    cache_catalogo.escutando = False
+    cache_catalogo.limpar()
+
+# Para a EscutaInvalidacoes (app/utils/escuta_invalidacoes.py)
+canal_catalogo = Canal(lambda payload: _aplicar(_decodificar(payload)), _escuta_conectada, _escuta_caiu)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+def etag_fraca(versao: int, variante: Optional[str] = None) -> str:
+    """`variante` distingue representações da mesma versão (ex.: só alguns campos)"""
+    return f'W/"v{versao}-{variante}"' if variante else f'W/"v{versao}"'
+
+def cabecalhos_validacao(etag: str, modificado_em: Optional[datetime]) -> Dict[str, str]:
+    # no-cache: o cliente pode guardar a resposta, mas revalida (If-None-Match) a cada uso
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if modificado_em is not None:
+        cabecalhos["Last-Modified"] = format_datetime(modificado_em, usegmt=True)
+    return cabecalhos
+
+def _sem_prefixo_fraco(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def nao_modificado(request: Request, etag: str, modificado_em: Optional[datetime]) -> bool:
+    """
+    Avalia If-None-Match (comparação fraca, como manda a RFC 9110 para GET) e,
+    só na ausência dele, If-Modified-Since.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        alvo = _sem_prefixo_fraco(etag)
+        return any(_sem_prefixo_fraco(e.strip()) == alvo for e in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and modificado_em is not None:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # Last-Modified tem resolução de segundos
+        return desde.tzinfo is not None and modificado_em.replace(microsecond=0) <= desde
+    return False
+
+def resposta_304(cabecalhos: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=cabecalhos)
@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from ..models.Adm import Admin
+from ..models.Cliente import Cliente
+from .escuta_invalidacoes import Canal
+
+# Validade máxima de uma entrada: é o atraso máximo para outro worker enxergar uma
+# alteração do usuário (senha, desativação) se a notificação dela se perder
+TTL_SEGUNDOS = float(os.getenv("CACHE_PRINCIPAIS_TTL_SEGUNDOS", "30"))
+# Quantidade máxima de usuários em cache por processo (0 desliga o cache)
+CAPACIDADE = int(os.getenv("CACHE_PRINCIPAIS_CAPACIDADE", "10000"))
+# Canal do LISTEN/NOTIFY que leva as invalidações a todos os workers
+CANAL = "principais"
+# Acima disso a notificação vira "*" (limpa tudo): o payload do NOTIFY tem limite de 8000 bytes
+MAXIMO_DONOS_NOTIFICADOS = 50
+# Identifica este processo nas notificações: as dele já foram aplicadas no commit
+ORIGEM = uuid.uuid4().hex
+
+# (tipo, sub do token): e-mail do cliente ou código do admin
+Chave = Tuple[str, str]
+# (tipo, chave primária) do usuário
+Dono = Tuple[str, str]
+
+def dono_de(usuario) -> Optional[Dono]:
+    if isinstance(usuario, Cliente):
+        return ("cliente", usuario.cli_id)
+    if isinstance(usuario, Admin):
+        return ("admin", usuario.adm_id)
+    return None
+
+def _retrato(usuario) -> Tuple[type, Tuple[Tuple[str, Any], ...]]:
+    """Classe e colunas carregadas do usuário, em uma tupla imutável"""
+    carregados = inspect(usuario).dict
+    return type(usuario), tuple(
+        (atributo.key, carregados[atributo.key])
+        for atributo in inspect(type(usuario)).column_attrs
+        if atributo.key in carregados
+    )
+
+def _instancia(retrato: Tuple[type, Tuple[Tuple[str, Any], ...]]):
+    """Uma instância nova, desanexada (como se viesse de uma sessão já fechada)"""
+    classe, colunas = retrato
+    usuario = classe(**dict(colunas))
+    make_transient_to_detached(usuario)
+    return usuario
+
+class CachePrincipais:
+    """
+    Cache LRU com TTL do usuário autenticado (Cliente ou Admin) pelo sub do token.
+
+    Só é consultado depois de o token ser validado (assinatura e exp): um acerto
+    dispensa apenas o SELECT do usuário. Guarda um retrato imutável das colunas
+    e cada acerto devolve uma instância nova, desanexada: requisições
+    concorrentes nunca dividem o mesmo objeto. Alterar ou remover o usuário
+    pelo ORM invalida a entrada dele quando a transação é confirmada, aqui e,
+    por NOTIFY, nos demais workers. Sem a escuta ativa, o cache não é usado;
+    alterações feitas por fora do ORM só são vistas quando o TTL vence.
+    """
+
+    def __init__(self, capacidade: int = CAPACIDADE, ttl_segundos: float = TTL_SEGUNDOS):
+        self.capacidade = capacidade
+        self.ttl = ttl_segundos
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[Chave, Tuple[float, Dono, Any]]" = OrderedDict()
+        self._chaves_por_dono: Dict[Dono, Set[Chave]] = {}
+        # Muda a cada invalidação: um usuário lido antes dela não entra no cache
+        self.geracao = 0
+        self.escutando = False
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.escutando and self.capacidade > 0
+
+    def obter(self, tipo: str, sub: Optional[str]):
+        if not self.ativo:
+            return None
+        chave = (tipo, sub)
+        agora = time.time()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[0] <= agora:
+                if item is not None:
+                    self._remover(chave)
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            retrato = item[2]
+        return _instancia(retrato)
+
+    def guardar(self, tipo: str, sub: str, usuario, geracao: int):
+        dono = dono_de(usuario)
+        if dono is None or not self.ativo:
+            return
+        chave = (tipo, sub)
+        retrato = _retrato(usuario)
+        with self._lock:
+            if geracao != self.geracao:
+                return
+            self._remover(chave)
+            self._itens[chave] = (time.time() + self.ttl, dono, retrato)
+            self._chaves_por_dono.setdefault(dono, set()).add(chave)
+            while len(self._itens) > self.capacidade:
+                self._remover(next(iter(self._itens)))
+
+    def invalidar(self, dono: Dono):
+        with self._lock:
+            self.geracao += 1
+            chaves = self._chaves_por_dono.pop(dono, set())
+            for chave in chaves:
+                self._itens.pop(chave, None)
+            self.invalidacoes += len(chaves)
+
+    def limpar(self):
+        with self._lock:
+            self.geracao += 1
+            self._itens.clear()
+            self._chaves_por_dono.clear()
+
+    def _remover(self, chave: Chave):
+        item = self._itens.pop(chave, None)
+        if item is None:
+            return
+        chaves = self._chaves_por_dono.get(item[1])
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._chaves_por_dono[item[1]]
+
+    def resumo(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "tamanho": len(self._itens),
+                "capacidade": self.capacidade,
+                "ttl_segundos": self.ttl,
+                "escutando": self.escutando,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "invalidacoes": self.invalidacoes,
+            }
+
+cache_principais = CachePrincipais()
+
+# Invalidação: junta os usuários alterados no flush e invalida só depois do commit,
+# para que outra requisição não recoloque no cache a versão antiga
+_CHAVE_ALTERADOS = "principais_alterados"
+
+def _notificar(session: Session, donos: Set[Dono]):
+    """NOTIFY na transação da sessão: os outros workers só o recebem se ela for confirmada"""
+    # pg_notify só existe no Postgres: fora dele fica só a invalidação local
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    lista = sorted(donos) if len(donos) <= MAXIMO_DONOS_NOTIFICADOS else None
+    payload = json.dumps({"origem": ORIGEM, "donos": lista}, separators=(",", ":"))
+    session.connection().execute(select(func.pg_notify(CANAL, payload)))
+
+def _aplicar(payload: str):
+    try:
+        mensagem = json.loads(payload)
+        if mensagem["origem"] == ORIGEM:
+            return
+        donos = mensagem["donos"]
+        if donos is not None:
+            donos = [(tipo, id) for tipo, id in donos]
+    except (ValueError, TypeError, KeyError):
+        donos = None
+    if donos is None:
+        cache_principais.limpar()
+    else:
+        for dono in donos:
+            cache_principais.invalidar(dono)
+
+@event.listens_for(Session, "after_flush")
+def _coletar_principais_alterados(session, flush_context):
+    donos = {dono for dono in map(dono_de, list(session.dirty) + list(session.deleted)) if dono is not None}
+    if not donos:
+        return
+    session.info.setdefault(_CHAVE_ALTERADOS, set()).update(donos)
+    _notificar(session, donos)
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_principais_alterados(session):
+    for dono in session.info.pop(_CHAVE_ALTERADOS, ()):
+        cache_principais.invalidar(dono)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_principais_alterados(session, previous_transaction):
+    session.info.pop(_CHAVE_ALTERADOS, None)
+
+def _escuta_conectada():
+    cache_principais.limpar()
+    cache_principais.escutando = True
+
+def _escuta_caiu():
+    cache_principais.escutando = False
+    cache_principais.limpar()
+
+# Para a EscutaInvalidacoes (app/utils/escuta_invalidacoes.py)
+canal_principais = Canal(_aplicar, _escuta_conectada, _escuta_caiu)
@@ -1,43 +1,52 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from ..models.Adm import Admin
 from ..models.Cliente import Cliente
-from ..database import get_db
+from ..database import get_async_db
 from ..utils.security import verificar_token
+from ..utils.cache_principais import cache_principais
 
 # Aponta para a rota de login do CLIENTE
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/cliente/login")
 
 # Dependência para obter usuário (Cliente) atual
-def get_current_cliente_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Cliente:
-    
-    
+async def get_current_cliente_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Cliente:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # Assinatura e validade do token são sempre conferidas; o cache só dispensa a consulta
     token_data = verificar_token(token)
     if token_data is None:
         raise credentials_exception
     
+    # Verifica se o token é de cliente
+    if token_data.get("role") != "cliente":
+        raise credentials_exception
+    
     # O email (sub) do token é usado para encontrar o cliente
-    usuario = db.query(Cliente).filter(Cliente.cli_email == token_data.get("sub")).first()
+    email = token_data.get("sub")
+    usuario = cache_principais.obter("cliente", email)
+    if usuario is not None:
+        return usuario
+    
+    geracao = cache_principais.geracao
+    usuario = await db.scalar(select(Cliente).where(Cliente.cli_email == email))
     if usuario is None:
         raise credentials_exception
     
-    # Verifica se o token é de cliente
-    if token_data.get("role") != "cliente":
-         raise credentials_exception
-    
+    db.expunge(usuario)
+    cache_principais.guardar("cliente", email, usuario, geracao)
     return usuario
 
 # Dependência para validar administrador
-def get_current_admin_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Admin:
+async def get_current_admin_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Admin:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais de admin",
@@ -55,9 +64,17 @@ def get_current_admin_user(token: str = Depends(oauth2_scheme), db: Session = De
             detail="Permissão negada: acesso restrito a administradores"
         )
     
-    admin = db.query(Admin).filter(Admin.codigo_admin == token_data.get("sub")).first()
+    codigo = token_data.get("sub")
+    admin = cache_principais.obter("admin", codigo)
+    if admin is not None:
+        return admin
+    
+    geracao = cache_principais.geracao
+    admin = await db.scalar(select(Admin).where(Admin.codigo_admin == codigo))
     if admin is None:
         
         raise credentials_exception
     
-    return admin
\ No newline at end of file
+    db.expunge(admin)
+    cache_principais.guardar("admin", codigo, admin, geracao)
+    return admin
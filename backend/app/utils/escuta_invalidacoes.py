@@ -0,0 +1,79 @@
+import threading
+from select import select as esperar_leitura
+from typing import Callable, Dict, NamedTuple, Optional
+
+class Canal(NamedTuple):
+    """O que um cache faz com as notificações do canal dele e quando a escuta começa ou cai"""
+    aplicar: Callable[[str], None]
+    conectada: Callable[[], None]
+    caiu: Callable[[], None]
+
+class EscutaInvalidacoes:
+    """
+    Thread com uma conexão dedicada (fora do pool) em LISTEN nos canais de
+    invalidação dos caches em memória (catálogo, usuários autenticados). Ao
+    (re)conectar e ao cair avisa cada canal, já que notificações podem ter sido
+    perdidas enquanto estava fora.
+    """
+
+    def __init__(self, engine, canais: Dict[str, Canal]):
+        self.engine = engine
+        self.canais = canais
+        self._parar = threading.Event()
+        self._conectada = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if not self.canais or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._executar, name="escuta-invalidacoes", daemon=True)
+        self._thread.start()
+
+    def aguardar(self, segundos: float) -> bool:
+        """Espera a escuta conectar (os caches só são usados com ela ativa)"""
+        return self._conectada.wait(segundos)
+
+    def parar(self):
+        self._parar.set()
+        for canal in self.canais.values():
+            canal.caiu()
+
+    def _conectar(self):
+        dialeto = self.engine.dialect
+        args, kwargs = dialeto.create_connect_args(self.engine.url)
+        conexao = dialeto.connect(*args, **kwargs)
+        conexao.autocommit = True
+        with conexao.cursor() as cursor:
+            for nome in self.canais:
+                cursor.execute(f"LISTEN {nome}")
+        return conexao
+
+    def _executar(self):
+        while not self._parar.is_set():
+            conexao = None
+            try:
+                conexao = self._conectar()
+                for canal in self.canais.values():
+                    canal.conectada()
+                self._conectada.set()
+                while not self._parar.is_set():
+                    if esperar_leitura([conexao], [], [], 1.0) == ([], [], []):
+                        continue
+                    conexao.poll()
+                    while conexao.notifies:
+                        notificacao = conexao.notifies.pop(0)
+                        canal = self.canais.get(notificacao.channel)
+                        if canal is not None:
+                            canal.aplicar(notificacao.payload)
+            except Exception as e:
+                print(f" Escuta de invalidação dos caches caiu, reconectando: {e}")
+            finally:
+                self._conectada.clear()
+                for canal in self.canais.values():
+                    canal.caiu()
+                if conexao is not None:
+                    try:
+                        conexao.close()
+                    except Exception:
+                        pass
+            self._parar.wait(1.0)
@@ -0,0 +1,403 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..database import engine, async_engine
+from ..models.ChaveIdempotencia import ChaveIdempotencia
+from .security import verificar_token
+
+# Por quanto tempo uma resposta fica guardada para repetições da mesma chave
+TTL_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_TTL_SEGUNDOS", "86400"))
+# Quantidade máxima de respostas no cache em memória de cada processo (0 desliga só o cache)
+CAPACIDADE = int(os.getenv("IDEMPOTENCIA_CAPACIDADE", "20000"))
+# Quanto uma repetição espera pela primeira requisição ainda em andamento
+ESPERA_MAXIMA_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_ESPERA_SEGUNDOS", "30"))
+# Prazo de uma requisição em andamento na tabela: depois dele (worker que caiu) a chave é liberada
+ANDAMENTO_MAXIMO_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_ANDAMENTO_SEGUNDOS", "120"))
+# De quanto em quanto tempo cada processo apaga as linhas vencidas da tabela
+LIMPEZA_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_LIMPEZA_SEGUNDOS", "300"))
+
+CABECALHO = b"idempotency-key"
+TAMANHO_MAXIMO_CHAVE = 255
+
+# (método, caminho sem a barra final) das rotas que aceitam Idempotency-Key
+ROTAS_IDEMPOTENTES = {
+    ("POST", "/api/reservas"),
+    ("POST", "/api/reservas/lote"),
+    ("POST", "/api/auth/cliente/registrar"),
+}
+
+class Resposta(NamedTuple):
+    expira_em: float
+    impressao: bytes
+    status: int
+    cabecalhos: List[Tuple[bytes, bytes]]
+    corpo: bytes
+
+class RepositorioIdempotencia:
+    """
+    Cache em memória, à frente da tabela chaves_idempotencia, das respostas já
+    enviadas por chave de idempotência, em LRU com TTL.
+
+    A chave guardada é um hash de 16 bytes do método, caminho, usuário do token
+    (role e sub) e Idempotency-Key: a mesma chave de clientes diferentes não
+    colide e uma repetição com o token renovado continua sendo a mesma; a impressão é um hash do corpo do
+    pedido, para recusar a chave reaproveitada com outro conteúdo. Enquanto a
+    primeira requisição de uma chave está em andamento neste processo, as
+    repetições que chegam a ele esperam por ela sem consultar o banco.
+    """
+
+    def __init__(self, capacidade: int = CAPACIDADE, ttl_segundos: float = TTL_SEGUNDOS):
+        self.capacidade = capacidade
+        self.ttl = ttl_segundos
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[bytes, Resposta]" = OrderedDict()
+        self._em_andamento: Dict[bytes, Tuple[bytes, asyncio.Event]] = {}
+        self._proxima_limpeza = 0.0
+        self.repeticoes = 0
+        self.repeticoes_banco = 0
+        self.esperas = 0
+        self.conflitos = 0
+
+    def obter(self, chave: bytes) -> Optional[Resposta]:
+        agora = time.time()
+        with self._lock:
+            resposta = self._itens.get(chave)
+            if resposta is None:
+                return None
+            if resposta.expira_em <= agora:
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return resposta
+
+    def guardar(
+        self, chave: bytes, impressao: bytes, status: int, cabecalhos: List[Tuple[bytes, bytes]], corpo: bytes,
+        expira_em: Optional[float] = None,
+    ) -> Resposta:
+        resposta = Resposta(expira_em or time.time() + self.ttl, impressao, status, cabecalhos, corpo)
+        if self.capacidade <= 0:
+            return resposta
+        with self._lock:
+            self._itens[chave] = resposta
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+        return resposta
+
+    def iniciar(self, chave: bytes, impressao: bytes) -> Optional[Tuple[bytes, asyncio.Event]]:
+        """Marca a chave como em andamento; se já estava, devolve (impressão, evento) da primeira"""
+        with self._lock:
+            atual = self._em_andamento.get(chave)
+            if atual is None:
+                self._em_andamento[chave] = (impressao, asyncio.Event())
+            return atual
+
+    def concluir(self, chave: bytes):
+        with self._lock:
+            _, evento = self._em_andamento.pop(chave)
+        evento.set()
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def limpeza_devida(self) -> bool:
+        """True uma vez a cada LIMPEZA_SEGUNDOS: hora de apagar as linhas vencidas da tabela"""
+        agora = time.monotonic()
+        with self._lock:
+            if agora < self._proxima_limpeza:
+                return False
+            self._proxima_limpeza = agora + LIMPEZA_SEGUNDOS
+            return True
+
+    def resumo(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "tamanho": len(self._itens),
+                "capacidade": self.capacidade,
+                "ttl_segundos": self.ttl,
+                "em_andamento": len(self._em_andamento),
+                "repeticoes": self.repeticoes,
+                "repeticoes_banco": self.repeticoes_banco,
+                "esperas": self.esperas,
+                "conflitos": self.conflitos,
+            }
+
+repositorio_idempotencia = RepositorioIdempotencia()
+
+# Tabela compartilhada pelos workers. Cada operação é uma transação curta e própria,
+# fora da sessão da rota: a reivindicação precisa ser vista pelos outros antes de a rota rodar.
+_tabela = ChaveIdempotencia.__table__
+
+async def _no_banco(funcao, *args):
+    if async_engine is not None:
+        async with async_engine.begin() as conn:
+            return await conn.run_sync(funcao, *args)
+
+    def executar():
+        with engine.begin() as conn:
+            return funcao(conn, *args)
+    return await run_in_threadpool(executar)
+
+def _reivindicar(conn, chave: bytes, impressao: bytes):
+    """
+    Tenta ficar com a chave: INSERT ... ON CONFLICT, que só sobrescreve uma
+    linha vencida. Devolve None se conseguiu; senão a linha atual (ou None de
+    novo, se ela sumiu entre as duas instruções: basta tentar outra vez).
+    """
+    prazo = func.now() + timedelta(seconds=ANDAMENTO_MAXIMO_SEGUNDOS)
+    instrucao = pg_insert(_tabela).values(chave=chave, impressao=impressao, expira_em=prazo)
+    instrucao = instrucao.on_conflict_do_update(
+        index_elements=[_tabela.c.chave],
+        set_={
+            "impressao": instrucao.excluded.impressao, "status": None, "cabecalhos": None, "corpo": None,
+            "criado_em": func.now(), "expira_em": instrucao.excluded.expira_em,
+        },
+        where=_tabela.c.expira_em <= func.now(),
+    ).returning(_tabela.c.chave)
+    if conn.execute(instrucao).first() is not None:
+        return True, None
+    return False, conn.execute(
+        select(_tabela.c.impressao, _tabela.c.status, _tabela.c.cabecalhos, _tabela.c.corpo, _tabela.c.expira_em)
+        .where(_tabela.c.chave == chave)
+    ).first()
+
+def _gravar_resposta(conn, chave: bytes, status: int, cabecalhos: List[Tuple[bytes, bytes]], corpo: bytes):
+    conn.execute(
+        update(_tabela).where(_tabela.c.chave == chave).values(
+            status=status,
+            cabecalhos=[[nome.decode("latin-1"), valor.decode("latin-1")] for nome, valor in cabecalhos],
+            corpo=corpo,
+            expira_em=func.now() + timedelta(seconds=TTL_SEGUNDOS),
+        )
+    )
+
+def _liberar(conn, chave: bytes):
+    """A resposta não foi guardada (5xx, recusa transitória, falha): a próxima tentativa executa"""
+    conn.execute(delete(_tabela).where(_tabela.c.chave == chave, _tabela.c.status.is_(None)))
+
+def _remover_vencidas(conn):
+    conn.execute(delete(_tabela).where(_tabela.c.expira_em < func.now()))
+
+def _guardavel(status: int, cabecalhos: List[Tuple[bytes, bytes]]) -> bool:
+    # Erros do servidor e recusas transitórias (409 com Retry-After) podem dar certo na repetição
+    return status < 500 and not any(nome.lower() == b"retry-after" for nome, _ in cabecalhos)
+
+def _dono(cabecalhos: Dict[bytes, bytes]) -> Optional[bytes]:
+    """
+    Escopo da chave: role e sub do token (não o texto do token, que muda a cada
+    renovação); vazio sem Authorization. None se o token não vale: a rota recusa.
+    """
+    autorizacao = cabecalhos.get(b"authorization")
+    if autorizacao is None:
+        return b""
+    tipo, _, token = autorizacao.decode("latin-1").partition(" ")
+    dados = verificar_token(token.strip()) if tipo.lower() == "bearer" else None
+    if dados is None or dados.get("sub") is None:
+        return None
+    return _hash(str(dados.get("role", "")).encode(), str(dados["sub"]).encode())
+
+def _hash(*partes: bytes) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        h.update(len(parte).to_bytes(4, "big"))
+        h.update(parte)
+    return h.digest()
+
+async def _responder_json(send, status: int, conteudo: dict, cabecalhos: List[Tuple[bytes, bytes]] = ()):
+    corpo = orjson.dumps(conteudo)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(corpo)).encode()), *cabecalhos],
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+async def _repetir(send, resposta: Resposta):
+    await send({
+        "type": "http.response.start",
+        "status": resposta.status,
+        "headers": [*resposta.cabecalhos, (b"idempotent-replayed", b"true")],
+    })
+    await send({"type": "http.response.body", "body": resposta.corpo})
+
+_CONFLITO = {"detail": "Idempotency-Key já usada com outro corpo de requisição"}
+_EM_ANDAMENTO = {"detail": "Requisição com esta Idempotency-Key ainda em andamento"}
+
+class MiddlewareIdempotencia:
+    """
+    Middleware ASGI do cabeçalho Idempotency-Key nas ROTAS_IDEMPOTENTES.
+
+    A primeira requisição de uma chave reivindica a linha dela em
+    chaves_idempotencia, segue normalmente e a resposta (exceto 5xx e recusas
+    transitórias) fica gravada na tabela e no cache em memória. Uma repetição
+    com o mesmo corpo, em qualquer worker, recebe a resposta gravada, com
+    Idempotent-Replayed: true, sem passar pela rota: nem autenticação, nem
+    bcrypt. Repetições que chegam enquanto a primeira ainda roda esperam por
+    ela. A mesma chave com outro corpo recebe 422. Sem o cabeçalho, ou com um
+    token inválido (a rota recusa), nada muda.
+    """
+
+    def __init__(self, app, repositorio: RepositorioIdempotencia = repositorio_idempotencia):
+        self.app = app
+        self.repositorio = repositorio
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"].rstrip("/")) not in ROTAS_IDEMPOTENTES:
+            return await self.app(scope, receive, send)
+        cabecalhos = dict(scope["headers"])
+        chave_cliente = cabecalhos.get(CABECALHO)
+        if chave_cliente is None:
+            return await self.app(scope, receive, send)
+        if not chave_cliente or len(chave_cliente) > TAMANHO_MAXIMO_CHAVE:
+            return await _responder_json(send, 400, {
+                "detail": f"Idempotency-Key deve ter de 1 a {TAMANHO_MAXIMO_CHAVE} caracteres"
+            })
+
+        dono = _dono(cabecalhos)
+        if dono is None:
+            return await self.app(scope, receive, send)
+
+        # O corpo é lido aqui para a impressão e repassado à rota
+        partes = []
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "http.disconnect":
+                return
+            partes.append(mensagem.get("body", b""))
+            if not mensagem.get("more_body"):
+                break
+        corpo = b"".join(partes)
+        chave = _hash(
+            scope["method"].encode(), scope["path"].rstrip("/").encode(),
+            dono, chave_cliente,
+        )
+        impressao = _hash(corpo)
+
+        # Primeiro o que este processo já sabe: respostas em cache e requisições rodando nele
+        prazo = time.monotonic() + ESPERA_MAXIMA_SEGUNDOS
+        while True:
+            guardada = self.repositorio.obter(chave)
+            if guardada is not None:
+                return await self._repetir(send, guardada, impressao)
+
+            primeira = self.repositorio.iniciar(chave, impressao)
+            if primeira is None:
+                break
+            if primeira[0] != impressao:
+                self.repositorio.conflitos += 1
+                return await _responder_json(send, 422, _CONFLITO)
+            self.repositorio.esperas += 1
+            try:
+                await asyncio.wait_for(primeira[1].wait(), max(prazo - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                return await _responder_json(send, 409, _EM_ANDAMENTO, [(b"retry-after", b"1")])
+            # A primeira terminou: repete a resposta dela ou, se não foi guardada, segue
+
+        try:
+            await self._pela_tabela(scope, corpo, receive, send, chave, impressao, prazo)
+        finally:
+            self.repositorio.concluir(chave)
+
+    async def _repetir(self, send, resposta: Resposta, impressao: bytes):
+        if resposta.impressao != impressao:
+            self.repositorio.conflitos += 1
+            return await _responder_json(send, 422, _CONFLITO)
+        self.repositorio.repeticoes += 1
+        await _repetir(send, resposta)
+
+    async def _pela_tabela(self, scope, corpo: bytes, receive, send, chave: bytes, impressao: bytes, prazo: float):
+        """A tabela decide entre os workers: quem cria a linha executa, os demais repetem ou esperam"""
+        if self.repositorio.limpeza_devida():
+            await _no_banco(_remover_vencidas)
+
+        intervalo = 0.05
+        esperou = False
+        while True:
+            dono, linha = await _no_banco(_reivindicar, chave, impressao)
+            if dono:
+                break
+            if linha is None:
+                continue
+            if linha.status is not None:
+                self.repositorio.repeticoes_banco += 1
+                resposta = self.repositorio.guardar(
+                    chave, linha.impressao, linha.status,
+                    [(nome.encode("latin-1"), valor.encode("latin-1")) for nome, valor in linha.cabecalhos],
+                    linha.corpo, linha.expira_em.timestamp(),
+                )
+                return await self._repetir(send, resposta, impressao)
+            if linha.impressao != impressao:
+                self.repositorio.conflitos += 1
+                return await _responder_json(send, 422, _CONFLITO)
+
+            # Em andamento em outro worker: consulta de novo, com intervalos crescentes
+            if not esperou:
+                esperou = True
+                self.repositorio.esperas += 1
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                return await _responder_json(send, 409, _EM_ANDAMENTO, [(b"retry-after", b"1")])
+            await asyncio.sleep(min(intervalo, restante))
+            intervalo = min(intervalo * 2, 0.5)
+
+        gravada = False
+        try:
+            gravada = await self._executar(scope, corpo, receive, send, chave, impressao)
+        finally:
+            if not gravada:
+                try:
+                    await _no_banco(_liberar, chave)
+                except Exception as e:
+                    # A linha fica até vencer o prazo de andamento
+                    print(f" Erro ao liberar chave de idempotência: {e}")
+
+    async def _executar(self, scope, corpo: bytes, receive, send, chave: bytes, impressao: bytes) -> bool:
+        """Roda a rota; True se a resposta foi gravada (antes de o último pedaço sair para o cliente)"""
+        entregue = False
+        gravada = False
+
+        async def receber():
+            nonlocal entregue
+            if not entregue:
+                entregue = True
+                return {"type": "http.request", "body": corpo, "more_body": False}
+            # Depois do corpo, só resta a desconexão do cliente
+            return await receive()
+
+        inicio: dict = {}
+        corpo_resposta = []
+
+        async def enviar(mensagem):
+            nonlocal gravada
+            if mensagem["type"] == "http.response.start":
+                inicio.update(mensagem)
+            elif mensagem["type"] == "http.response.body":
+                corpo_resposta.append(mensagem.get("body", b""))
+                if not mensagem.get("more_body"):
+                    status, cabecalhos = inicio["status"], list(inicio.get("headers", []))
+                    if _guardavel(status, cabecalhos):
+                        completo = b"".join(corpo_resposta)
+                        try:
+                            await _no_banco(_gravar_resposta, chave, status, cabecalhos, completo)
+                            gravada = True
+                        except Exception as e:
+                            # A resposta sai mesmo assim; sem gravá-la, a chave é liberada
+                            print(f" Erro ao gravar resposta de idempotência: {e}")
+                        if gravada:
+                            self.repositorio.guardar(chave, impressao, status, cabecalhos, completo)
+            await send(mensagem)
+
+        await self.app(scope, receber, enviar)
+        return gravada
@@ -0,0 +1,82 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+class MedidorPool:
+    """Contadores acumulados de checkout de um pool de conexões"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.overflows = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar(self, espera: float, overflow: bool = False, timeout: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            if overflow:
+                self.overflows += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+
+    def resumo(self) -> Dict[str, float]:
+        with self._lock:
+            tentativas = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "overflows": self.overflows,
+                "timeouts": self.timeouts,
+                "espera_media_ms": self.espera_total / tentativas * 1000 if tentativas else 0.0,
+                "espera_maxima_ms": self.espera_maxima * 1000,
+            }
+
+class _PoolMedido:
+    """
+    Mede quanto cada checkout espera por uma conexão (inclui abrir conexão
+    nova e o pre-ping), quantos precisaram de overflow e quantos estouraram
+    o pool_timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.medidor = MedidorPool()
+
+    def connect(self):
+        overflow_antes = self._overflow
+        inicio = time.perf_counter()
+        try:
+            conexao = super().connect()
+        except exc.TimeoutError:
+            self.medidor.registrar(time.perf_counter() - inicio, timeout=True)
+            print(f" Pool de conexões esgotado: {self.status()}")
+            raise
+        self.medidor.registrar(
+            time.perf_counter() - inicio,
+            overflow=self._overflow > overflow_antes and self._overflow > 0,
+        )
+        return conexao
+
+    def estado(self) -> Dict[str, float]:
+        return {
+            "tamanho": self.size(),
+            "em_uso": self.checkedout(),
+            "ociosas": self.checkedin(),
+            "overflow_atual": max(self.overflow(), 0),
+            "overflow_maximo": self._max_overflow,
+            "timeout_segundos": self._timeout,
+            **self.medidor.resumo(),
+        }
+
+class QueuePoolMedido(_PoolMedido, QueuePool):
+    pass
+
+class AsyncAdaptedQueuePoolMedido(_PoolMedido, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,77 @@
+import base64
+import binascii
+import json
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+# Tamanho de página padrão e teto aceito no parâmetro `limite`
+LIMITE_PADRAO = int(os.getenv("PAGINACAO_LIMITE_PADRAO", "50"))
+LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", "200"))
+# Validade do total aproximado em cache
+TOTAL_TTL_SEGUNDOS = float(os.getenv("PAGINACAO_TOTAL_TTL_SEGUNDOS", "60"))
+
+def codificar_cursor(ultima_chave: str) -> str:
+    """Gera o cursor opaco que aponta para depois da última chave da página"""
+    bruto = json.dumps({"k": ultima_chave}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> str:
+    """Extrai a última chave do cursor; cursor adulterado vira 400"""
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(preenchido.encode()))
+        chave = dados["k"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+    if not isinstance(chave, str):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+    return chave
+
+async def paginar(
+    db, stmt, coluna_chave, cursor: Optional[str], limite: int, colunas: bool = False
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Paginação por chave (keyset): WHERE chave > :ultima ORDER BY chave LIMIT n+1.
+    O custo é o mesmo na primeira ou na milésima página, desde que exista índice
+    cobrindo os filtros seguidos da chave. Com `colunas`, o stmt seleciona colunas
+    e a página vem como linhas Core em vez de objetos do ORM.
+    """
+    if cursor is not None:
+        stmt = stmt.where(coluna_chave > decodificar_cursor(cursor))
+    stmt = stmt.order_by(coluna_chave).limit(limite + 1)
+    if colunas:
+        linhas = (await db.execute(stmt)).all()
+    else:
+        linhas = (await db.scalars(stmt)).all()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo_cursor = codificar_cursor(getattr(linhas[-1], coluna_chave.key))
+    return linhas, proximo_cursor
+
+class CacheTotais:
+    """Cache com TTL de contagens por combinação de filtros"""
+
+    def __init__(self, ttl_segundos: float = TOTAL_TTL_SEGUNDOS):
+        self.ttl = ttl_segundos
+        self._lock = threading.Lock()
+        self._valores: Dict[Tuple, Tuple[float, int]] = {}
+
+    async def obter(self, chave: Tuple, contar: Callable[[], Awaitable[int]]) -> int:
+        agora = time.monotonic()
+        with self._lock:
+            item = self._valores.get(chave)
+        if item is not None and item[0] > agora:
+            return item[1]
+
+        total = await contar()
+        with self._lock:
+            self._valores[chave] = (agora + self.ttl, total)
+        return total
+
+cache_totais = CacheTotais()
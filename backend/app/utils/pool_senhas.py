@@ -0,0 +1,78 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from fastapi import HTTPException, status
+
+from .security import criar_hash_senha, verificar_e_atualizar_senha
+
+# Threads dedicadas ao bcrypt (a biblioteca libera o GIL durante o hash)
+TRABALHADORES = int(os.getenv("SENHAS_TRABALHADORES", str(os.cpu_count() or 2)))
+# Pedidos que podem esperar na fila além dos que estão em execução
+FILA_MAXIMA = int(os.getenv("SENHAS_FILA_MAXIMA", str(4 * TRABALHADORES)))
+
+class PoolSenhas:
+    """
+    Executor limitado para hash/verificação de senha. Separado do threadpool do
+    FastAPI: um pico de logins não ocupa as threads das outras rotas. Quando
+    execução + fila estão cheias o pedido é recusado na hora com 503.
+    """
+
+    def __init__(self, trabalhadores: int = TRABALHADORES, fila_maxima: int = FILA_MAXIMA):
+        self.trabalhadores = trabalhadores
+        self.capacidade = trabalhadores + fila_maxima
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="senhas")
+        self._lock = threading.Lock()
+        self.pendentes = 0
+        self.concluidas = 0
+        self.rejeitadas = 0
+
+    def _reservar_vaga(self):
+        with self._lock:
+            if self.pendentes >= self.capacidade:
+                self.rejeitadas += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Serviço de autenticação sobrecarregado, tente novamente",
+                    headers={"Retry-After": "1"},
+                )
+            self.pendentes += 1
+
+    def _liberar_vaga(self, _futuro=None):
+        with self._lock:
+            self.pendentes -= 1
+            self.concluidas += 1
+
+    async def executar(self, funcao: Callable, *args):
+        self._reservar_vaga()
+        try:
+            futuro = self._executor.submit(funcao, *args)
+        except BaseException:
+            # Sem thread (ex.: executor já encerrado): a vaga volta, senão a capacidade encolhe de vez
+            with self._lock:
+                self.pendentes -= 1
+            raise
+        # A vaga só volta quando a thread termina, mesmo se o cliente desistir antes
+        futuro.add_done_callback(self._liberar_vaga)
+        return await asyncio.wrap_future(futuro)
+
+    async def criar_hash(self, senha: str) -> str:
+        return await self.executar(criar_hash_senha, senha)
+
+    async def verificar(self, senha: str, hash_senha: str):
+        """(senha confere, novo hash se o atual usa outro custo ou None)"""
+        return await self.executar(verificar_e_atualizar_senha, senha, hash_senha)
+
+    def resumo(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "trabalhadores": self.trabalhadores,
+                "capacidade": self.capacidade,
+                "pendentes": self.pendentes,
+                "concluidas": self.concluidas,
+                "rejeitadas": self.rejeitadas,
+            }
+
+pool_senhas = PoolSenhas()
@@ -1,9 +1,10 @@
 # backend/app/core/security.py
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+import os
 import random
 import string
 from sqlalchemy import or_
@@ -12,9 +13,13 @@ from sqlalchemy import or_
 SECRET_KEY = "sua_chave_secreta_super_segura_aqui_altere_em_producao"  # Altere em produção!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Refresh tokens (opacos, guardados em sessoes_refresh) renovam o access token sem senha
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 
 # Configuração para hash de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Custo do bcrypt; hashes com outro custo são refeitos no próximo login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # Funções para senhas
 def criar_hash_senha(senha: str) -> str:
@@ -27,6 +32,11 @@ def verificar_senha(senha: str, hash_senha: str) -> bool:
     return pwd_context.verify(senha, hash_senha)
 
 
+def verificar_e_atualizar_senha(senha: str, hash_senha: str) -> Tuple[bool, Optional[str]]:
+    """Verifica a senha e, se o hash estiver com outro custo, devolve o hash novo"""
+    return pwd_context.verify_and_update(senha, hash_senha)
+
+
 # Funções para JWT
 def criar_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Cria token JWT de acesso"""
@@ -0,0 +1,76 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import orjson
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel, Field, create_model
+
+# UTC sai como "Z" e datetime sem fuso sai sem offset: o mesmo texto que o pydantic gera
+OPCOES_JSON = orjson.OPT_UTC_Z
+
+def colunas_do_schema(modelo, schema: Type[BaseModel], campos: Optional[Sequence[str]] = None) -> List[Any]:
+    """
+    Colunas do modelo com os nomes dos campos do schema, na mesma ordem: um
+    select(*colunas) devolve linhas Core já no formato da resposta, sem montar
+    objetos do ORM nem validar com from_attributes. Com `campos`, só essas.
+    """
+    return [getattr(modelo, campo) for campo in (campos or schema.model_fields)]
+
+def parametro_campos(schema: Type[BaseModel], obrigatorios: Sequence[str] = ()) -> Callable[..., Tuple[str, ...]]:
+    """
+    Dependência do parâmetro ?fields=a,b,c (sparse fieldset). Valida os nomes
+    contra o schema de resposta e devolve os campos na ordem do schema, sempre
+    com os `obrigatorios` (o identificador, usado também como chave do cursor).
+    Sem o parâmetro, todos os campos.
+    """
+    permitidos = tuple(schema.model_fields)
+    descricao = (
+        "Campos da resposta separados por vírgula (os demais nem são lidos do banco). "
+        f"Permitidos: {', '.join(permitidos)}. Sempre inclui: {', '.join(obrigatorios)}."
+    )
+
+    def campos(fields: Optional[str] = Query(None, description=descricao)) -> Tuple[str, ...]:
+        pedidos = {c.strip() for c in (fields or "").split(",") if c.strip()}
+        if not pedidos:
+            return permitidos
+        invalidos = sorted(pedidos.difference(permitidos))
+        if invalidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campos inválidos em fields: {', '.join(invalidos)}. Permitidos: {', '.join(permitidos)}",
+            )
+        pedidos.update(obrigatorios)
+        return tuple(c for c in permitidos if c in pedidos)
+
+    return campos
+
+def _sem_default(esquema: Dict[str, Any]):
+    esquema.pop("default", None)
+
+def schema_campos_opcionais(schema: Type[BaseModel], obrigatorios: Sequence[str]) -> Type[BaseModel]:
+    """
+    Documentação (OpenAPI) das leituras com ?fields=: os campos do schema, mas
+    só os `obrigatorios` são required, pois os demais faltam quando não são
+    pedidos. As rotas montam o JSON direto das linhas Core (colunas_do_schema),
+    então este schema não valida nada; os tipos são os do schema original.
+    """
+    definicoes = {
+        nome: (campo.annotation, campo) if nome in obrigatorios
+        else (campo.annotation, Field(None, description=campo.description, json_schema_extra=_sem_default))
+        for nome, campo in schema.model_fields.items()
+    }
+    return create_model(
+        f"{schema.__name__}Campos",
+        __config__=schema.model_config,
+        __doc__=f"{schema.__name__} com ?fields=: sempre traz {', '.join(obrigatorios)}; os demais campos só se pedidos.",
+        **definicoes,
+    )
+
+def como_dicts(linhas: Sequence) -> List[Dict[str, Any]]:
+    return [linha._asdict() for linha in linhas]
+
+def json_bytes(conteudo: Any) -> bytes:
+    """orjson serializa dict/list/str/datetime/Enum direto (Enum pelo value)"""
+    return orjson.dumps(conteudo, option=OPCOES_JSON)
+
+def resposta_json(conteudo: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=json_bytes(conteudo), media_type="application/json", headers=headers)
@@ -0,0 +1,308 @@
+"""
+Micro-benchmarks dos caminhos quentes da API, rodando dentro do processo.
+
+Casos: reservar_veiculo, get_current_cliente_user (com e sem o cache de
+principais), listar_veiculos (primeira página e página via cursor) e
+obter_estatisticas. As rotas são chamadas pelo app ASGI (httpx.ASGITransport),
+sem rede. Para cada caso: ops/s, p50, p99 e comandos SQL por chamada.
+
+Tudo roda em um schema descartável (bench_quentes) no banco do DATABASE_URL,
+criado e populado no início e removido no fim. Só Postgres: o modelo usa
+TSTZRANGE, constraint de exclusão e INSERT ... ON CONFLICT, que o SQLite não tem.
+O modo de banco das rotas segue o DB_MODO (sync/async).
+
+O resultado pode ser salvo em JSON e comparado com o de outro commit:
+    python benchmarks/bench_caminhos_quentes.py --saida antes.json
+    python benchmarks/bench_caminhos_quentes.py --comparar antes.json --limite 10
+Com --comparar, o processo termina com código 1 se algum caso piorar mais que
+--limite % em ops/s ou p99.
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import event, text
+
+from app.database import engine, async_engine, DB_MODO, POOL_PRE_PING
+
+SCHEMA = "bench_quentes"
+
+def _usar_schema(conexao_dbapi, registro):
+    cursor = conexao_dbapi.cursor()
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    cursor.close()
+    # O SET abriu uma transação; sem o commit, o rollback da devolução ao pool o desfaria
+    conexao_dbapi.commit()
+
+# Antes de qualquer conexão: todas as conexões (sync e async) enxergam só o schema do benchmark
+event.listen(engine, "connect", _usar_schema)
+if async_engine is not None:
+    event.listen(async_engine.sync_engine, "connect", _usar_schema)
+
+class ContadorSql:
+    """Conta os comandos enviados ao banco enquanto está ativo"""
+
+    def __init__(self):
+        self.ativo = False
+        self.total = 0
+
+    def __call__(self, *args, **kwargs):
+        if self.ativo:
+            self.total += 1
+
+contador_sql = ContadorSql()
+event.listen(engine, "before_cursor_execute", contador_sql)
+if async_engine is not None:
+    event.listen(async_engine.sync_engine, "before_cursor_execute", contador_sql)
+
+def criar_schema():
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+def remover_schema():
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+def popular(veiculos: int, historico: int):
+    """Frota via gravar_lote e histórico de reservas FINALIZADA no passado"""
+    from app.database import SessionLocal
+    from app.Services import importacao_service, contadores_service, faturamento_service
+
+    categorias = ["ECONOMICO", "INTERMEDIARIO", "SUV", "LUXO"]
+    db = SessionLocal()
+    try:
+        for inicio in range(0, veiculos, 1000):
+            importacao_service.gravar_lote(db, [
+                {"placa": f"BQ{i:06d}", "modelo": "Onix", "marca": "Chevrolet", "ano": 2024,
+                 "cor": "Branco", "categoria": categorias[i % 4], "valor_diaria": 100.0 + i % 300,
+                 "descricao": None}
+                for i in range(inicio, min(inicio + 1000, veiculos))
+            ])
+        db.commit()
+        db.execute(text("""
+            INSERT INTO reservas (res_id, res_vei_id, res_cli_id, res_data_inicio, res_data_fim,
+                                  res_status, res_total, data_devolucao)
+            SELECT v.id || '-' || i, v.id, c.cli_id,
+                   now() - interval '1 day' * (3 * :historico - 3 * i),
+                   now() - interval '1 day' * (3 * :historico - 3 * i - 2),
+                   'FINALIZADA', v.valor_diaria * 2,
+                   now() - interval '1 day' * (3 * :historico - 3 * i - 2)
+            FROM veiculos v CROSS JOIN (SELECT cli_id FROM clientes LIMIT 1) c
+            CROSS JOIN generate_series(0, :historico - 1) AS i
+        """), {"historico": historico})
+        db.execute(text("ANALYZE"))
+        db.commit()
+        contadores_service.reconciliar_contadores(db)
+        faturamento_service.backfill(db)
+    finally:
+        db.close()
+
+async def medir(nome: str, operacao, iteracoes: int, aquecimento: int, depois=None) -> dict:
+    """Executa a operação e devolve ops/s, p50, p99 e SQL por chamada; `depois` não é medido"""
+    for i in range(aquecimento):
+        await operacao()
+        if depois is not None:
+            await depois()
+
+    tempos = []
+    contador_sql.total = 0
+    for i in range(iteracoes):
+        contador_sql.ativo = True
+        inicio = time.perf_counter()
+        await operacao()
+        tempos.append(time.perf_counter() - inicio)
+        contador_sql.ativo = False
+        if depois is not None:
+            await depois()
+
+    tempos.sort()
+    resultado = {
+        "iteracoes": iteracoes,
+        "ops_s": len(tempos) / sum(tempos),
+        "p50_ms": statistics.median(tempos) * 1000,
+        "p99_ms": tempos[max(int(len(tempos) * 0.99) - 1, 0)] * 1000,
+        "sql_por_chamada": contador_sql.total / iteracoes,
+    }
+    print(
+        f"   {nome:<32} {resultado['ops_s']:9.1f} ops/s | p50 {resultado['p50_ms']:7.3f} ms | "
+        f"p99 {resultado['p99_ms']:7.3f} ms | SQL/chamada {resultado['sql_por_chamada']:5.1f}"
+    )
+    return resultado
+
+def _verificar(resposta: httpx.Response):
+    if resposta.status_code != 200:
+        raise RuntimeError(f"{resposta.request.url}: {resposta.status_code} {resposta.text}")
+
+async def executar(args) -> dict:
+    from app.main import app, escuta_invalidacoes
+    from app.database import get_async_db
+    from app.utils.dependencies import get_current_cliente_user
+    from app.utils.cache_principais import cache_principais
+
+    await app.router.startup()
+    # Os caches (usuário autenticado, catálogo) só são usados com a escuta de invalidações conectada
+    if not await asyncio.to_thread(escuta_invalidacoes.aguardar, 10):
+        print("⚠️  Escuta de invalidações não conectou: os casos com cache vão medir o caminho sem ele")
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        r = await cliente.post("/api/auth/admin/registrar",
+                               json={"codigo_admin": "ADM000001", "adm_nome": "Bench", "senha": "bench"})
+        r = await cliente.post("/api/auth/admin/login", json={"codigo_admin": "ADM000001", "senha": "bench"})
+        _verificar(r)
+        admin = {"Authorization": "Bearer " + r.json()["access_token"]}
+        await cliente.post("/api/auth/cliente/registrar",
+                           json={"email": "bench@locadora.com", "nome": "Bench", "senha": "bench"})
+        r = await cliente.post("/api/auth/cliente/login", json={"email": "bench@locadora.com", "senha": "bench"})
+        _verificar(r)
+        token_cliente = r.json()["access_token"]
+        usuario = {"Authorization": "Bearer " + token_cliente}
+
+        print(f"🔧 Populando {args.veiculos} veículos x {args.historico} reservas...")
+        await asyncio.to_thread(popular, args.veiculos, args.historico)
+        with engine.connect() as conn:
+            ids = conn.execute(text("SELECT id FROM veiculos ORDER BY placa")).scalars().all()
+        r = await cliente.get("/api/veiculos/", params={"limite": 50})
+        cursor_meio = r.json()["proximo_cursor"]
+
+        n, ita = args.iteracoes, args.aquecimento
+        casos = {}
+        print(f"📊 {n} iterações por caso (DB_MODO={DB_MODO}, DB_POOL_PRE_PING={POOL_PRE_PING}):")
+
+        async def autenticar():
+            gerador = get_async_db()
+            db = await gerador.__anext__()
+            try:
+                await get_current_cliente_user(token_cliente, db)
+            finally:
+                await gerador.aclose()
+
+        async def limpar_cache():
+            cache_principais.limpar()
+
+        casos["auth_cliente_cache"] = await medir("get_current_cliente_user", autenticar, n, ita)
+        casos["auth_cliente_sem_cache"] = await medir(
+            "get_current_cliente_user (frio)", autenticar, n, ita, depois=limpar_cache
+        )
+
+        async def listar():
+            _verificar(await cliente.get("/api/veiculos/", params={"limite": 50}))
+
+        async def listar_cursor():
+            _verificar(await cliente.get("/api/veiculos/", params={"limite": 50, "cursor": cursor_meio}))
+
+        casos["listar_veiculos"] = await medir("listar_veiculos", listar, n, ita)
+        casos["listar_veiculos_cursor"] = await medir("listar_veiculos (cursor)", listar_cursor, n, ita)
+
+        async def estatisticas():
+            _verificar(await cliente.get("/api/dashboard/stats", headers=admin))
+
+        casos["obter_estatisticas"] = await medir("obter_estatisticas", estatisticas, n, ita)
+
+        # Cada reserva usa um veículo e uma janela futura ainda livres
+        base = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=30)
+        sequencia = {"i": 0, "veiculo": None}
+
+        async def reservar():
+            i = sequencia["i"]
+            sequencia["i"] += 1
+            sequencia["veiculo"] = ids[i % len(ids)]
+            inicio = base + timedelta(days=5 * (i // len(ids)))
+            _verificar(await cliente.post("/api/reservas/", headers=usuario, json={
+                "veiculo_id": sequencia["veiculo"],
+                "data_inicio": inicio.isoformat(),
+                "data_fim": (inicio + timedelta(days=2)).isoformat(),
+            }))
+
+        def _liberar_veiculo(veiculo_id: str):
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE veiculos SET status = 'DISPONIVEL' WHERE id = :id"), {"id": veiculo_id})
+
+        async def liberar():
+            await asyncio.to_thread(_liberar_veiculo, sequencia["veiculo"])
+
+        casos["reservar_veiculo"] = await medir("reservar_veiculo", reservar, n, ita, depois=liberar)
+
+    await app.router.shutdown()
+    return casos
+
+def commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+def comparar(anterior: dict, atual: dict, limite: float) -> int:
+    """Imprime a variação por caso; devolve quantos pioraram além do limite"""
+    regressoes = 0
+    print(f"\n🔍 Comparação com {anterior['meta'].get('commit')} (limite {limite:.0f}%):")
+    for nome, depois in atual["casos"].items():
+        antes = anterior["casos"].get(nome)
+        if antes is None:
+            print(f"   {nome:<32} (novo)")
+            continue
+        var_ops = (depois["ops_s"] - antes["ops_s"]) / antes["ops_s"] * 100
+        var_p99 = (depois["p99_ms"] - antes["p99_ms"]) / antes["p99_ms"] * 100
+        piorou = var_ops < -limite or var_p99 > limite
+        regressoes += piorou
+        print(
+            f"   {nome:<32} ops/s {var_ops:+6.1f}% | p99 {var_p99:+6.1f}% | "
+            f"SQL {antes['sql_por_chamada']:.1f} -> {depois['sql_por_chamada']:.1f}"
+            + ("   ❌ REGRESSÃO" if piorou else "")
+        )
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--veiculos", type=int, default=2000)
+    parser.add_argument("--historico", type=int, default=20, help="reservas finalizadas por veículo")
+    parser.add_argument("--iteracoes", type=int, default=500)
+    parser.add_argument("--aquecimento", type=int, default=50)
+    parser.add_argument("--saida", help="arquivo JSON para gravar o resultado")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--limite", type=float, default=10.0, help="piora tolerada em %%")
+    args = parser.parse_args()
+
+    criar_schema()
+    try:
+        casos = asyncio.run(executar(args))
+    finally:
+        remover_schema()
+
+    resultado = {
+        "meta": {
+            "commit": commit_atual(),
+            "data": datetime.now(timezone.utc).isoformat(),
+            "db_modo": DB_MODO,
+            "python": platform.python_version(),
+            "veiculos": args.veiculos,
+            "historico": args.historico,
+            "iteracoes": args.iteracoes,
+        },
+        "casos": casos,
+    }
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+        print(f"💾 Resultado salvo em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            anterior = json.load(arquivo)
+        if comparar(anterior, resultado, args.limite):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark da checagem de conflito de reservas.
+
+Compara a consulta antiga (filtro por res_vei_id + comparações de data) com a
+busca por sobreposição de intervalo (res_periodo &&), que usa o índice GiST da
+constraint ex_reservas_veiculo_periodo. Roda em um schema temporário criado
+dentro de uma transação que é desfeita no final.
+
+Uso: python benchmarks/bench_conflito_reservas.py --veiculos 5 --reservas 10000
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database import engine, Base
+from app.models.Veiculos import Veiculo
+from app.models.Cliente import Cliente
+from app.models.Reservar import Reserva
+
+SCHEMA = "bench_conflito"
+INICIO_HISTORICO = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+SQL_ANTIGA = """
+    SELECT res_id FROM reservas
+    WHERE res_vei_id = :vid
+      AND res_status IN ('RESERVADA', 'ATIVA')
+      AND res_data_inicio <= :fim
+      AND res_data_fim >= :inicio
+    LIMIT 1
+"""
+
+SQL_INTERVALO = """
+    SELECT res_id FROM reservas
+    WHERE res_vei_id = :vid
+      AND res_status IN ('RESERVADA', 'ATIVA')
+      AND res_periodo && tstzrange(:inicio, :fim, '[]')
+    LIMIT 1
+"""
+
+def popular(conn, veiculos: int, reservas: int, ativas: int):
+    """Cria veículos com histórico sequencial de reservas (3 em 3 dias, 2 dias cada)"""
+    conn.execute(text("""
+        INSERT INTO clientes (cli_id, cli_email, cli_nome, cli_senha_hash, cli_ativo, cli_criado_em)
+        VALUES ('bench-cli', 'bench@locadora.com', 'Bench', 'x', true, now())
+    """))
+    for v in range(veiculos):
+        vid = f"bench-vei-{v}"
+        conn.execute(text("""
+            INSERT INTO veiculos (id, modelo, marca, ano, placa, cor, categoria, status,
+                                  valor_diaria, quilometragem, ativo, criado_em, atualizado_em)
+            VALUES (:vid, 'Onix', 'Chevrolet', 2024, :placa, 'Branco', 'ECONOMICO', 'DISPONIVEL',
+                    100, 0, true, now(), now())
+        """), {"vid": vid, "placa": f"BEN{v:04d}"})
+        conn.execute(text("""
+            INSERT INTO reservas (res_id, res_vei_id, res_cli_id, res_data_inicio, res_data_fim,
+                                  res_status, res_total)
+            SELECT :vid || '-' || i, :vid, 'bench-cli',
+                   :base + (i * interval '3 days'),
+                   :base + (i * interval '3 days') + interval '2 days',
+                   (CASE WHEN i >= :total - :ativas THEN 'RESERVADA' ELSE 'FINALIZADA' END)::statuslocacao,
+                   200
+            FROM generate_series(0, :total - 1) AS i
+        """), {"vid": vid, "base": INICIO_HISTORICO, "total": reservas, "ativas": ativas})
+    conn.execute(text("ANALYZE reservas"))
+
+def medir(conn, sql: str, consultas: list) -> list:
+    tempos = []
+    for params in consultas:
+        t0 = time.perf_counter()
+        conn.execute(text(sql), params).first()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return tempos
+
+def resumo(nome: str, tempos: list):
+    tempos = sorted(tempos)
+    p99 = tempos[int(len(tempos) * 0.99) - 1]
+    print(f"   {nome:<22} média {statistics.mean(tempos):8.3f} ms | p50 {statistics.median(tempos):8.3f} ms | p99 {p99:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--veiculos", type=int, default=5)
+    parser.add_argument("--reservas", type=int, default=10000, help="reservas por veículo")
+    parser.add_argument("--ativas", type=int, default=20, help="reservas ativas no fim do histórico")
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    dias_historico = args.reservas * 3
+
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        Base.metadata.create_all(conn, tables=[Veiculo.__table__, Cliente.__table__, Reserva.__table__])
+        try:
+            print(f"🔧 Populando {args.veiculos} veículos x {args.reservas} reservas...")
+            popular(conn, args.veiculos, args.reservas, args.ativas)
+
+            consultas = []
+            for _ in range(args.consultas):
+                inicio = INICIO_HISTORICO + timedelta(days=rnd.uniform(0, dias_historico))
+                consultas.append({
+                    "vid": f"bench-vei-{rnd.randrange(args.veiculos)}",
+                    "inicio": inicio,
+                    "fim": inicio + timedelta(days=rnd.randint(1, 10)),
+                })
+
+            # Aquecimento do cache de páginas
+            medir(conn, SQL_ANTIGA, consultas[:50])
+            medir(conn, SQL_INTERVALO, consultas[:50])
+
+            print(f"📊 {args.consultas} checagens de conflito:")
+            resumo("antiga (b-tree)", medir(conn, SQL_ANTIGA, consultas))
+            resumo("intervalo (GiST)", medir(conn, SQL_INTERVALO, consultas))
+
+            for nome, sql in (("antiga", SQL_ANTIGA), ("intervalo", SQL_INTERVALO)):
+                plano = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql), consultas[0]).scalars().all()
+                print(f"\n🔍 Plano ({nome}):")
+                for linha in plano:
+                    print(f"   {linha}")
+        finally:
+            # Tudo foi feito em uma única transação, inclusive o CREATE SCHEMA
+            conn.rollback()
+
+if __name__ == "__main__":
+    main()
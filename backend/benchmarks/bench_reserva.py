@@ -0,0 +1,298 @@
+"""
+Idas ao banco e latência da criação de reserva: fluxo antigo pelo ORM x
+instrução única (reservas_service.reservar) x reserva em lote
+(reservas_service.reservar_lote, --lote veículos por instrução).
+
+Antes: SELECT do veículo, INSERT nos contadores, INSERT da reserva, UPDATE do
+veículo, NOTIFY do catálogo, cada um em sua ida, mais BEGIN/COMMIT e o
+refresh (BEGIN + SELECT + ROLLBACK no fechamento da sessão). Depois: uma
+instrução com CTEs, em autocommit.
+
+As conexões passam por um proxy TCP local que atrasa cada sentido em
+--latencia-ms/2 (banco em outra região) e conta os pacotes enviados ao banco:
+as idas por reserva incluem o pre-ping do pool, igual nos dois fluxos. Roda
+em um schema descartável (bench_reserva) no banco do DATABASE_URL.
+
+Uso: python benchmarks/bench_reserva.py --latencia-ms 20 --reservas 100
+"""
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.engine import make_url
+
+SCHEMA = "bench_reserva"
+
+class ProxyLatencia:
+    """Proxy TCP que atrasa os dois sentidos e conta os envios do cliente ao banco"""
+
+    def __init__(self, destino: Tuple, atraso_segundos: float):
+        # destino: ("tcp", host, porta) ou ("unix", caminho do socket)
+        self.destino = destino
+        self.atraso = atraso_segundos
+        self.contando = False
+        self.idas = 0
+        self._loop = asyncio.new_event_loop()
+        self.porta: Optional[int] = None
+
+    def iniciar(self) -> int:
+        pronto = threading.Event()
+
+        def executar():
+            asyncio.set_event_loop(self._loop)
+            servidor = self._loop.run_until_complete(asyncio.start_server(self._atender, "127.0.0.1", 0))
+            self.porta = servidor.sockets[0].getsockname()[1]
+            pronto.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=executar, name="proxy-latencia", daemon=True).start()
+        pronto.wait()
+        return self.porta
+
+    async def _conectar_destino(self):
+        if self.destino[0] == "unix":
+            return await asyncio.open_unix_connection(self.destino[1])
+        return await asyncio.open_connection(self.destino[1], self.destino[2])
+
+    async def _atender(self, leitor_cliente, escritor_cliente):
+        leitor_banco, escritor_banco = await self._conectar_destino()
+        await asyncio.gather(
+            self._encaminhar(leitor_cliente, escritor_banco, contar=True),
+            self._encaminhar(leitor_banco, escritor_cliente, contar=False),
+            return_exceptions=True,
+        )
+
+    async def _encaminhar(self, leitor, escritor, contar: bool):
+        fila: asyncio.Queue = asyncio.Queue()
+
+        async def escrever():
+            while True:
+                prazo, dados = await fila.get()
+                if dados is None:
+                    break
+                espera = prazo - time.monotonic()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                escritor.write(dados)
+                await escritor.drain()
+            escritor.close()
+
+        tarefa = asyncio.ensure_future(escrever())
+        try:
+            while True:
+                dados = await leitor.read(65536)
+                if not dados:
+                    break
+                if contar and self.contando:
+                    self.idas += 1
+                fila.put_nowait((time.monotonic() + self.atraso, dados))
+        finally:
+            fila.put_nowait((0, None))
+            await tarefa
+
+def _destino_do_banco(url) -> Tuple:
+    host = url.query.get("host") or url.host or "localhost"
+    porta = url.port or 5432
+    if host.startswith("/"):
+        return ("unix", f"{host}/.s.PGSQL.{porta}")
+    return ("tcp", host, porta)
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description="Idas ao banco por reserva: ORM x instrução única")
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="Ida e volta simulada até o banco")
+    parser.add_argument("--reservas", type=int, default=100, help="Reservas medidas por fluxo")
+    parser.add_argument("--aquecimento", type=int, default=5)
+    parser.add_argument("--lote", type=int, default=25, help="Veículos por reserva em lote")
+    return parser.parse_args()
+
+# Antes de importar o app: a engine é criada na importação, já apontando para o proxy
+ARGS = _argumentos()
+_url = make_url(os.environ["DATABASE_URL"])
+proxy = ProxyLatencia(_destino_do_banco(_url), ARGS.latencia_ms / 2000)
+os.environ["DATABASE_URL"] = _url.set(
+    host="127.0.0.1", port=proxy.iniciar(), query={k: v for k, v in _url.query.items() if k != "host"}
+).render_as_string(hide_password=False)
+
+from sqlalchemy import event, text
+
+from app.database import engine, Base, SessionLocal, POOL_PRE_PING
+from app.models.Veiculos import Veiculo, CategoriaVeiculo, StatusVeiculo, StatusLocacao
+from app.models.Cliente import Cliente
+from app.models.Reservar import Reserva
+from app.models.Contadores import Contador
+from app.models import Adm  # noqa: F401
+from app.Services import contadores_service, reservas_service
+
+@event.listens_for(engine, "connect")
+def _usar_schema(conexao_dbapi, registro):
+    cursor = conexao_dbapi.cursor()
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    cursor.close()
+    # O SET abriu uma transação; sem o commit, o rollback da devolução ao pool o desfaria
+    conexao_dbapi.commit()
+
+class ContadorSql:
+    def __init__(self):
+        self.ativo = False
+        self.total = 0
+
+    def __call__(self, *args, **kwargs):
+        if self.ativo:
+            self.total += 1
+
+contador_sql = ContadorSql()
+event.listen(engine, "before_cursor_execute", contador_sql)
+
+def preparar(veiculos: int) -> Tuple[str, list]:
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    Base.metadata.create_all(
+        bind=engine,
+        tables=[Veiculo.__table__, Cliente.__table__, Reserva.__table__, Contador.__table__],
+    )
+    agora = datetime.utcnow()
+    cliente_id = str(uuid.uuid4())
+    ids = [str(uuid.uuid4()) for _ in range(veiculos)]
+    with engine.begin() as conn:
+        conn.execute(Cliente.__table__.insert(), [{
+            "cli_id": cliente_id, "cli_email": "bench@locadora.com", "cli_nome": "Bench",
+            "cli_senha_hash": "-", "cli_ativo": True, "cli_criado_em": agora,
+        }])
+        conn.execute(Veiculo.__table__.insert(), [
+            {
+                "id": veiculo_id, "modelo": "Onix", "marca": "Chevrolet", "ano": 2024,
+                "placa": f"BR{i:06d}", "cor": "Branco", "categoria": CategoriaVeiculo.ECONOMICO,
+                "status": StatusVeiculo.DISPONIVEL, "valor_diaria": 100.0, "quilometragem": 0.0,
+                "ativo": True, "criado_em": agora, "atualizado_em": agora,
+            }
+            for i, veiculo_id in enumerate(ids)
+        ])
+    return cliente_id, ids
+
+def remover():
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+def reservar_orm(cliente_id: str, veiculo_id: str, inicio: datetime, fim: datetime, dias: int):
+    """O corpo de POST /api/reservas antes da instrução única"""
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        veiculo = db.get(Veiculo, veiculo_id)
+        if veiculo is None or veiculo.status != StatusVeiculo.DISPONIVEL:
+            raise RuntimeError("veículo indisponível")
+        nova_reserva = Reserva(
+            res_cli_id=cliente_id, res_vei_id=veiculo_id, res_data_inicio=inicio, res_data_fim=fim,
+            res_total=dias * veiculo.valor_diaria, res_status=StatusLocacao.RESERVADA,
+        )
+        contadores_service.registrar_status_veiculo(db, veiculo.status, StatusVeiculo.LOCADO)
+        veiculo.status = StatusVeiculo.LOCADO
+        db.add(nova_reserva)
+        db.commit()
+        db.refresh(nova_reserva)
+        return nova_reserva
+    finally:
+        db.close()
+
+def reservar_instrucao(cliente_id: str, veiculo_id: str, inicio: datetime, fim: datetime, dias: int):
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        resultado = reservas_service.reservar(db, cliente_id, veiculo_id, inicio, fim, dias)
+        if resultado.motivo is not None:
+            raise RuntimeError(f"reserva recusada: {resultado.motivo.value}")
+        return resultado.reserva
+    finally:
+        db.close()
+
+def reservar_em_lote(cliente_id: str, veiculos: list, inicio: datetime, fim: datetime, dias: int):
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        itens = [reservas_service.ItemLote(veiculo_id, inicio, fim, dias) for veiculo_id in veiculos]
+        resultado = reservas_service.reservar_lote(db, cliente_id, itens, tudo_ou_nada=True)
+        if resultado.motivo is not None or any(item.reserva is None for item in resultado.itens):
+            raise RuntimeError("lote recusado")
+        return resultado
+    finally:
+        db.close()
+
+def medir(nome: str, funcao, cliente_id: str, veiculos: list, aquecimento: int):
+    inicio = datetime.now(timezone.utc) + timedelta(days=1)
+    fim = inicio + timedelta(days=3)
+    for veiculo_id in veiculos[:aquecimento]:
+        funcao(cliente_id, veiculo_id, inicio, fim, 3)
+
+    medidos = veiculos[aquecimento:]
+    tempos = []
+    proxy.idas = contador_sql.total = 0
+    proxy.contando = contador_sql.ativo = True
+    for veiculo_id in medidos:
+        t0 = time.perf_counter()
+        funcao(cliente_id, veiculo_id, inicio, fim, 3)
+        tempos.append(time.perf_counter() - t0)
+    proxy.contando = contador_sql.ativo = False
+    return _resumir(nome, tempos, len(medidos))
+
+def medir_lote(nome: str, cliente_id: str, veiculos: list, tamanho: int, aquecimento: int):
+    """Como medir, mas reservando `tamanho` veículos por chamada; os tempos são por reserva"""
+    inicio = datetime.now(timezone.utc) + timedelta(days=1)
+    fim = inicio + timedelta(days=3)
+    lotes = [veiculos[i:i + tamanho] for i in range(0, len(veiculos), tamanho)]
+    for lote in lotes[:aquecimento]:
+        reservar_em_lote(cliente_id, lote, inicio, fim, 3)
+
+    tempos = []
+    proxy.idas = contador_sql.total = 0
+    proxy.contando = contador_sql.ativo = True
+    for lote in lotes[aquecimento:]:
+        t0 = time.perf_counter()
+        reservar_em_lote(cliente_id, lote, inicio, fim, 3)
+        tempos += [(time.perf_counter() - t0) / len(lote)] * len(lote)
+    proxy.contando = contador_sql.ativo = False
+    return _resumir(nome, tempos, len(tempos))
+
+def _resumir(nome: str, tempos: list, n: int):
+    tempos.sort()
+    resultado = {
+        "idas": proxy.idas / n,
+        "sql": contador_sql.total / n,
+        "p50_ms": statistics.median(tempos) * 1000,
+        "p99_ms": tempos[min(n - 1, int(n * 0.99))] * 1000,
+    }
+    print(
+        f"   {nome:18} {resultado['idas']:6.1f} idas  {resultado['sql']:5.1f} SQL  "
+        f"p50 {resultado['p50_ms']:7.2f} ms  p99 {resultado['p99_ms']:7.2f} ms"
+    )
+    return resultado
+
+def main():
+    por_fluxo = ARGS.reservas + ARGS.aquecimento
+    em_lote = ARGS.reservas + ARGS.lote
+    print(f"🚗 {ARGS.reservas} reservas por fluxo, latência simulada de {ARGS.latencia_ms:.0f} ms por ida e volta")
+    if POOL_PRE_PING:
+        print("   DB_POOL_PRE_PING ligado: cada checkout soma uma ida (SELECT 1) às contadas abaixo")
+    cliente_id, ids = preparar(2 * por_fluxo + em_lote)
+    try:
+        antes = medir("antes (ORM)", reservar_orm, cliente_id, ids[:por_fluxo], ARGS.aquecimento)
+        depois = medir("depois (instrução)", reservar_instrucao, cliente_id, ids[por_fluxo:2 * por_fluxo], ARGS.aquecimento)
+        lote = medir_lote(f"lote de {ARGS.lote}", cliente_id, ids[2 * por_fluxo:], ARGS.lote, 1)
+        print(
+            f"\n✅ {antes['idas'] / depois['idas']:.1f}x menos idas ao banco, "
+            f"p50 {antes['p50_ms'] / depois['p50_ms']:.1f}x menor; em lote, "
+            f"{lote['idas']:.2f} idas e {lote['p50_ms']:.2f} ms por reserva"
+        )
+    finally:
+        proxy.contando = False
+        remover()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Custo por linha das listagens: caminho ORM + pydantic x linhas Core + orjson.
+
+Antes: select(Modelo) monta objetos do ORM (identity map), a rota valida com
+from_attributes no schema de resposta e o FastAPI revalida, converte para
+tipos JSON e chama json.dumps. Depois: select(*colunas) devolve linhas Core,
+que viram dicts e são serializadas com orjson (app.utils.serializacao).
+
+Mede separadamente a busca (banco + montagem das linhas/objetos) e a
+serialização, em µs por linha, para listas de veículos e de reservas. Roda em
+um schema descartável (bench_serializacao) no banco do DATABASE_URL.
+
+Uso: python benchmarks/bench_serializacao.py --linhas 10000 --repeticoes 7
+"""
+import sys
+import os
+import argparse
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import event, insert, select, text
+
+from app.database import engine, Base, SessionLocal
+from app.models.Veiculos import Veiculo, CategoriaVeiculo, StatusVeiculo, StatusLocacao
+from app.models.Cliente import Cliente
+from app.models.Reservar import Reserva
+from app.models import Adm  # noqa: F401
+from app.Schemas.Veiculos import VeiculoPagina, VeiculoResponse
+from app.Schemas.Reservar import LocacaoResponse
+from app.utils.serializacao import colunas_do_schema, como_dicts, json_bytes
+
+SCHEMA = "bench_serializacao"
+
+@event.listens_for(engine, "connect")
+def _usar_schema(conexao_dbapi, registro):
+    cursor = conexao_dbapi.cursor()
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    cursor.close()
+    # O SET abriu uma transação; sem o commit, o rollback da devolução ao pool o desfaria
+    conexao_dbapi.commit()
+
+def preparar(linhas: int):
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    Base.metadata.create_all(
+        bind=engine, tables=[Veiculo.__table__, Cliente.__table__, Reserva.__table__]
+    )
+    agora = datetime.utcnow()
+    cliente_id = str(uuid.uuid4())
+    veiculos = [
+        {
+            "id": str(uuid.uuid4()), "modelo": "Onix", "marca": "Chevrolet", "ano": 2024,
+            "placa": f"BS{i:06d}", "cor": "Branco", "categoria": list(CategoriaVeiculo)[i % 4],
+            "status": StatusVeiculo.DISPONIVEL, "valor_diaria": 100.0 + i % 300, "quilometragem": 0.0,
+            "descricao": "Veículo de teste" if i % 2 else None, "ativo": True,
+            "criado_em": agora, "atualizado_em": agora,
+        }
+        for i in range(linhas)
+    ]
+    inicio = datetime.now(timezone.utc)
+    reservas = [
+        {
+            "res_id": str(uuid.uuid4()), "res_vei_id": v["id"], "res_cli_id": cliente_id,
+            "res_data_inicio": inicio + timedelta(days=i % 300),
+            "res_data_fim": inicio + timedelta(days=i % 300 + 2),
+            "res_status": StatusLocacao.FINALIZADA, "res_total": 200.0,
+        }
+        for i, v in enumerate(veiculos)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Cliente), [{
+            "cli_id": cliente_id, "cli_email": "bench@locadora.com", "cli_nome": "Bench",
+            "cli_senha_hash": "-", "cli_ativo": True, "cli_criado_em": agora,
+        }])
+        conn.execute(insert(Veiculo), veiculos)
+        conn.execute(insert(Reserva), reservas)
+        conn.execute(text("ANALYZE"))
+
+def remover():
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+def _json_fastapi(conteudo) -> bytes:
+    """O que o FastAPI faz com o retorno da rota: valida no response_model, converte e json.dumps"""
+    return json.dumps(
+        conteudo, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+def medir_caso(nome: str, repeticoes: int, buscar_antes, serializar_antes, buscar_depois, serializar_depois):
+    tempos = {"busca_antes": [], "json_antes": [], "busca_depois": [], "json_depois": []}
+    tamanhos = {}
+    for _ in range(repeticoes):
+        db = SessionLocal()
+        try:
+            objetos, t = _cronometrar(lambda: buscar_antes(db))
+            tempos["busca_antes"].append(t)
+            corpo, t = _cronometrar(lambda: serializar_antes(objetos))
+            tempos["json_antes"].append(t)
+            tamanhos["antes"] = corpo
+        finally:
+            db.close()
+        with engine.connect() as conn:
+            linhas, t = _cronometrar(lambda: buscar_depois(conn))
+            tempos["busca_depois"].append(t)
+            corpo, t = _cronometrar(lambda: serializar_depois(linhas))
+            tempos["json_depois"].append(t)
+            tamanhos["depois"] = corpo
+
+    n = len(linhas)
+    us = {chave: statistics.median(valores) / n * 1e6 for chave, valores in tempos.items()}
+    total_antes = us["busca_antes"] + us["json_antes"]
+    total_depois = us["busca_depois"] + us["json_depois"]
+    iguais = json.loads(tamanhos["antes"]) == json.loads(tamanhos["depois"])
+    print(f"\n{nome} ({n} linhas, mediana de {repeticoes}) — µs por linha")
+    print(f"   {'':10} {'busca':>9} {'serialização':>13} {'total':>9}")
+    print(f"   {'antes':10} {us['busca_antes']:9.2f} {us['json_antes']:13.2f} {total_antes:9.2f}")
+    print(f"   {'depois':10} {us['busca_depois']:9.2f} {us['json_depois']:13.2f} {total_depois:9.2f}")
+    print(
+        f"   ganho: serialização {us['json_antes'] / us['json_depois']:.1f}x, "
+        f"total {total_antes / total_depois:.1f}x | JSON idêntico: {'sim' if iguais else 'NÃO'}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo por linha: ORM + pydantic x Core + orjson")
+    parser.add_argument("--linhas", type=int, default=10000)
+    parser.add_argument("--repeticoes", type=int, default=7)
+    args = parser.parse_args()
+
+    preparar(args.linhas)
+    try:
+        pagina = TypeAdapter(VeiculoPagina)
+        colunas_veiculo = colunas_do_schema(Veiculo, VeiculoResponse)
+        medir_caso(
+            "listar_veiculos", args.repeticoes,
+            lambda db: db.scalars(select(Veiculo).order_by(Veiculo.id)).all(),
+            lambda objetos: _json_fastapi(pagina.dump_python(
+                pagina.validate_python(VeiculoPagina(itens=objetos)), mode="json"
+            )),
+            lambda conn: conn.execute(select(*colunas_veiculo).order_by(Veiculo.id)).all(),
+            lambda linhas: json_bytes({"itens": como_dicts(linhas), "proximo_cursor": None, "total_aproximado": None}),
+        )
+
+        locacoes = TypeAdapter(list[LocacaoResponse])
+        colunas_locacao = colunas_do_schema(Reserva, LocacaoResponse)
+        medir_caso(
+            "minhas_locacoes", args.repeticoes,
+            lambda db: db.scalars(select(Reserva).order_by(Reserva.res_data_inicio.desc())).all(),
+            lambda objetos: _json_fastapi(locacoes.dump_python(
+                locacoes.validate_python(objetos, from_attributes=True), mode="json"
+            )),
+            lambda conn: conn.execute(select(*colunas_locacao).order_by(Reserva.res_data_inicio.desc())).all(),
+            lambda linhas: json_bytes(como_dicts(linhas)),
+        )
+    finally:
+        remover()
+
+if __name__ == "__main__":
+    main()
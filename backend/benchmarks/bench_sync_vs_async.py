@@ -0,0 +1,120 @@
+"""
+Benchmark de vazão: rotas no modo DB_MODO=sync x DB_MODO=async.
+
+Sobe a API com o uvicorn (um worker) uma vez em cada modo, dispara a mesma
+carga concorrente nas rotas de leitura (listagem e detalhe de veículos e stats
+do dashboard, que passam pela autenticação de admin) e mostra req/s, p50 e p99.
+Usa o banco do DATABASE_URL; precisa de pelo menos um veículo cadastrado
+(ex.: python scripts/populate_vehicles.py). Requer httpx.
+
+Uso: python benchmarks/bench_sync_vs_async.py --concorrencia 64 --duracao 15
+"""
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import subprocess
+import time
+
+import httpx
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN = {"codigo_admin": "ADM999999", "adm_nome": "Bench", "senha": "bench"}
+
+def subir_api(modo: str, porta: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_MODO=modo)
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta),
+         "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"http://127.0.0.1:{porta}/Funcionando").status_code == 200:
+                return processo
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError(f"API no modo {modo} não subiu")
+
+def preparar(base: str):
+    """Garante o admin do benchmark e devolve (headers, ids de veículos)"""
+    httpx.post(f"{base}/api/auth/admin/registrar", json=ADMIN)
+    r = httpx.post(f"{base}/api/auth/admin/login",
+                   json={"codigo_admin": ADMIN["codigo_admin"], "senha": ADMIN["senha"]})
+    r.raise_for_status()
+    headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+    itens = httpx.get(f"{base}/api/veiculos/", params={"limite": 100}).json()["itens"]
+    if not itens:
+        raise RuntimeError("Nenhum veículo cadastrado; rode scripts/populate_vehicles.py")
+    return headers, [v["id"] for v in itens]
+
+async def carga(base: str, headers: dict, ids: list, concorrencia: int, duracao: float):
+    rotas = [
+        ("/api/veiculos/", {"limite": 20}, None),
+        ("/api/dashboard/stats", None, headers),
+    ] + [(f"/api/veiculos/{vid}", None, None) for vid in ids[:10]]
+    latencias = []
+    erros = 0
+    fim = time.monotonic() + duracao
+
+    async def trabalhador(cliente: httpx.AsyncClient, n: int):
+        nonlocal erros
+        i = n
+        while time.monotonic() < fim:
+            caminho, params, h = rotas[i % len(rotas)]
+            i += 1
+            inicio = time.perf_counter()
+            try:
+                r = await cliente.get(caminho, params=params, headers=h)
+                if r.status_code != 200:
+                    erros += 1
+            except httpx.HTTPError:
+                erros += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=base, limits=limites, timeout=30) as cliente:
+        inicio = time.monotonic()
+        await asyncio.gather(*(trabalhador(cliente, n) for n in range(concorrencia)))
+        decorrido = time.monotonic() - inicio
+    return latencias, erros, decorrido
+
+def medir(modo: str, porta: int, concorrencia: int, duracao: float):
+    processo = subir_api(modo, porta)
+    try:
+        base = f"http://127.0.0.1:{porta}"
+        headers, ids = preparar(base)
+        # Aquecimento: abre as conexões do pool e do cliente
+        asyncio.run(carga(base, headers, ids, concorrencia, 2))
+        latencias, erros, decorrido = asyncio.run(carga(base, headers, ids, concorrencia, duracao))
+    finally:
+        processo.terminate()
+        processo.wait()
+
+    latencias.sort()
+    p99 = latencias[int(len(latencias) * 0.99) - 1] if latencias else 0.0
+    print(
+        f"{modo:5s}  {len(latencias) / decorrido:9.1f} req/s   "
+        f"p50 {statistics.median(latencias) * 1000 if latencias else 0:7.2f} ms   "
+        f"p99 {p99 * 1000:7.2f} ms   erros {erros}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão das rotas com DB_MODO=sync x async")
+    parser.add_argument("--concorrencia", type=int, default=64)
+    parser.add_argument("--duracao", type=float, default=15.0, help="segundos por modo")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--modos", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    args = parser.parse_args()
+
+    print(f"Concorrência {args.concorrencia}, {args.duracao:.0f}s por modo")
+    for modo in args.modos:
+        medir(modo, args.porta, args.concorrencia, args.duracao)
+
+if __name__ == "__main__":
+    main()
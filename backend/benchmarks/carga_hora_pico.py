@@ -0,0 +1,324 @@
+"""
+Gerador de carga HTTP ponta a ponta: reproduz uma hora de pico contra a API real.
+
+Cenários (chegadas de Poisson, taxa em requisições/s configurável por cenário):
+  catalogo      GET  /api/veiculos/ anônimo (às vezes com filtro de categoria ou
+                segue o cursor da página anterior)
+  login         POST /api/auth/cliente/login de um dos clientes de carga
+  minhas        GET  /api/reservas/minhas-reservas com o token de um cliente
+  reservas      rajadas de POST /api/reservas/ de vários clientes no mesmo veículo
+                popular e no mesmo período (a taxa é de rajadas por segundo)
+  dashboard     GET  /api/dashboard/stats do admin (polling)
+
+Os tokens são obtidos pelas próprias rotas de autenticação: o admin e os
+clientes de carga são registrados (ou reaproveitados) e logados antes da carga.
+A latência é medida a partir do instante de chegada planejado, então inclui a
+espera pela vaga de concorrência (sem omissão coordenada). Ao final, por rota:
+histograma de latência, p50/p95/p99 e erros por status (com o detail) ou exceção.
+
+Sobe o uvicorn localmente (--subir) ou usa uma API já no ar (--base). Usa o
+banco do DATABASE_URL da API; precisa de veículos cadastrados
+(ex.: python scripts/gerar_dados_escala.py). Requer httpx.
+
+Uso:
+    python benchmarks/carga_hora_pico.py --subir --duracao 60 --concorrencia 128 \\
+        --taxa catalogo=200 reservas=2 --saida pico.json
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_sync_vs_async import ADMIN, subir_api
+
+# Requisições (ou rajadas) por segundo de cada cenário
+TAXAS_PADRAO = {
+    "catalogo": 80.0,
+    "login": 3.0,
+    "minhas": 15.0,
+    "reservas": 1.0,
+    "dashboard": 2.0,
+}
+CATEGORIAS = ["ECONOMICO", "INTERMEDIARIO", "SUV", "LUXO"]
+# Limites superiores das faixas do histograma, em ms
+FAIXAS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+class Resultados:
+    """Latências e erros agrupados por rota"""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.erros: Dict[str, Counter] = defaultdict(Counter)
+        self.respostas: Dict[str, Counter] = defaultdict(Counter)
+
+    def registrar(self, rota: str, latencia: float, status: Optional[int], erro: Optional[str] = None):
+        self.latencias[rota].append(latencia)
+        if erro is not None:
+            self.erros[rota][erro] += 1
+        if status is not None:
+            self.respostas[rota][status] += 1
+
+    def resumo(self, decorrido: float) -> Dict[str, dict]:
+        resumo = {}
+        for rota, valores in sorted(self.latencias.items()):
+            valores = sorted(valores)
+            faixas = Counter()
+            for valor in valores:
+                ms = valor * 1000
+                faixa = next((f"<={limite}ms" for limite in FAIXAS_MS if ms <= limite), f">{FAIXAS_MS[-1]}ms")
+                faixas[faixa] += 1
+            resumo[rota] = {
+                "requisicoes": len(valores),
+                "req_s": len(valores) / decorrido,
+                "p50_ms": _percentil(valores, 0.50) * 1000,
+                "p95_ms": _percentil(valores, 0.95) * 1000,
+                "p99_ms": _percentil(valores, 0.99) * 1000,
+                "max_ms": valores[-1] * 1000,
+                "histograma": {
+                    faixa: faixas[faixa]
+                    for faixa in [f"<={limite}ms" for limite in FAIXAS_MS] + [f">{FAIXAS_MS[-1]}ms"]
+                    if faixas[faixa]
+                },
+                "status": {str(k): v for k, v in sorted(self.respostas[rota].items())},
+                "erros": dict(self.erros[rota].most_common()),
+            }
+        return resumo
+
+def _percentil(valores: List[float], fracao: float) -> float:
+    if not valores:
+        return 0.0
+    return valores[max(int(len(valores) * fracao) - 1, 0)]
+
+def _motivo(resposta: httpx.Response) -> str:
+    """Status mais o detail da API, para separar erros diferentes com o mesmo código"""
+    try:
+        detalhe = resposta.json().get("detail")
+    except (ValueError, AttributeError):
+        detalhe = None
+    if isinstance(detalhe, str):
+        return f"{resposta.status_code} {detalhe[:60]}"
+    return str(resposta.status_code)
+
+class Carga:
+    def __init__(self, cliente: httpx.AsyncClient, args):
+        self.cliente = cliente
+        self.args = args
+        self.resultados = Resultados()
+        self.vagas = asyncio.Semaphore(args.concorrencia)
+        self.rng = random.Random(args.semente)
+        self.admin: Dict[str, str] = {}
+        self.clientes: List[Dict[str, str]] = []
+        self.tokens: List[Dict[str, str]] = []
+        self.populares: List[str] = []
+        self.cursores: List[str] = []
+        self.tarefas: set = set()
+
+    # Preparação: tokens pelas rotas de autenticação
+
+    async def preparar(self):
+        await self.cliente.post("/api/auth/admin/registrar", json=ADMIN)
+        r = await self.cliente.post(
+            "/api/auth/admin/login",
+            json={"codigo_admin": ADMIN["codigo_admin"], "senha": ADMIN["senha"]},
+        )
+        r.raise_for_status()
+        self.admin = {"Authorization": "Bearer " + r.json()["access_token"]}
+
+        self.clientes = [
+            {"email": f"carga{i:05d}@locadora.com", "nome": f"Cliente Carga {i}", "senha": "carga"}
+            for i in range(self.args.clientes)
+        ]
+
+        async def entrar(dados: Dict[str, str]) -> Dict[str, str]:
+            await self.cliente.post("/api/auth/cliente/registrar", json=dados)
+            r = await self.cliente.post(
+                "/api/auth/cliente/login", json={"email": dados["email"], "senha": dados["senha"]}
+            )
+            r.raise_for_status()
+            return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+        # Em blocos: o hash de senha tem fila limitada e responde 503 quando lota
+        for inicio in range(0, len(self.clientes), 8):
+            self.tokens += await asyncio.gather(*(entrar(d) for d in self.clientes[inicio:inicio + 8]))
+
+        r = await self.cliente.get("/api/veiculos/", params={"status": "DISPONIVEL", "limite": 200})
+        itens = r.json()["itens"]
+        if not itens:
+            raise RuntimeError("Nenhum veículo disponível; rode scripts/gerar_dados_escala.py")
+        self.populares = [v["id"] for v in self.rng.sample(itens, min(self.args.populares, len(itens)))]
+
+    # Execução das requisições
+
+    async def _requisicao(self, rota: str, chegada: float, metodo: str, caminho: str, **kwargs):
+        async with self.vagas:
+            status = None
+            try:
+                r = await self.cliente.request(metodo, caminho, **kwargs)
+                status = r.status_code
+                erro = _motivo(r) if status >= 400 else None
+            except httpx.HTTPError as e:
+                erro = type(e).__name__
+                r = None
+            self.resultados.registrar(rota, time.perf_counter() - chegada, status, erro)
+            return r
+
+    async def catalogo(self, chegada: float):
+        params = {"limite": 20}
+        sorteio = self.rng.random()
+        if sorteio < 0.3:
+            params["categoria"] = self.rng.choice(CATEGORIAS)
+        elif sorteio < 0.5 and self.cursores:
+            params["cursor"] = self.rng.choice(self.cursores)
+        r = await self._requisicao("GET /api/veiculos/", chegada, "GET", "/api/veiculos/", params=params)
+        if r is not None and r.status_code == 200 and "categoria" not in params:
+            proximo = r.json().get("proximo_cursor")
+            if proximo and len(self.cursores) < 1000:
+                self.cursores.append(proximo)
+
+    async def login(self, chegada: float):
+        dados = self.rng.choice(self.clientes)
+        await self._requisicao(
+            "POST /api/auth/cliente/login", chegada, "POST", "/api/auth/cliente/login",
+            json={"email": dados["email"], "senha": dados["senha"]},
+        )
+
+    async def minhas(self, chegada: float):
+        await self._requisicao(
+            "GET /api/reservas/minhas-reservas", chegada, "GET", "/api/reservas/minhas-reservas",
+            headers=self.rng.choice(self.tokens),
+        )
+
+    async def reservas(self, chegada: float):
+        """Uma rajada: vários clientes disputam o mesmo veículo e o mesmo período"""
+        veiculo = self.rng.choice(self.populares)
+        inicio = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=self.rng.randint(1, 365))
+        corpo = {
+            "veiculo_id": veiculo,
+            "data_inicio": inicio.isoformat(),
+            "data_fim": (inicio + timedelta(days=self.rng.randint(1, 7))).isoformat(),
+        }
+        tokens = self.rng.sample(self.tokens, min(self.args.tamanho_rajada, len(self.tokens)))
+        await asyncio.gather(*(
+            self._requisicao("POST /api/reservas/", chegada, "POST", "/api/reservas/", json=corpo, headers=token)
+            for token in tokens
+        ))
+
+    async def dashboard(self, chegada: float):
+        await self._requisicao(
+            "GET /api/dashboard/stats", chegada, "GET", "/api/dashboard/stats", headers=self.admin
+        )
+
+    async def _chegadas(self, cenario: str, taxa: float, fim: float):
+        """Processo de Poisson: intervalos exponenciais, sem esperar as respostas"""
+        executar = getattr(self, cenario)
+        proxima = time.perf_counter()
+        while True:
+            proxima += self.rng.expovariate(taxa)
+            if proxima >= fim:
+                return
+            await asyncio.sleep(max(proxima - time.perf_counter(), 0))
+            tarefa = asyncio.create_task(executar(proxima))
+            self.tarefas.add(tarefa)
+            tarefa.add_done_callback(self.tarefas.discard)
+
+    async def rodar(self, taxas: Dict[str, float], duracao: float) -> float:
+        inicio = time.perf_counter()
+        fim = inicio + duracao
+        await asyncio.gather(*(
+            self._chegadas(cenario, taxa, fim) for cenario, taxa in taxas.items() if taxa > 0
+        ))
+        if self.tarefas:
+            await asyncio.gather(*list(self.tarefas))
+        return time.perf_counter() - inicio
+
+def imprimir(resumo: Dict[str, dict], decorrido: float):
+    total = sum(r["requisicoes"] for r in resumo.values())
+    print(f"\n📊 {total} requisições em {decorrido:.1f}s ({total / decorrido:.1f} req/s)")
+    for rota, r in resumo.items():
+        print(
+            f"\n{rota}\n   {r['requisicoes']} req ({r['req_s']:.1f}/s) | p50 {r['p50_ms']:.1f} ms | "
+            f"p95 {r['p95_ms']:.1f} ms | p99 {r['p99_ms']:.1f} ms | máx {r['max_ms']:.1f} ms"
+        )
+        maior = max(r["histograma"].values())
+        for faixa, quantidade in r["histograma"].items():
+            barra = "#" * max(round(quantidade / maior * 40), 1)
+            print(f"   {faixa:>9} {quantidade:7d} {barra}")
+        if r["erros"]:
+            erros = ", ".join(f"{motivo}: {quantidade}" for motivo, quantidade in r["erros"].items())
+            print(f"   erros: {erros}")
+
+def ler_taxas(pares: List[str]) -> Dict[str, float]:
+    taxas = dict(TAXAS_PADRAO)
+    for par in pares:
+        cenario, _, valor = par.partition("=")
+        if cenario not in TAXAS_PADRAO or not valor:
+            raise SystemExit(f"Taxa inválida: {par} (cenários: {', '.join(TAXAS_PADRAO)})")
+        taxas[cenario] = float(valor)
+    return taxas
+
+async def executar(base: str, args, taxas: Dict[str, float]):
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+    async with httpx.AsyncClient(base_url=base, limits=limites, timeout=args.timeout) as cliente:
+        carga = Carga(cliente, args)
+        print(f"🔑 Obtendo tokens de {args.clientes} clientes e do admin...")
+        await carga.preparar()
+        print("🚀 Carga: " + ", ".join(f"{c}={t:g}/s" for c, t in taxas.items()))
+        decorrido = await carga.rodar(taxas, args.duracao)
+        return carga.resultados.resumo(decorrido), decorrido
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base", default="http://127.0.0.1:8000", help="URL de uma API já no ar")
+    parser.add_argument("--subir", action="store_true", help="sobe o uvicorn local em --porta")
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--duracao", type=float, default=60.0, help="segundos de carga")
+    parser.add_argument("--concorrencia", type=int, default=64, help="requisições simultâneas no máximo")
+    parser.add_argument("--taxa", nargs="*", default=[], metavar="CENARIO=REQ_S",
+                        help="sobrescreve a taxa de um cenário (0 desliga)")
+    parser.add_argument("--clientes", type=int, default=50, help="clientes de carga com token")
+    parser.add_argument("--populares", type=int, default=5, help="veículos disputados nas rajadas")
+    parser.add_argument("--tamanho-rajada", type=int, default=10, help="POSTs simultâneos por rajada")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="arquivo JSON para gravar o resultado")
+    args = parser.parse_args()
+    taxas = ler_taxas(args.taxa)
+
+    processo = None
+    base = args.base
+    if args.subir:
+        processo = subir_api(os.getenv("DB_MODO", "async"), args.porta)
+        base = f"http://127.0.0.1:{args.porta}"
+    try:
+        resumo, decorrido = asyncio.run(executar(base, args, taxas))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+    imprimir(resumo, decorrido)
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump({
+                "meta": {
+                    "data": datetime.now(timezone.utc).isoformat(),
+                    "base": base,
+                    "duracao": decorrido,
+                    "concorrencia": args.concorrencia,
+                    "taxas": taxas,
+                },
+                "rotas": resumo,
+            }, arquivo, indent=2)
+        print(f"\n💾 Resultado salvo em {args.saida}")
+
+if __name__ == "__main__":
+    main()
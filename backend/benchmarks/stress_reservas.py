@@ -0,0 +1,250 @@
+"""
+Teste de estresse da reserva sob rajada: centenas de clientes pedindo os mesmos
+poucos veículos ao mesmo tempo (promoção no ar).
+
+Cada rodada dispara --reservadores POST /api/reservas/ simultâneos, espalhados
+por --veiculos veículos ainda livres, com períodos que se sobrepõem. Só uma
+reserva por veículo pode vingar; as demais recebem 400 (veículo já LOCADO ou
+período em conflito) ou, se o veículo seguiu travado depois das tentativas,
+409 com Retry-After. Com --trava-ms, outra transação segura as linhas dos
+veículos (como uma alteração do admin em andamento) quando a rodada começa:
+mostra se os reservadores ficam presos no lock ou falham rápido. As rotas
+são chamadas pelo app ASGI (httpx.ASGITransport), sem rede; o modo de banco
+segue o DB_MODO (sync/async).
+
+Ao final confere, no banco, que não há reserva dupla (duas reservas
+RESERVADA/ATIVA do mesmo veículo com períodos sobrepostos), que cada 200
+corresponde a uma linha gravada e que os contadores do dashboard batem com as
+tabelas. Relata vazão, p50/p99 e respostas por status; termina com código 1
+se algum invariante falhar ou houver erro 5xx.
+
+Roda em um schema descartável (stress_reservas) no banco do DATABASE_URL.
+
+Uso: python benchmarks/stress_reservas.py --reservadores 500 --veiculos 5 --rodadas 5 [--trava-ms 500]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import event, text
+
+from app.database import engine, async_engine, DB_MODO, POOL_PRE_PING, SessionLocal
+
+SCHEMA = "stress_reservas"
+
+def _usar_schema(conexao_dbapi, registro):
+    cursor = conexao_dbapi.cursor()
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    cursor.close()
+    # O SET abriu uma transação; sem o commit, o rollback da devolução ao pool o desfaria
+    conexao_dbapi.commit()
+
+# Antes de qualquer conexão: todas as conexões (sync e async) enxergam só o schema do teste
+event.listen(engine, "connect", _usar_schema)
+if async_engine is not None:
+    event.listen(async_engine.sync_engine, "connect", _usar_schema)
+
+# Reservas RESERVADA/ATIVA do mesmo veículo com períodos sobrepostos
+SQL_RESERVAS_DUPLAS = text("""
+    SELECT a.res_vei_id, a.res_id, b.res_id
+    FROM reservas a JOIN reservas b
+      ON a.res_vei_id = b.res_vei_id AND a.res_id < b.res_id
+     AND a.res_periodo && b.res_periodo
+    WHERE a.res_status IN ('RESERVADA', 'ATIVA') AND b.res_status IN ('RESERVADA', 'ATIVA')
+""")
+
+def criar_schema():
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    # Depois de uma ida e volta ao pool a conexão ainda precisa estar no schema do teste,
+    # senão a carga grava nas tabelas de verdade
+    for _ in range(2):
+        with engine.connect() as conn:
+            caminho = conn.execute(text("SHOW search_path")).scalar()
+        assert caminho == SCHEMA, f"search_path voltou para {caminho!r}"
+
+def remover_schema():
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+def popular(veiculos: int):
+    from app.Services import importacao_service
+
+    db = SessionLocal()
+    try:
+        importacao_service.gravar_lote(db, [
+            {"placa": f"SR{i:06d}", "modelo": "Onix", "marca": "Chevrolet", "ano": 2024,
+             "cor": "Branco", "categoria": "ECONOMICO", "valor_diaria": 100.0, "descricao": None}
+            for i in range(veiculos)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+def verificar_banco(sucessos: int) -> list:
+    """Invariantes depois da carga; devolve a lista de falhas"""
+    from app.Services import contadores_service
+
+    falhas = []
+    db = SessionLocal()
+    try:
+        duplas = db.execute(SQL_RESERVAS_DUPLAS).all()
+        if duplas:
+            falhas.append(f"{len(duplas)} reservas duplas, ex.: {tuple(duplas[0])}")
+        gravadas = db.scalar(text("SELECT count(*) FROM reservas"))
+        if gravadas != sucessos:
+            falhas.append(f"{sucessos} respostas 200, mas {gravadas} reservas gravadas")
+        divergencias = contadores_service.reconciliar_contadores(db, corrigir=False)
+        if divergencias:
+            falhas.append(f"contadores divergentes: {divergencias}")
+    finally:
+        db.close()
+    return falhas
+
+def travar(veiculos: list, segundos: float, travado: threading.Event):
+    """Segura as linhas dos veículos numa transação por `segundos`"""
+    with engine.begin() as conn:
+        conn.execute(text("SELECT id FROM veiculos WHERE id = ANY(:ids) FOR UPDATE"), {"ids": veiculos})
+        travado.set()
+        time.sleep(segundos)
+
+async def rodada(
+    cliente: httpx.AsyncClient, tokens: list, veiculos: list, reservadores: int, base: datetime, trava: float
+):
+    """Dispara todos os reservadores juntos; devolve ([(status, latência)], duração)"""
+    partida = asyncio.Event()
+    respostas = []
+
+    async def reservador(i: int):
+        # Períodos de 3 dias começando em até 3 dias da base: todos se sobrepõem
+        inicio = base + timedelta(days=random.randint(0, 3))
+        corpo = {
+            "veiculo_id": veiculos[i % len(veiculos)],
+            "data_inicio": inicio.isoformat(),
+            "data_fim": (inicio + timedelta(days=3)).isoformat(),
+        }
+        cabecalhos = {"Authorization": "Bearer " + tokens[i % len(tokens)]}
+        await partida.wait()
+        t0 = time.perf_counter()
+        try:
+            resposta = await cliente.post("/api/reservas/", json=corpo, headers=cabecalhos)
+            chave = resposta.status_code
+            if chave == 409 and "Retry-After" not in resposta.headers:
+                chave = "409 sem Retry-After"
+        except Exception as e:
+            chave = type(e).__name__
+        respostas.append((chave, time.perf_counter() - t0))
+
+    tarefas = [asyncio.ensure_future(reservador(i)) for i in range(reservadores)]
+    travado = threading.Event()
+    trava_feita = None
+    if trava:
+        trava_feita = asyncio.ensure_future(asyncio.to_thread(travar, veiculos, trava, travado))
+        await asyncio.to_thread(travado.wait)
+    await asyncio.sleep(0)
+    inicio = time.perf_counter()
+    partida.set()
+    await asyncio.gather(*tarefas)
+    if trava_feita is not None:
+        await trava_feita
+    return respostas, time.perf_counter() - inicio
+
+def _percentis(tempos: list) -> str:
+    tempos = sorted(tempos)
+    return (
+        f"p50 {statistics.median(tempos) * 1000:7.1f} ms | "
+        f"p99 {tempos[max(int(len(tempos) * 0.99) - 1, 0)] * 1000:7.1f} ms | máx {tempos[-1] * 1000:7.1f} ms"
+    )
+
+async def executar(args) -> int:
+    from app.main import app
+
+    await app.router.startup()
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://stress", timeout=120) as cliente:
+        print(f"🔧 {args.clientes} clientes e {args.veiculos * args.rodadas} veículos...")
+        tokens = []
+        for i in range(args.clientes):
+            email = f"stress{i}@locadora.com"
+            await cliente.post("/api/auth/cliente/registrar", json={"email": email, "nome": "Stress", "senha": "stress"})
+            r = await cliente.post("/api/auth/cliente/login", json={"email": email, "senha": "stress"})
+            if r.status_code != 200:
+                raise RuntimeError(f"login: {r.status_code} {r.text}")
+            tokens.append(r.json()["access_token"])
+        await asyncio.to_thread(popular, args.veiculos * args.rodadas)
+        with engine.connect() as conn:
+            ids = conn.execute(text("SELECT id FROM veiculos ORDER BY placa")).scalars().all()
+
+        print(
+            f"📊 {args.rodadas} rodadas de {args.reservadores} reservas simultâneas "
+            f"em {args.veiculos} veículos (DB_MODO={DB_MODO}, DB_POOL_PRE_PING={POOL_PRE_PING}):"
+        )
+        base = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=30)
+        todas, duracao, falhas = [], 0.0, []
+        for r in range(args.rodadas):
+            # Cada rodada usa veículos ainda livres
+            veiculos = ids[r * args.veiculos:(r + 1) * args.veiculos]
+            respostas, segundos = await rodada(
+                cliente, tokens, veiculos, args.reservadores, base, args.trava_ms / 1000
+            )
+            todas += respostas
+            duracao += segundos
+            status = Counter(chave for chave, _ in respostas)
+            print(
+                f"   rodada {r + 1}: {len(respostas) / segundos:7.1f} req/s | "
+                f"{dict(sorted(status.items(), key=str))}"
+            )
+            if status[200] > len(veiculos) or (not args.trava_ms and status[200] != len(veiculos)):
+                falhas.append(f"rodada {r + 1}: {status[200]} reservas para {len(veiculos)} veículos")
+
+    await app.router.shutdown()
+
+    print(f"\n   vazão {len(todas) / duracao:.1f} req/s | {_percentis([t for _, t in todas])}")
+    por_status = {}
+    for chave, segundos in todas:
+        por_status.setdefault(chave, []).append(segundos)
+    for chave, tempos in sorted(por_status.items(), key=lambda item: str(item[0])):
+        print(f"   {str(chave):>9}: {len(tempos):6d} respostas | {_percentis(tempos)}")
+    total = Counter({chave: len(tempos) for chave, tempos in por_status.items()})
+
+    falhas += await asyncio.to_thread(verificar_banco, total[200])
+    erros = sum(n for chave, n in total.items() if not isinstance(chave, int) or chave >= 500)
+    if erros:
+        falhas.append(f"{erros} erros 5xx/exceções")
+    if total["409 sem Retry-After"]:
+        falhas.append("409 sem Retry-After")
+    for falha in falhas:
+        print(f"❌ {falha}")
+    if not falhas:
+        print("✅ Nenhuma reserva dupla; contadores consistentes")
+    return 1 if falhas else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservadores", type=int, default=500, help="reservas simultâneas por rodada")
+    parser.add_argument("--veiculos", type=int, default=5, help="veículos disputados por rodada")
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--clientes", type=int, default=20, help="clientes que dividem os reservadores")
+    parser.add_argument("--trava-ms", type=float, default=0, help="outra transação segura os veículos no início da rodada")
+    args = parser.parse_args()
+
+    criar_schema()
+    try:
+        codigo = asyncio.run(executar(args))
+    finally:
+        remover_schema()
+    sys.exit(codigo)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+import os
+import argparse
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.Services import faturamento_service
+# Registra todos os modelos antes de configurar os mappers
+from app.models import Veiculos, Cliente, Reservar  # noqa: F401
+
+def backfill(inicio, fim):
+    """Reconstrói o rollup faturamento_diario a partir das reservas finalizadas"""
+    db = SessionLocal()
+    try:
+        linhas = faturamento_service.backfill(db, inicio, fim)
+        print(f"✅ Rollup recalculado: {linhas} linhas (dia x categoria).")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro no backfill do faturamento diário: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill do rollup de faturamento diário")
+    parser.add_argument("--inicio", type=date.fromisoformat, help="Primeiro dia (AAAA-MM-DD)")
+    parser.add_argument("--fim", type=date.fromisoformat, help="Último dia (AAAA-MM-DD)")
+    args = parser.parse_args()
+    backfill(args.inicio, args.fim)
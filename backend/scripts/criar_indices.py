@@ -0,0 +1,20 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, Base
+# Registra todos os modelos no metadata
+from app.models import Veiculos, Cliente, Reservar, Adm  # noqa: F401
+
+def criar_indices():
+    """Cria em bancos existentes os índices declarados nos modelos que ainda não existem"""
+    # CREATE INDEX CONCURRENTLY não bloqueia escritas, mas não roda dentro de transação
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for tabela in Base.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                indice.dialect_options["postgresql"]["concurrently"] = True
+                indice.create(bind=conn, checkfirst=True)
+                print(f"✅ {tabela.name}.{indice.name}")
+
+if __name__ == "__main__":
+    criar_indices()
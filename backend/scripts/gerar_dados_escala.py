@@ -0,0 +1,320 @@
+"""
+Gerador de massa de dados para testes de escala.
+
+Cria veículos, clientes e reservas com distribuições plausíveis e carrega tudo
+com COPY. A saída é determinística para uma mesma semente e volumes (datas
+relativas ao momento da execução). Cada veículo recebe um histórico de reservas
+sem sobreposição: passado FINALIZADA ou CANCELADA, presente ATIVA, futuro
+RESERVADA. Ao final, os veículos com locação ativa ficam LOCADO e os contadores
+e o rollup de faturamento são recalculados.
+
+Por padrão a constraint de exclusão e os índices secundários de reservas são
+removidos antes da carga e recriados depois. Recriar a constraint também
+valida que nenhum histórico se sobrepõe.
+
+Uso:
+    python scripts/gerar_dados_escala.py --veiculos 50000 --clientes 2000000 \\
+        --reservas 20000000 --semente 42 --truncar
+"""
+import sys
+import os
+import argparse
+import csv
+import io
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, SessionLocal
+from app.models import Veiculos, Cliente, Reservar, Contadores, FaturamentoDiario  # noqa: F401
+from app.Services import contadores_service, faturamento_service
+from app.utils.cache_catalogo import registrar_alteracoes_catalogo
+from app.utils.security import criar_hash_senha
+
+# Participação de cada categoria na frota e faixa de diária
+CATEGORIAS = {
+    "ECONOMICO": (0.45, (70, 120)),
+    "INTERMEDIARIO": (0.30, (120, 200)),
+    "SUV": (0.17, (200, 320)),
+    "LUXO": (0.08, (350, 900)),
+}
+MODELOS = {
+    "ECONOMICO": [("Onix", "Chevrolet"), ("Gol", "Volkswagen"), ("HB20", "Hyundai"), ("Mobi", "Fiat"), ("Kwid", "Renault")],
+    "INTERMEDIARIO": [("Corolla", "Toyota"), ("Civic", "Honda"), ("Sentra", "Nissan"), ("Virtus", "Volkswagen"), ("Cruze", "Chevrolet")],
+    "SUV": [("CR-V", "Honda"), ("Tiguan", "Volkswagen"), ("RAV4", "Toyota"), ("Compass", "Jeep"), ("Creta", "Hyundai")],
+    "LUXO": [("Série 3", "BMW"), ("Classe C", "Mercedes-Benz"), ("A4", "Audi"), ("XC60", "Volvo")],
+}
+CORES = ["Branco", "Preto", "Prata", "Cinza", "Vermelho", "Azul"]
+NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+         "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago", "Vanessa", "Yuri"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Rodrigues", "Almeida",
+              "Nascimento", "Carvalho", "Ribeiro", "Gomes", "Martins", "Rocha"]
+# Duração das locações em dias: maioria curta, cauda até um mês
+DURACOES = [(range(1, 4), 0.50), (range(4, 8), 0.35), (range(8, 31), 0.15)]
+# Intervalo médio (dias) entre o fim de uma reserva e o início da próxima do mesmo veículo
+INTERVALO_MEDIO_DIAS = 3.0
+HORIZONTE_FUTURO = timedelta(days=180)
+LINHAS_POR_BLOCO = 5000
+
+NAMESPACE = uuid.UUID("6f1c8a52-7d0e-4b8e-9a43-1f2d3c4b5a69")
+
+def id_veiculo(i: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"veiculo-{i}"))
+
+def id_cliente(i: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"cliente-{i}"))
+
+def placa(i: int) -> str:
+    """Placa Mercosul (LLLNLNN) única para cada índice"""
+    n, d2 = divmod(i, 100)
+    n, l4 = divmod(n, 26)
+    n, d1 = divmod(n, 10)
+    n, l3 = divmod(n, 26)
+    n, l2 = divmod(n, 26)
+    l1 = n % 26
+    letra = lambda x: chr(ord("A") + x)
+    return f"{letra(l1)}{letra(l2)}{letra(l3)}{d1}{letra(l4)}{d2:02d}"
+
+class FluxoCopy(io.RawIOBase):
+    """Arquivo somente leitura que gera o CSV do COPY sob demanda"""
+
+    def __init__(self, blocos):
+        self._blocos = blocos
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        while len(self._buffer) < len(destino):
+            try:
+                self._buffer += next(self._blocos).encode()
+            except StopIteration:
+                break
+        n = min(len(destino), len(self._buffer))
+        destino[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+def em_blocos(linhas):
+    """Agrupa as linhas em blocos CSV de LINHAS_POR_BLOCO"""
+    saida = io.StringIO()
+    escritor = csv.writer(saida, lineterminator="\n")
+    quantidade = 0
+    for linha in linhas:
+        escritor.writerow(linha)
+        quantidade += 1
+        if quantidade == LINHAS_POR_BLOCO:
+            yield saida.getvalue()
+            saida.seek(0)
+            saida.truncate()
+            quantidade = 0
+    if quantidade:
+        yield saida.getvalue()
+
+def sortear_veiculo(i: int, semente: int) -> dict:
+    """Atributos do veículo i; um gerador por veículo para poder repetir o sorteio"""
+    rng = random.Random(f"{semente}-veiculo-{i}")
+    nomes = list(CATEGORIAS)
+    categoria = rng.choices(nomes, [CATEGORIAS[c][0] for c in nomes])[0]
+    modelo, marca = rng.choice(MODELOS[categoria])
+    minimo, maximo = CATEGORIAS[categoria][1]
+    return {
+        "categoria": categoria,
+        "modelo": modelo,
+        "marca": marca,
+        "ano": rng.randint(2015, 2025),
+        "cor": rng.choice(CORES),
+        # LOCADO é aplicado depois, a partir das reservas ATIVA
+        "status": "MANUTENCAO" if rng.random() < 0.03 else "DISPONIVEL",
+        "valor_diaria": round(rng.uniform(minimo, maximo), 2),
+        "quilometragem": round(rng.uniform(0, 150000), 1),
+        "idade_dias": rng.randint(30, 3000),
+    }
+
+def veiculos(total: int, semente: int, agora: datetime):
+    for i in range(total):
+        v = sortear_veiculo(i, semente)
+        criado = (agora - timedelta(days=v["idade_dias"])).isoformat()
+        yield (
+            id_veiculo(i), v["modelo"], v["marca"], v["ano"], placa(i), v["cor"], v["categoria"],
+            v["status"], v["valor_diaria"], v["quilometragem"], "true", criado, criado,
+        )
+
+def clientes(total: int, semente: int, agora: datetime, senha_hash: str):
+    rng = random.Random(f"{semente}-clientes")
+    for i in range(total):
+        nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}"
+        criado = agora - timedelta(days=rng.randint(1, 2500), seconds=rng.randint(0, 86399))
+        yield (
+            id_cliente(i), f"cliente{i:08d}@exemplo.com.br", nome, senha_hash,
+            f"119{rng.randint(10000000, 99999999)}", f"{rng.randint(0, 99999999999):011d}",
+            "true" if rng.random() < 0.97 else "false", criado.isoformat(),
+        )
+
+def duracao(rng: random.Random) -> int:
+    faixa = rng.choices([f for f, _ in DURACOES], [p for _, p in DURACOES])[0]
+    return rng.choice(faixa)
+
+def reservas(total: int, veiculos_total: int, clientes_total: int, semente: int, agora: datetime, diarias):
+    """Histórico sequencial por veículo: cada reserva começa depois do fim da anterior"""
+    por_veiculo, extra = divmod(total, veiculos_total)
+    media_ciclo = sum((f.start + f.stop - 1) / 2 * p for f, p in DURACOES) + INTERVALO_MEDIO_DIAS + 1
+    limite = agora + HORIZONTE_FUTURO
+    for v in range(veiculos_total):
+        rng = random.Random(f"{semente}-reservas-{v}")
+        quantidade = por_veiculo + (1 if v < extra else 0)
+        vid = id_veiculo(v)
+        # Espalha o início para que o histórico termine perto de hoje
+        inicio = (agora - timedelta(days=quantidade * media_ciclo * rng.uniform(0.9, 1.05))).replace(
+            hour=10, minute=0, second=0, microsecond=0
+        )
+        for r in range(quantidade):
+            inicio += timedelta(days=1 + int(rng.expovariate(1 / INTERVALO_MEDIO_DIAS)))
+            if inicio > limite:
+                break
+            dias = duracao(rng)
+            fim = inicio + timedelta(days=dias)
+            if fim < agora:
+                status = "CANCELADA" if rng.random() < 0.08 else "FINALIZADA"
+            elif inicio <= agora:
+                status = "ATIVA"
+            else:
+                status = "CANCELADA" if rng.random() < 0.10 else "RESERVADA"
+            devolucao = fim.isoformat() if status == "FINALIZADA" else None
+            # Clientes frequentes: os índices baixos concentram mais reservas
+            cliente = int(clientes_total * rng.random() ** 2)
+            yield (
+                str(uuid.uuid5(NAMESPACE, f"reserva-{v}-{r}")), vid, id_cliente(cliente),
+                inicio.isoformat(), fim.isoformat(), status, round(dias * diarias[v], 2), devolucao,
+            )
+            inicio = fim
+
+def copiar(conexao, tabela: str, colunas, linhas) -> int:
+    contador = {"n": 0}
+    def contar():
+        for linha in linhas:
+            contador["n"] += 1
+            yield linha
+    with conexao.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)",
+            FluxoCopy(em_blocos(contar())),
+        )
+    return contador["n"]
+
+def remover_indices_reservas(conexao):
+    """Remove a constraint de exclusão e os índices secundários; devolve o DDL para recriar"""
+    with conexao.cursor() as cursor:
+        cursor.execute("""
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = 'reservas'::regclass AND contype = 'x'
+        """)
+        constraints = cursor.fetchall()
+        cursor.execute("""
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE tablename = 'reservas'
+              AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = 'reservas'::regclass)
+        """)
+        indices = cursor.fetchall()
+        for nome, _ in constraints:
+            cursor.execute(f'ALTER TABLE reservas DROP CONSTRAINT "{nome}"')
+        for nome, _ in indices:
+            cursor.execute(f'DROP INDEX "{nome}"')
+    return (
+        [f'ALTER TABLE reservas ADD CONSTRAINT "{nome}" {definicao}' for nome, definicao in constraints]
+        + [definicao for _, definicao in indices]
+    )
+
+def etapa(descricao: str, inicio: float):
+    print(f"   {descricao} ({time.perf_counter() - inicio:.1f}s)")
+
+def gerar(args):
+    agora = datetime.now(timezone.utc)
+    # Um hash só para todos os clientes (senha "senha123"): bcrypt por linha seria inviável
+    senha_hash = criar_hash_senha("senha123")
+
+    conexao = engine.raw_connection()
+    try:
+        with conexao.cursor() as cursor:
+            cursor.execute("SELECT (SELECT count(*) FROM veiculos) + (SELECT count(*) FROM clientes)")
+            existentes = cursor.fetchone()[0]
+        if existentes and not args.truncar:
+            print("❌ Já existem veículos/clientes no banco. Use --truncar para apagar tudo antes.")
+            return 1
+        if args.truncar:
+            with conexao.cursor() as cursor:
+                cursor.execute(
+                    "TRUNCATE reservas, veiculos, clientes, contadores, faturamento_diario CASCADE"
+                )
+            print("🧹 Tabelas truncadas.")
+
+        recriar = [] if args.manter_indices else remover_indices_reservas(conexao)
+        conexao.commit()
+
+        inicio = time.perf_counter()
+        n = copiar(conexao, "veiculos",
+                   ["id", "modelo", "marca", "ano", "placa", "cor", "categoria", "status",
+                    "valor_diaria", "quilometragem", "ativo", "criado_em", "atualizado_em"],
+                   veiculos(args.veiculos, args.semente, agora))
+        etapa(f"{n} veículos", inicio)
+
+        inicio = time.perf_counter()
+        n = copiar(conexao, "clientes",
+                   ["cli_id", "cli_email", "cli_nome", "cli_senha_hash", "cli_telefone", "cli_cpf",
+                    "cli_ativo", "cli_criado_em"],
+                   clientes(args.clientes, args.semente, agora, senha_hash))
+        etapa(f"{n} clientes", inicio)
+
+        inicio = time.perf_counter()
+        diarias = [sortear_veiculo(i, args.semente)["valor_diaria"] for i in range(args.veiculos)]
+        n = copiar(conexao, "reservas",
+                   ["res_id", "res_vei_id", "res_cli_id", "res_data_inicio", "res_data_fim",
+                    "res_status", "res_total", "data_devolucao"],
+                   reservas(args.reservas, args.veiculos, args.clientes, args.semente, agora, diarias))
+        etapa(f"{n} reservas", inicio)
+        conexao.commit()
+
+        inicio = time.perf_counter()
+        with conexao.cursor() as cursor:
+            for ddl in recriar:
+                cursor.execute(ddl)
+            cursor.execute("""
+                UPDATE veiculos SET status = 'LOCADO'
+                WHERE id IN (SELECT res_vei_id FROM reservas WHERE res_status = 'ATIVA')
+            """)
+            cursor.execute("ANALYZE veiculos; ANALYZE clientes; ANALYZE reservas")
+        conexao.commit()
+        etapa("índices recriados, status LOCADO aplicado, ANALYZE", inicio)
+    finally:
+        conexao.close()
+
+    inicio = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # A carga não passou pelas rotas: invalida os ETags e o cache do catálogo
+        contadores_service.registrar_alteracao_catalogo(db)
+        registrar_alteracoes_catalogo(db, None)
+        contadores_service.reconciliar_contadores(db)
+        faturamento_service.backfill(db)
+    finally:
+        db.close()
+    etapa("contadores e rollup de faturamento recalculados", inicio)
+    print("✅ Massa de dados gerada.")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera massa de dados de escala com COPY")
+    parser.add_argument("--veiculos", type=int, default=1000)
+    parser.add_argument("--clientes", type=int, default=20000)
+    parser.add_argument("--reservas", type=int, default=100000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--truncar", action="store_true", help="Apaga veículos, clientes e reservas antes")
+    parser.add_argument("--manter-indices", action="store_true",
+                        help="Não remove a constraint/índices de reservas durante a carga")
+    args = parser.parse_args()
+    if args.veiculos < 1 or args.clientes < 1:
+        parser.error("--veiculos e --clientes precisam ser positivos")
+    sys.exit(gerar(args))
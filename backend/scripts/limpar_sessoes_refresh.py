@@ -0,0 +1,18 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.Services import sessoes_service
+
+def limpar():
+    """Apaga os refresh tokens vencidos (revogados ou não)"""
+    db = SessionLocal()
+    try:
+        removidas = sessoes_service.remover_expiradas(db)
+    finally:
+        db.close()
+    print(f"✅ {removidas} sessões de refresh expiradas removidas.")
+
+if __name__ == "__main__":
+    limpar()
@@ -0,0 +1,24 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database import engine
+from criar_indices import criar_indices
+
+def migrar_atualizado_em_reservas():
+    """Cria a coluna res_atualizado_em e o índice dela em bancos já existentes"""
+    with engine.begin() as conn:
+        # Com DEFAULT não volátil o Postgres não reescreve a tabela: as linhas antigas
+        # recebem o instante da migração e entram na primeira exportação incremental
+        conn.execute(text("""
+            ALTER TABLE reservas ADD COLUMN IF NOT EXISTS res_atualizado_em
+            timestamptz NOT NULL DEFAULT now()
+        """))
+        print("✅ Coluna res_atualizado_em criada/verificada.")
+    # O índice declarado no modelo (ix_reservas_res_atualizado_em)
+    criar_indices()
+
+if __name__ == "__main__":
+    migrar_atualizado_em_reservas()
@@ -0,0 +1,76 @@
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database import engine
+
+# Reservas ativas do mesmo veículo cujo início cai dentro de uma reserva anterior
+SQL_CONFLITOS = """
+    SELECT res_id, res_vei_id, res_data_inicio, res_data_fim
+    FROM (
+        SELECT res_id, res_vei_id, res_data_inicio, res_data_fim,
+               max(res_data_fim) OVER (
+                   PARTITION BY res_vei_id ORDER BY res_data_inicio, res_id
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+               ) AS fim_anterior
+        FROM reservas
+        WHERE res_status IN ('RESERVADA', 'ATIVA')
+    ) t
+    WHERE res_data_inicio <= fim_anterior
+"""
+
+def migrar_periodo_reservas(cancelar_conflitos: bool = False) -> bool:
+    """Cria a coluna res_periodo e a constraint de exclusão em bancos já existentes"""
+    # Tudo em uma transação: qualquer return antes do commit desfaz as alterações
+    with engine.connect() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+
+        invalidas = conn.execute(text(
+            "SELECT count(*) FROM reservas WHERE res_data_fim < res_data_inicio"
+        )).scalar()
+        if invalidas:
+            print(f"❌ {invalidas} reservas com data_fim anterior a data_inicio. Corrija antes de migrar.")
+            return False
+
+        conn.execute(text("""
+            ALTER TABLE reservas ADD COLUMN IF NOT EXISTS res_periodo tstzrange
+            GENERATED ALWAYS AS (tstzrange(res_data_inicio, res_data_fim, '[]')) STORED
+        """))
+        print("✅ Coluna res_periodo criada/verificada.")
+
+        conflitos = conn.execute(text(SQL_CONFLITOS)).all()
+        if conflitos:
+            print(f"⚠️  {len(conflitos)} reservas ativas sobrepostas a outra do mesmo veículo:")
+            for c in conflitos:
+                print(f"   {c.res_id} (veículo {c.res_vei_id}): {c.res_data_inicio} -> {c.res_data_fim}")
+            if not cancelar_conflitos:
+                print("❌ Migração abortada. Use --cancelar-conflitos para cancelar as reservas acima.")
+                return False
+            conn.execute(
+                text("UPDATE reservas SET res_status = 'CANCELADA' WHERE res_id = ANY(:ids)"),
+                {"ids": [c.res_id for c in conflitos]},
+            )
+            print(f"🔧 {len(conflitos)} reservas marcadas como CANCELADA.")
+
+        existe = conn.execute(text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'ex_reservas_veiculo_periodo'"
+        )).first()
+        if existe is None:
+            conn.execute(text("""
+                ALTER TABLE reservas ADD CONSTRAINT ex_reservas_veiculo_periodo
+                EXCLUDE USING gist (res_vei_id WITH =, res_periodo WITH &&)
+                WHERE (res_status IN ('RESERVADA', 'ATIVA'))
+            """))
+        conn.commit()
+        print("✅ Constraint ex_reservas_veiculo_periodo criada/verificada.")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra reservas para o período com constraint de exclusão")
+    parser.add_argument("--cancelar-conflitos", action="store_true",
+                        help="Cancela reservas ativas sobrepostas em vez de abortar")
+    args = parser.parse_args()
+    sys.exit(0 if migrar_periodo_reservas(args.cancelar_conflitos) else 1)
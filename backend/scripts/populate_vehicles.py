@@ -4,6 +4,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import SessionLocal
 from app.models.Veiculos import Veiculo, CategoriaVeiculo, StatusVeiculo  # Corrigido o import
+from app.Services import importacao_service
 
 def populate_vehicles():
     db = SessionLocal()
@@ -121,10 +122,8 @@ def populate_vehicles():
             }
         ]
         
-        # Inserir veículos no banco
-        for vehicle_data in vehicles_data:
-            vehicle = Veiculo(**vehicle_data)
-            db.add(vehicle)
+        # Inserir veículos no banco (um INSERT multi-linha, contadores inclusos)
+        importacao_service.gravar_lote(db, vehicles_data)
         
         db.commit()
         print("✅ 12 veículos inseridos com sucesso!")
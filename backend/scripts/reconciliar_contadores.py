@@ -0,0 +1,31 @@
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.Services import contadores_service
+
+def reconciliar(corrigir: bool) -> int:
+    """Recalcula os contadores do dashboard e informa as divergências encontradas"""
+    db = SessionLocal()
+    try:
+        divergencias = contadores_service.reconciliar_contadores(db, corrigir=corrigir)
+    finally:
+        db.close()
+
+    if not divergencias:
+        print("✅ Contadores consistentes.")
+        return 0
+    print(f"⚠️  {len(divergencias)} contadores divergentes:")
+    for chave, valores in divergencias.items():
+        print(f"   {chave}: armazenado={valores['atual']} recalculado={valores['esperado']}")
+    if corrigir:
+        print("🔧 Valores recalculados gravados.")
+    return 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcilia os contadores do dashboard")
+    parser.add_argument("--apenas-verificar", action="store_true", help="Não grava correções")
+    args = parser.parse_args()
+    sys.exit(reconciliar(corrigir=not args.apenas_verificar))
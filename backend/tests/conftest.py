@@ -0,0 +1,101 @@
+"""
+Fixtures dos testes.
+
+Os testes que usam o banco rodam pelo app ASGI (TestClient) num schema
+descartável (testes_locadora) do banco do DATABASE_URL, criado no início da
+sessão e removido no fim; sem DATABASE_URL eles são pulados. O modo de banco
+segue o DB_MODO (sync/async).
+"""
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Hash barato: os testes cadastram e autenticam vários usuários
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+SCHEMA = "testes_locadora"
+
+# Script de população (populate_vehicles), sem testes
+collect_ignore = ["test_auth_e_veiculos.py"]
+
+@pytest.fixture(scope="session")
+def aplicacao():
+    if "DATABASE_URL" not in os.environ:
+        pytest.skip("DATABASE_URL não definido")
+
+    from sqlalchemy import event, text
+    from app.database import engine, async_engine
+
+    def usar_schema(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        cursor.execute(f"SET search_path TO {SCHEMA}")
+        cursor.close()
+        # O SET abriu uma transação; sem o commit, o rollback da devolução ao pool o desfaria
+        conexao_dbapi.commit()
+
+    # Antes de qualquer conexão: todas as conexões (sync e async) enxergam só o schema dos testes
+    event.listen(engine, "connect", usar_schema)
+    if async_engine is not None:
+        event.listen(async_engine.sync_engine, "connect", usar_schema)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    # O import cria as tabelas (no schema dos testes)
+    from app.main import app
+    yield app
+
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+@pytest.fixture(scope="session")
+def cliente(aplicacao):
+    """Um TestClient para a sessão toda: no modo async o pool fica preso ao loop dele"""
+    from fastapi.testclient import TestClient
+    from app.main import escuta_invalidacoes
+
+    with TestClient(aplicacao) as cliente:
+        # Sem a escuta conectada os caches ficam desligados
+        assert escuta_invalidacoes.aguardar(10)
+        yield cliente
+
+_sequencia = itertools.count(1)
+
+def unico(prefixo: str) -> str:
+    """Identificador que não se repete na sessão (placas, e-mails)"""
+    return f"{prefixo}{next(_sequencia):04d}"
+
+def autenticar_cliente(cliente, email: str = None, senha: str = "segredo") -> dict:
+    email = email or f"{unico('cliente')}@locadora.com"
+    r = cliente.post("/api/auth/cliente/registrar", json={"email": email, "nome": "Teste", "senha": senha})
+    assert r.status_code == 201, r.text
+    r = cliente.post("/api/auth/cliente/login", json={"email": email, "senha": senha})
+    assert r.status_code == 200, r.text
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+@pytest.fixture(scope="session")
+def admin(cliente) -> dict:
+    """Cabeçalhos de um admin autenticado"""
+    r = cliente.post("/api/auth/admin/registrar", json={"codigo_admin": "ADM000001", "adm_nome": "Admin", "senha": "x"})
+    assert r.status_code in (201, 400), r.text
+    r = cliente.post("/api/auth/admin/login", json={"codigo_admin": "ADM000001", "senha": "x"})
+    assert r.status_code == 200, r.text
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+@pytest.fixture
+def novo_veiculo(cliente, admin):
+    """Cria um veículo (placa única) com os campos dados e devolve o JSON"""
+    def criar(**campos) -> dict:
+        dados = {
+            "placa": unico("TST"), "modelo": "Onix", "marca": "Chevrolet", "ano": 2024,
+            "cor": "Branco", "categoria": "ECONOMICO", "valor_diaria": 100.0, **campos,
+        }
+        r = cliente.post("/api/veiculos/", json=dados, headers=admin)
+        assert r.status_code == 200, r.text
+        return r.json()
+    return criar
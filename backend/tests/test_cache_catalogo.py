@@ -0,0 +1,73 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.utils.cache_catalogo import alteracao_de, registrar_alteracoes_catalogo
+
+ROTA = "/api/veiculos/"
+
+def _versao_catalogo() -> int:
+    from app.database import SessionLocal
+    from app.Services import contadores_service
+
+    db = SessionLocal()
+    try:
+        return contadores_service.ler_versao_catalogo(db)[0]
+    finally:
+        db.close()
+
+def test_if_none_match_responde_304(cliente, novo_veiculo):
+    veiculo = novo_veiculo()
+    for rota in (ROTA, f"{ROTA}{veiculo['id']}"):
+        r = cliente.get(rota)
+        assert r.status_code == 200, r.text
+        etag = r.headers["ETag"]
+
+        r = cliente.get(rota, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["ETag"] == etag
+        # Comparação fraca: o mesmo ETag sem o W/ também vale
+        assert cliente.get(rota, headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+
+def test_escrita_de_veiculo_muda_versao_e_etag(cliente, admin, novo_veiculo):
+    veiculo = novo_veiculo()
+    rota = f"{ROTA}{veiculo['id']}"
+    etag_lista = cliente.get(ROTA).headers["ETag"]
+    etag_veiculo = cliente.get(rota).headers["ETag"]
+    versao = _versao_catalogo()
+
+    r = cliente.patch(f"{rota}/status", params={"status": "MANUTENCAO"}, headers=admin)
+    assert r.status_code == 200, r.text
+    assert _versao_catalogo() == versao + 1
+
+    # O ETag antigo não vale mais: a resposta vem inteira, já com a alteração
+    r = cliente.get(rota, headers={"If-None-Match": etag_veiculo})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag_veiculo
+    assert r.json()["status"] == "MANUTENCAO"
+    r = cliente.get(ROTA, headers={"If-None-Match": etag_lista})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag_lista
+
+def test_campos_diferentes_tem_etags_diferentes(cliente, novo_veiculo):
+    veiculo = novo_veiculo()
+    rota = f"{ROTA}{veiculo['id']}"
+    etags = {
+        campos: cliente.get(rota, params={"fields": campos} if campos else None).headers["ETag"]
+        for campos in (None, "placa", "placa,modelo")
+    }
+    assert len(set(etags.values())) == 3
+    # A ordem dos campos pedidos não cria outra variante
+    assert cliente.get(rota, params={"fields": "modelo,placa"}).headers["ETag"] == etags["placa,modelo"]
+    # O ETag de uma variante não valida outra
+    r = cliente.get(rota, params={"fields": "placa"}, headers={"If-None-Match": etags["placa,modelo"]})
+    assert r.status_code == 200
+    assert cliente.get(rota, params={"fields": "placa"}, headers={"If-None-Match": etags["placa"]}).status_code == 304
+
+def test_fora_do_postgres_nao_envia_notify():
+    sessao = Session(create_engine("sqlite://"))
+    try:
+        registrar_alteracoes_catalogo(sessao, [alteracao_de("1", ["ECONOMICO"], ["DISPONIVEL"])])
+        assert sessao.info["catalogo_alterado"]
+    finally:
+        sessao.close()
@@ -0,0 +1,176 @@
+import json
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from app.utils import cache_principais as modulo
+from app.utils.cache_principais import cache_principais
+from app.utils.security import criar_access_token
+from conftest import autenticar_cliente, unico
+
+ROTA_CLIENTE = "/api/reservas/minhas-reservas"
+
+def _novo_cliente(cliente):
+    email = f"{unico('principal')}@locadora.com"
+    return email, autenticar_cliente(cliente, email)
+
+def _alterar_cliente(email: str, alterar):
+    """Altera (ou remove) o cliente por uma sessão do ORM, como faria outra rota"""
+    from app.database import SessionLocal
+    from app.models.Cliente import Cliente
+
+    db = SessionLocal()
+    try:
+        usuario = db.scalar(select(Cliente).where(Cliente.cli_email == email))
+        alterar(db, usuario)
+        db.commit()
+    finally:
+        db.close()
+
+def test_acerto_devolve_instancia_nova(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+
+    primeira = cache_principais.obter("cliente", email)
+    segunda = cache_principais.obter("cliente", email)
+    assert primeira is not None and segunda is not None
+    assert primeira is not segunda
+    # Mexer na instância de uma requisição não muda a das outras
+    primeira.cli_nome = "Outro"
+    assert cache_principais.obter("cliente", email).cli_nome == "Teste"
+    assert segunda.cli_email == email
+
+def test_token_adulterado_recusado_mesmo_em_cache(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+    assert cache_principais.obter("cliente", email) is not None
+
+    token = cabecalhos["Authorization"].removeprefix("Bearer ")
+    cabeca, carga, assinatura = token.split(".")
+    outra_assinatura = ("A" if assinatura[0] != "A" else "B") + assinatura[1:]
+    r = cliente.get(ROTA_CLIENTE, headers={"Authorization": f"Bearer {cabeca}.{carga}.{outra_assinatura}"})
+    assert r.status_code == 401
+
+def test_token_expirado_recusado_mesmo_em_cache(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+
+    expirado = criar_access_token({"sub": email, "role": "cliente"}, timedelta(seconds=-1))
+    r = cliente.get(ROTA_CLIENTE, headers={"Authorization": f"Bearer {expirado}"})
+    assert r.status_code == 401
+
+def test_token_de_admin_nao_usa_entrada_de_cliente(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+
+    como_admin = criar_access_token({"sub": email, "role": "admin"})
+    r = cliente.get("/api/dashboard/stats", headers={"Authorization": f"Bearer {como_admin}"})
+    assert r.status_code == 401
+
+def test_alteracao_do_cliente_invalida_o_cache(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+    invalidacoes = cache_principais.invalidacoes
+
+    def renomear(db, usuario):
+        usuario.cli_nome = "Renomeado"
+    _alterar_cliente(email, renomear)
+    assert cache_principais.invalidacoes == invalidacoes + 1
+    assert cache_principais.obter("cliente", email) is None
+
+    # A próxima requisição recarrega do banco
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+    assert cache_principais.obter("cliente", email).cli_nome == "Renomeado"
+
+def test_troca_de_email_invalida_tokens_antigos(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+
+    def trocar_email(db, usuario):
+        usuario.cli_email = f"{unico('trocado')}@locadora.com"
+    _alterar_cliente(email, trocar_email)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 401
+
+def test_remocao_do_cliente_invalida_o_cache(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+
+    _alterar_cliente(email, lambda db, usuario: db.delete(usuario))
+    assert cache_principais.obter("cliente", email) is None
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 401
+
+def test_alteracao_desfeita_nao_invalida(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+    invalidacoes = cache_principais.invalidacoes
+
+    from app.database import SessionLocal
+    from app.models.Cliente import Cliente
+
+    db = SessionLocal()
+    try:
+        usuario = db.scalar(select(Cliente).where(Cliente.cli_email == email))
+        usuario.cli_nome = "Desfeito"
+        db.flush()
+        db.rollback()
+    finally:
+        db.close()
+    assert cache_principais.invalidacoes == invalidacoes
+    assert cache_principais.obter("cliente", email).cli_nome == "Teste"
+
+def _aguardar(condicao, segundos: float = 5) -> bool:
+    limite = time.monotonic() + segundos
+    while not condicao():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.02)
+    return True
+
+def test_alteracao_em_outro_worker_invalida_por_notify(cliente):
+    from app.database import engine
+
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+    cli_id = cache_principais.obter("cliente", email).cli_id
+
+    # O que o commit de outro processo envia
+    payload = json.dumps({"origem": "outro-worker", "donos": [["cliente", cli_id]]})
+    with engine.begin() as conn:
+        conn.execute(select(func.pg_notify(modulo.CANAL, payload)))
+    assert _aguardar(lambda: cache_principais.obter("cliente", email) is None)
+
+def test_commit_notifica_os_outros_workers(cliente):
+    from app.database import engine
+    from app.utils.escuta_invalidacoes import Canal, EscutaInvalidacoes
+
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+    cli_id = cache_principais.obter("cliente", email).cli_id
+
+    # Escuta de um "outro worker", com a mesma classe que o app usa
+    recebidos = []
+    outro = EscutaInvalidacoes(engine, {modulo.CANAL: Canal(recebidos.append, lambda: None, lambda: None)})
+    outro.iniciar()
+    try:
+        assert outro.aguardar(10)
+
+        def renomear(db, usuario):
+            usuario.cli_nome = "Notificado"
+        _alterar_cliente(email, renomear)
+        assert _aguardar(lambda: any(["cliente", cli_id] in json.loads(p)["donos"] for p in recebidos))
+    finally:
+        outro.parar()
+    assert json.loads(recebidos[-1])["origem"] == modulo.ORIGEM
+
+def test_leitura_anterior_a_invalidacao_nao_entra_no_cache(cliente):
+    email, cabecalhos = _novo_cliente(cliente)
+    assert cliente.get(ROTA_CLIENTE, headers=cabecalhos).status_code == 200
+    usuario = cache_principais.obter("cliente", email)
+    cache_principais.invalidar(modulo.dono_de(usuario))
+
+    # Lido antes de uma invalidação que chegou no meio da consulta: fica de fora
+    geracao = cache_principais.geracao
+    cache_principais.invalidar(("cliente", "outro"))
+    cache_principais.guardar("cliente", email, usuario, geracao)
+    assert cache_principais.obter("cliente", email) is None
@@ -0,0 +1,30 @@
+from conftest import unico
+
+def test_fields_no_cliente_e_no_veiculo(cliente, admin, novo_veiculo):
+    email = f"{unico('campos')}@locadora.com"
+    r = cliente.post("/api/clientes/", headers=admin, json={
+        "cli_email": email, "cli_nome": "Campos", "cli_senha_hash": "x", "cli_cpf": unico("cpf"),
+    })
+    assert r.status_code == 200, r.text
+    completo = r.json()
+
+    rota = f"/api/clientes/{completo['cli_id']}"
+    assert cliente.get(rota, headers=admin).json() == completo
+    assert cliente.get(rota, headers=admin, params={"fields": "cli_email"}).json() == {
+        "cli_id": completo["cli_id"], "cli_email": email,
+    }
+
+    veiculo = novo_veiculo()
+    r = cliente.get(f"/api/veiculos/{veiculo['id']}", params={"fields": "placa"})
+    assert r.json() == {"id": veiculo["id"], "placa": veiculo["placa"]}
+
+def test_openapi_documenta_campos_opcionais(cliente):
+    esquemas = cliente.get("/openapi.json").json()["components"]["schemas"]
+    for nome, obrigatorio, opcional in (
+        ("VeiculoResponseCampos", "id", "placa"),
+        ("ClienteResponseCampos", "cli_id", "cli_email"),
+        ("LocacaoResponseCampos", "res_id", "res_status"),
+    ):
+        assert esquemas[nome]["required"] == [obrigatorio]
+        # Opcional sem default: o campo falta, não vem como null
+        assert "default" not in esquemas[nome]["properties"][opcional]
@@ -0,0 +1,70 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.Services import exportacao_service
+from app.utils.cache_principais import cache_principais
+from conftest import autenticar_cliente
+
+def _reservar(cliente, novo_veiculo, dias_a_frente: int) -> tuple:
+    """Cria uma reserva começando daqui a `dias_a_frente` dias; devolve (res_id, início)"""
+    inicio = datetime.utcnow().replace(microsecond=0) + timedelta(days=dias_a_frente)
+    r = cliente.post("/api/reservas/", headers=autenticar_cliente(cliente), json={
+        "veiculo_id": novo_veiculo()["id"],
+        "data_inicio": inicio.isoformat(),
+        "data_fim": (inicio + timedelta(days=2)).isoformat(),
+    })
+    assert r.status_code == 200, r.text
+    return r.json()["res_id"], inicio
+
+def test_exportacao_ocupa_uma_conexao_e_uma_vaga(cliente, admin, novo_veiculo, monkeypatch):
+    from app import database
+
+    _, inicio = _reservar(cliente, novo_veiculo, 400)
+
+    # Medido enquanto o corpo é gerado, com o cursor da exportação aberto
+    medidas = []
+    formatar = exportacao_service._FORMATADORES["ndjson"]
+    def medir(linhas, cabecalho):
+        pool = (database.async_engine or database.engine).pool
+        medidas.append((pool.checkedout(), database.vagas_sessoes_em_uso()))
+        return formatar(linhas, cabecalho)
+    monkeypatch.setitem(exportacao_service._FORMATADORES, "ndjson", medir)
+    # Sem o admin em cache, a autenticação consulta o banco pela sessão da requisição
+    cache_principais.limpar()
+
+    r = cliente.get("/api/reservas/export", params={"inicio": inicio.isoformat()}, headers=admin)
+    assert r.status_code == 200, r.text
+    assert len(r.text.splitlines()) == 1
+
+    # A sessão da autenticação já devolveu a conexão; no modo sync a vaga dela cobre a exportação
+    vagas = 0 if database.async_engine is not None else 1
+    assert medidas == [(1, vagas)]
+    assert database.vagas_sessoes_em_uso() == 0
+
+def test_incremental_sobrepoe_a_janela_de_seguranca(cliente, admin, novo_veiculo):
+    from app.database import SessionLocal
+    from app.models.Reservar import Reserva
+
+    res_id, inicio = _reservar(cliente, novo_veiculo, 500)
+    # Alteração de uma transação que começou antes do maior instante já exportado
+    # e só confirmou depois dele
+    alterada_em = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+    db = SessionLocal()
+    try:
+        db.execute(update(Reserva).where(Reserva.res_id == res_id).values(res_atualizado_em=alterada_em))
+        db.commit()
+    finally:
+        db.close()
+
+    def exportadas(atualizado_desde: datetime):
+        r = cliente.get("/api/reservas/export", headers=admin, params={
+            "inicio": inicio.isoformat(), "atualizado_desde": atualizado_desde.isoformat(),
+        })
+        assert r.status_code == 200, r.text
+        return [json.loads(linha)["res_id"] for linha in r.text.splitlines()]
+
+    janela = exportacao_service.JANELA_SEGURANCA
+    assert exportadas(alterada_em + janela - timedelta(seconds=1)) == [res_id]
+    assert exportadas(alterada_em + janela + timedelta(seconds=1)) == []
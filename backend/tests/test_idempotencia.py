@@ -0,0 +1,141 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.utils import idempotencia
+from app.utils.idempotencia import repositorio_idempotencia
+from conftest import autenticar_cliente, unico
+
+ROTA = "/api/auth/cliente/registrar"
+
+def _registrar(cliente, chave: str, email: str):
+    return cliente.post(ROTA, headers={"Idempotency-Key": chave},
+                        json={"email": email, "nome": "Idempotente", "senha": "segredo"})
+
+def _chave_guardada(chave: str) -> bytes:
+    return idempotencia._hash(b"POST", ROTA.encode(), b"", chave.encode())
+
+def _executar(funcao, *args):
+    from app.database import engine
+
+    with engine.begin() as conn:
+        return funcao(conn, *args)
+
+def _linha(conn, chave: str):
+    tabela = idempotencia._tabela
+    return conn.execute(select(tabela).where(tabela.c.chave == _chave_guardada(chave))).first()
+
+def _clientes_com_email(email: str) -> int:
+    from app.models.Cliente import Cliente
+
+    return _executar(lambda conn: conn.scalar(select(func.count()).where(Cliente.cli_email == email)))
+
+def test_repeticao_vem_da_tabela_sem_o_cache_em_memoria(cliente):
+    chave, email = unico("chave"), f"{unico('idem')}@locadora.com"
+    primeira = _registrar(cliente, chave, email)
+    assert primeira.status_code == 201, primeira.text
+    linha = _executar(_linha, chave)
+    assert linha.status == 201 and linha.corpo == primeira.content
+
+    # Outro worker: nada no cache em memória, só a tabela
+    repositorio_idempotencia.limpar()
+    repeticoes_banco = repositorio_idempotencia.repeticoes_banco
+    repetida = _registrar(cliente, chave, email)
+    assert repetida.status_code == 201
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert repetida.content == primeira.content
+    assert repositorio_idempotencia.repeticoes_banco == repeticoes_banco + 1
+    assert _clientes_com_email(email) == 1
+
+    # Agora em cache: a próxima repetição nem consulta a tabela
+    assert _registrar(cliente, chave, email).status_code == 201
+    assert repositorio_idempotencia.repeticoes_banco == repeticoes_banco + 1
+
+def test_mesma_chave_com_outro_corpo_recusada(cliente):
+    chave = unico("chave")
+    assert _registrar(cliente, chave, f"{unico('idem')}@locadora.com").status_code == 201
+    repositorio_idempotencia.limpar()
+
+    r = _registrar(cliente, chave, f"{unico('idem')}@locadora.com")
+    assert r.status_code == 422
+
+def _reivindicada_por_outro(chave: str, email: str, prazo: timedelta):
+    """Linha de uma requisição em andamento em outro worker (ou num que caiu, se o prazo passou)"""
+    def inserir(conn):
+        corpo = json.dumps({"email": email, "nome": "Idempotente", "senha": "segredo"}).encode()
+        conn.execute(idempotencia._tabela.insert().values(
+            chave=_chave_guardada(chave), impressao=idempotencia._hash(corpo), expira_em=func.now() + prazo,
+        ))
+        return corpo
+    return _executar(inserir)
+
+def test_em_andamento_em_outro_worker_espera_e_recusa_com_409(cliente, monkeypatch):
+    chave, email = unico("chave"), f"{unico('idem')}@locadora.com"
+    corpo = _reivindicada_por_outro(chave, email, timedelta(minutes=1))
+    monkeypatch.setattr(idempotencia, "ESPERA_MAXIMA_SEGUNDOS", 0.2)
+
+    r = cliente.post(ROTA, headers={"Idempotency-Key": chave, "Content-Type": "application/json"}, content=corpo)
+    assert r.status_code == 409
+    assert r.headers["Retry-After"] == "1"
+    assert _clientes_com_email(email) == 0
+
+def test_reivindicacao_vencida_e_retomada(cliente):
+    chave, email = unico("chave"), f"{unico('idem')}@locadora.com"
+    corpo = _reivindicada_por_outro(chave, email, timedelta(seconds=-1))
+
+    r = cliente.post(ROTA, headers={"Idempotency-Key": chave, "Content-Type": "application/json"}, content=corpo)
+    assert r.status_code == 201, r.text
+    assert _executar(_linha, chave).status == 201
+    assert _clientes_com_email(email) == 1
+
+def test_resposta_nao_guardada_libera_a_chave(cliente, monkeypatch):
+    from app.Services import auth_service
+    from app.utils.pool_senhas import PoolSenhas
+
+    chave, email = unico("chave"), f"{unico('idem')}@locadora.com"
+    cheio = PoolSenhas(trabalhadores=1, fila_maxima=0)
+    cheio._reservar_vaga()
+    monkeypatch.setattr(auth_service, "pool_senhas", cheio)
+    # 503 com Retry-After: pode dar certo na repetição, então nada fica na tabela
+    assert _registrar(cliente, chave, email).status_code == 503
+    assert _executar(_linha, chave) is None
+
+    monkeypatch.undo()
+    assert _registrar(cliente, chave, email).status_code == 201
+
+def test_token_renovado_repete_a_mesma_reserva(cliente, novo_veiculo):
+    from app.models.Reservar import Reserva
+    from app.utils.security import criar_access_token
+
+    email = f"{unico('idem')}@locadora.com"
+    autenticar_cliente(cliente, email)
+    veiculo = novo_veiculo()
+    inicio = datetime.utcnow().replace(microsecond=0) + timedelta(days=600)
+    pedido = {
+        "veiculo_id": veiculo["id"], "data_inicio": inicio.isoformat(),
+        "data_fim": (inicio + timedelta(days=2)).isoformat(),
+    }
+
+    def reservar(validade: timedelta):
+        token = criar_access_token({"sub": email, "role": "cliente"}, validade)
+        return cliente.post("/api/reservas/", json=pedido,
+                            headers={"Authorization": f"Bearer {token}", "Idempotency-Key": "renovado"})
+
+    primeira = reservar(timedelta(minutes=10))
+    assert primeira.status_code == 200, primeira.text
+    # Outro texto de token (renovado), mesmo usuário: é a mesma chave
+    repetida = reservar(timedelta(minutes=20))
+    assert repetida.status_code == 200
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert repetida.json()["res_id"] == primeira.json()["res_id"]
+    assert _executar(lambda conn: conn.scalar(
+        select(func.count()).where(Reserva.res_vei_id == veiculo["id"])
+    )) == 1
+
+def test_token_invalido_nao_guarda_resposta(cliente):
+    antes = _executar(lambda conn: conn.scalar(select(func.count()).select_from(idempotencia._tabela)))
+    r = cliente.post("/api/reservas/", json={}, headers={"Authorization": "Bearer x.y.z", "Idempotency-Key": "k"})
+    assert r.status_code == 401
+    assert "Idempotent-Replayed" not in r.headers
+    assert _executar(lambda conn: conn.scalar(select(func.count()).select_from(idempotencia._tabela))) == antes
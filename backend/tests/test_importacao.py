@@ -0,0 +1,121 @@
+from sqlalchemy import select
+
+from conftest import unico
+
+CABECALHO = "placa,modelo,marca,ano,cor,categoria,valor_diaria,descricao\n"
+
+def _importar(cliente, admin, corpo: str, formato: str = "csv"):
+    r = cliente.post(f"/api/veiculos/importar?formato={formato}", content=corpo.encode(), headers=admin)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+def _descricao(placa: str):
+    from app.database import SessionLocal
+    from app.models.Veiculos import Veiculo
+
+    db = SessionLocal()
+    try:
+        return db.scalar(select(Veiculo.descricao).where(Veiculo.placa == placa))
+    finally:
+        db.close()
+
+def test_campo_entre_aspas_com_quebra_de_linha(cliente, admin):
+    placa, outra = unico("IMP"), unico("IMP")
+    corpo = (
+        CABECALHO
+        + f'{placa},Onix,Chevrolet,2024,Branco,ECONOMICO,100,"Primeira linha\nsegunda, com ""aspas""\n"\n'
+        + f"{outra},HB20,Hyundai,2023,Prata,ECONOMICO,90,\n"
+    )
+    relatorio = _importar(cliente, admin, corpo)
+
+    assert relatorio["inseridas"] == 2, relatorio
+    assert relatorio["rejeitadas"] == 0
+    assert _descricao(placa) == 'Primeira linha\nsegunda, com "aspas"\n'
+    assert _descricao(outra) is None
+
+def test_erros_apontam_a_linha_onde_o_registro_comeca(cliente, admin):
+    corpo = (
+        CABECALHO
+        + f'{unico("IMP")},Onix,Chevrolet,2024,Branco,ECONOMICO,100,"três\nlinhas\naqui"\n'
+        + f"{unico('IMP')},Onix,Chevrolet,2024,Branco,ECONOMICO\n"
+        + f'{unico("IMP")},Onix,Chevrolet,2024,Branco,ECONOMICO,100,"sem fechar\n'
+    )
+    relatorio = _importar(cliente, admin, corpo)
+
+    assert relatorio["inseridas"] == 1
+    assert [(e["linha"], e["motivo"]) for e in relatorio["erros"]] == [
+        (5, "Quantidade de colunas diferente do cabeçalho"),
+        (6, "Aspas não fechadas até o fim do arquivo"),
+    ]
+
+def test_lote_recusado_pelo_banco_e_regravado_linha_a_linha(cliente, admin):
+    placas = [unico("IMP") for _ in range(3)]
+    # ano passa no schema (int) mas não cabe no int4 da coluna: o INSERT do lote inteiro falha
+    anos = [2024, 3_000_000_000, 2022]
+    corpo = CABECALHO + "".join(
+        f"{placa},Onix,Chevrolet,{ano},Branco,ECONOMICO,100,\n" for placa, ano in zip(placas, anos)
+    )
+    relatorio = _importar(cliente, admin, corpo)
+
+    assert relatorio["inseridas"] == 2
+    assert relatorio["rejeitadas"] == 1
+    [erro] = relatorio["erros"]
+    assert erro["linha"] == 3 and erro["placa"] == placas[1]
+    assert erro["motivo"].startswith("Recusado pelo banco: ")
+    assert "range" in erro["motivo"]  # psycopg2 e asyncpg descrevem o estouro com palavras diferentes
+
+    # As demais linhas do lote foram gravadas, e uma placa já existente segue como antes
+    relatorio = _importar(cliente, admin, CABECALHO + f"{placas[0]},Onix,Chevrolet,2024,Branco,ECONOMICO,100,\n")
+    assert relatorio["erros"] == [{"linha": 2, "placa": placas[0], "motivo": "Placa já cadastrada"}]
+
+def test_linha_grande_demais_vira_erro_sem_interromper(cliente, admin, monkeypatch):
+    from app.Services import importacao_service
+
+    # Lotes de um: as linhas antes da grande já foram confirmadas quando ela chega
+    monkeypatch.setattr(importacao_service, "TAMANHO_LOTE", 1)
+    grande = "x" * (importacao_service.TAMANHO_MAXIMO_LINHA + 1)
+    placas = [unico("IMP") for _ in range(3)]
+    corpo = (
+        CABECALHO
+        + f"{placas[0]},Onix,Chevrolet,2024,Branco,ECONOMICO,100,\n"
+        + f"{unico('IMP')},Onix,Chevrolet,2024,Branco,ECONOMICO,100,{grande}\n"
+        + f"{placas[1]},Onix,Chevrolet,2024,Branco,ECONOMICO,100,\n"
+        + f'{unico("IMP")},Onix,Chevrolet,2024,Branco,ECONOMICO,100,"{grande[:40000]}\n{grande[:40000]}"\n'
+        + f"{placas[2]},Onix,Chevrolet,2024,Branco,ECONOMICO,100,\n"
+    )
+    relatorio = _importar(cliente, admin, corpo)
+
+    assert relatorio["inseridas"] == 3
+    assert [(e["linha"], e["motivo"]) for e in relatorio["erros"]] == [
+        (3, "Linha excede o tamanho máximo de 64 KB"),
+        (5, "Registro excede o tamanho máximo de 64 KB"),
+    ]
+
+def test_linha_grande_demais_no_ndjson(cliente, admin):
+    from app.Services import importacao_service
+
+    placa = unico("IMP")
+    corpo = (
+        '{"descricao": "' + "x" * (importacao_service.TAMANHO_MAXIMO_LINHA + 1) + '"}\n'
+        + f'{{"placa": "{placa}", "modelo": "Onix", "marca": "Chevrolet", "ano": 2024, "cor": "Branco", '
+        + '"categoria": "ECONOMICO", "valor_diaria": 100}\n'
+    )
+    relatorio = _importar(cliente, admin, corpo, formato="ndjson")
+    assert relatorio["inseridas"] == 1
+    assert relatorio["erros"] == [{"linha": 1, "placa": None, "motivo": "Linha excede o tamanho máximo de 64 KB"}]
+
+def test_linha_grande_descartada_entre_blocos():
+    import asyncio
+    from app.Services import importacao_service
+
+    limite = importacao_service.TAMANHO_MAXIMO_LINHA
+
+    async def blocos():
+        yield b"a,b\n" + b"x" * limite
+        yield b"x" * 10
+        yield b"y\nc,d\n"
+
+    async def linhas():
+        return [linha async for linha in importacao_service._linhas(blocos())]
+
+    assert asyncio.run(linhas()) == ["a,b", None, "c,d"]
@@ -0,0 +1,78 @@
+import base64
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.utils.paginacao import codificar_cursor, decodificar_cursor
+
+def _b64(bruto: bytes) -> str:
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+@pytest.mark.parametrize("chave", [
+    "3f2b8c1e-9a4d-4e2b-8f1a-0c9d8e7f6a5b", "ABC1234", "", "ç/+=?&", "x" * 500,
+])
+def test_cursor_ida_e_volta(chave):
+    cursor = codificar_cursor(chave)
+    # Vai na query string sem escape
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decodificar_cursor(cursor) == chave
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "não é base64",
+    "@@@",
+    codificar_cursor("abc")[:-3],   # truncado
+    _b64(b"{}"),                     # sem a chave
+    _b64(b'{"k": 5}'),               # chave que não é texto
+    _b64(b'{"k": null}'),
+    _b64(b"[1]"),
+    _b64(b"null"),
+    _b64("\xff".encode("latin-1")),  # não é UTF-8
+])
+def test_cursor_invalido_vira_400(cursor):
+    with pytest.raises(HTTPException) as erro:
+        decodificar_cursor(cursor)
+    assert erro.value.status_code == 400
+
+def test_listagem_recusa_cursor_adulterado(cliente):
+    for cursor in ("lixo", _b64(b'{"k": 5}'), codificar_cursor("abc") + "!"):
+        r = cliente.get("/api/veiculos/", params={"cursor": cursor})
+        assert r.status_code == 400, (cursor, r.text)
+        assert r.json()["detail"] == "Cursor de paginação inválido"
+
+def _todas_as_paginas(cliente, **params):
+    ids, paginas, cursor = [], 0, None
+    while True:
+        r = cliente.get("/api/veiculos/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        corpo = r.json()
+        assert set(corpo) == {"itens", "proximo_cursor", "total_aproximado"}
+        assert len(corpo["itens"]) <= params["limite"]
+        ids += [item["id"] for item in corpo["itens"]]
+        paginas += 1
+        cursor = corpo["proximo_cursor"]
+        if cursor is None:
+            return ids, paginas
+
+def test_paginas_estaveis_com_empate(cliente, novo_veiculo):
+    from app.database import engine
+
+    # Veículos iguais em tudo que não é a chave: a ordem só pode vir do id
+    for _ in range(7):
+        novo_veiculo(categoria="LUXO", modelo="Empate", ano=2020, valor_diaria=300.0)
+
+    ids, paginas = _todas_as_paginas(cliente, categoria="LUXO", limite=3)
+    with engine.connect() as conn:
+        esperados = conn.execute(text("SELECT id FROM veiculos WHERE categoria = 'LUXO' ORDER BY id")).scalars().all()
+    # Cada veículo uma vez, na ordem do banco, e a mesma sequência numa segunda passada
+    assert ids == esperados
+    assert paginas == -(-len(esperados) // 3)
+    assert _todas_as_paginas(cliente, categoria="LUXO", limite=3)[0] == ids
+
+def test_total_aproximado(cliente, novo_veiculo):
+    novo_veiculo(categoria="SUV")
+    r = cliente.get("/api/veiculos/", params={"categoria": "SUV", "incluir_total": True, "limite": 1})
+    assert r.status_code == 200
+    assert r.json()["total_aproximado"] >= 1
+    assert cliente.get("/api/veiculos/", params={"limite": 1}).json()["total_aproximado"] is None
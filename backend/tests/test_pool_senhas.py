@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlalchemy import select
+
+from app.utils import security
+from app.utils.pool_senhas import PoolSenhas
+from conftest import unico
+
+def _hash_com_custo(senha: str, custo: int) -> str:
+    return CryptContext(schemes=["bcrypt"], bcrypt__rounds=custo).hash(senha)
+
+def _custo(hash_senha: str) -> int:
+    return int(hash_senha.split("$")[2])
+
+def test_fila_cheia_recusa_com_503():
+    pool = PoolSenhas(trabalhadores=1, fila_maxima=1)
+    liberar = threading.Event()
+
+    async def cenario():
+        # Um pedido executando e um na fila ocupam a capacidade inteira
+        presos = [asyncio.ensure_future(pool.executar(liberar.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert pool.pendentes == 2
+
+        with pytest.raises(HTTPException) as erro:
+            await pool.executar(lambda: None)
+        assert erro.value.status_code == 503
+        assert erro.value.headers == {"Retry-After": "1"}
+        assert pool.rejeitadas == 1
+
+        # As vagas voltam quando as threads terminam
+        liberar.set()
+        assert await asyncio.gather(*presos) == [True, True]
+        assert await pool.executar(lambda: "livre") == "livre"
+
+    asyncio.run(cenario())
+    assert pool.resumo() == {
+        "trabalhadores": 1, "capacidade": 2, "pendentes": 0, "concluidas": 3, "rejeitadas": 1,
+    }
+
+def test_vaga_volta_mesmo_se_o_cliente_desiste():
+    pool = PoolSenhas(trabalhadores=1, fila_maxima=0)
+    liberar = threading.Event()
+
+    async def cenario():
+        tarefa = asyncio.ensure_future(pool.executar(liberar.wait, 5))
+        await asyncio.sleep(0)
+        tarefa.cancel()
+        # A thread continua ocupada: a vaga só volta quando ela termina
+        with pytest.raises(HTTPException):
+            await pool.executar(lambda: None)
+        liberar.set()
+        for _ in range(100):
+            if pool.pendentes == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await pool.executar(lambda: "livre") == "livre"
+
+    asyncio.run(cenario())
+
+def test_vaga_volta_se_o_envio_para_a_thread_falha():
+    pool = PoolSenhas(trabalhadores=1, fila_maxima=0)
+    pool._executor.shutdown()
+
+    async def cenario():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await pool.executar(lambda: None)
+
+    asyncio.run(cenario())
+    assert pool.pendentes == 0
+    assert pool.rejeitadas == 0
+
+def test_registro_com_pool_cheio_responde_503(cliente, monkeypatch):
+    from app.Services import auth_service
+
+    cheio = PoolSenhas(trabalhadores=1, fila_maxima=0)
+    cheio._reservar_vaga()
+    monkeypatch.setattr(auth_service, "pool_senhas", cheio)
+
+    r = cliente.post("/api/auth/cliente/registrar",
+                     json={"email": f"{unico('cheio')}@locadora.com", "nome": "Cheio", "senha": "x"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+def test_verificar_e_atualizar_refaz_hash_de_outro_custo():
+    antigo = _hash_com_custo("segredo", security.BCRYPT_ROUNDS + 1)
+
+    valida, novo = security.verificar_e_atualizar_senha("segredo", antigo)
+    assert valida
+    assert novo is not None and _custo(novo) == security.BCRYPT_ROUNDS
+    assert security.verificar_senha("segredo", novo)
+
+    # Com o custo atual não há o que refazer; senha errada não gera hash
+    assert security.verificar_e_atualizar_senha("segredo", novo) == (True, None)
+    assert security.verificar_e_atualizar_senha("errada", antigo) == (False, None)
+
+def test_login_regrava_hash_de_outro_custo(cliente):
+    from app.database import SessionLocal
+    from app.models.Cliente import Cliente
+
+    email = f"{unico('custo')}@locadora.com"
+    assert cliente.post("/api/auth/cliente/registrar",
+                        json={"email": email, "nome": "Custo", "senha": "segredo"}).status_code == 201
+
+    def hash_gravado(novo: str = None) -> str:
+        db = SessionLocal()
+        try:
+            usuario = db.scalar(select(Cliente).where(Cliente.cli_email == email))
+            if novo is not None:
+                usuario.cli_senha_hash = novo
+                db.commit()
+            return usuario.cli_senha_hash
+        finally:
+            db.close()
+
+    # Hash feito com o custo de antes da mudança de BCRYPT_ROUNDS
+    hash_gravado(_hash_com_custo("segredo", security.BCRYPT_ROUNDS + 1))
+    r = cliente.post("/api/auth/cliente/login", json={"email": email, "senha": "segredo"})
+    assert r.status_code == 200, r.text
+    assert _custo(hash_gravado()) == security.BCRYPT_ROUNDS
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+from conftest import unico
+
+def _login(cliente):
+    email = f"{unico('sessao')}@locadora.com"
+    assert cliente.post("/api/auth/cliente/registrar",
+                        json={"email": email, "nome": "Sessão", "senha": "segredo"}).status_code == 201
+    r = cliente.post("/api/auth/cliente/login", json={"email": email, "senha": "segredo"})
+    assert r.status_code == 200, r.text
+    return email, r.json()["refresh_token"]
+
+def _renovar(cliente, refresh_token: str):
+    return cliente.post("/api/auth/cliente/refresh", json={"refresh_token": refresh_token})
+
+def _sessoes(email: str):
+    from app.database import SessionLocal
+    from app.models.SessaoRefresh import SessaoRefresh
+
+    db = SessionLocal()
+    try:
+        return db.scalars(
+            select(SessaoRefresh).where(SessaoRefresh.sujeito == email).order_by(SessaoRefresh.criado_em)
+        ).all()
+    finally:
+        db.close()
+
+def _executar(instrucao):
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        db.execute(instrucao)
+        db.commit()
+    finally:
+        db.close()
+
+def test_renovacao_nao_estende_a_familia(cliente):
+    email, token = _login(cliente)
+    for _ in range(3):
+        r = _renovar(cliente, token)
+        assert r.status_code == 200, r.text
+        token = r.json()["refresh_token"]
+
+    sessoes = _sessoes(email)
+    assert len(sessoes) == 4
+    assert len({sessao.familia for sessao in sessoes}) == 1
+    assert len({sessao.expira_em for sessao in sessoes}) == 1
+
+def test_familia_expirada_nao_renova(cliente):
+    from app.models.SessaoRefresh import SessaoRefresh
+
+    email, token = _login(cliente)
+    token = _renovar(cliente, token).json()["refresh_token"]
+    # A família chegou ao fim da validade do login, mesmo sendo usada
+    _executar(
+        update(SessaoRefresh).where(SessaoRefresh.sujeito == email)
+        .values(expira_em=datetime.utcnow() - timedelta(seconds=1))
+    )
+    assert _renovar(cliente, token).status_code == 401
+
+def test_conta_desativada_revoga_a_familia(cliente):
+    from app.models.Cliente import Cliente
+
+    email, token = _login(cliente)
+    _executar(update(Cliente).where(Cliente.cli_email == email).values(cli_ativo=False))
+
+    assert _renovar(cliente, token).status_code == 401
+    assert all(sessao.revogado_em is not None for sessao in _sessoes(email))
+
+    # Reativar a conta não ressuscita a família revogada
+    _executar(update(Cliente).where(Cliente.cli_email == email).values(cli_ativo=True))
+    assert _renovar(cliente, token).status_code == 401
+
+def test_conta_removida_nao_renova(cliente):
+    from app.models.Cliente import Cliente
+
+    email, token = _login(cliente)
+    _executar(delete(Cliente).where(Cliente.cli_email == email))
+
+    assert _renovar(cliente, token).status_code == 401
+    assert all(sessao.revogado_em is not None for sessao in _sessoes(email))
+
+def test_reuso_de_token_substituido_revoga_a_familia(cliente):
+    email, primeiro = _login(cliente)
+    segundo = _renovar(cliente, primeiro).json()["refresh_token"]
+
+    assert _renovar(cliente, primeiro).status_code == 401
+    assert _renovar(cliente, segundo).status_code == 401